@@ -1,127 +1,45 @@
 import unreal
+from pie_script_core import PIEScriptCore, PIEScriptConnection, PIEScriptMessageQueue, PIEScriptSendQueue, pie_script_message_handler, c_logger
+from pie_script_protocol import PIEScriptFrameCodec, PIEScriptReceiveRingBuffer, PIEScriptStreamDecoder
 
-import time
-import socket
-import threading
- 
-
-@unreal.uclass()
-class PIEScriptEditorTimerObject(unreal.Object):
-    def __init__(self, outer_world, periodic_callback=None, periodic_tick_duration=1.0):
-        unreal.Object.__init__(self, outer=outer_world)
-        self._periodic_tick_timer_handle = None
-        self._periodic_tick_timer_duration = periodic_tick_duration
-        self._periodic_callback = periodic_callback
-    
-    
-    # overridable handler called periodically on the main thread
-    @unreal.ufunction(ret=None,params=[])
-    def handle_periodic_timer_callback(self):
-        if(self._periodic_callback is not None):
-            self._periodic_callback()
-        
-    
-        return
-        
-        
-    # call to enable / disable the periodic tick timer used to process messages in the main thread
-    def set_periodic_timer_enabled(self, b_enabled, world_context):
-        if(self._periodic_tick_timer_handle is not None and unreal.SystemLibrary.is_timer_active(world_context, "handle_periodic_timer_callback") == True):
-                unreal.SystemLibrary.clear_timer(self, self._periodic_tick_timer_handle)
-    
-        if(b_enabled == True):
-            self._periodic_tick_timer_handle = unreal.SystemLibrary.set_timer(self, "handle_periodic_timer_callback", self._periodic_tick_timer_duration, True)
-    
-    
-        return
-        
-
-@unreal.uclass()
-class PIEScriptEditorDelegateHelperObject(unreal.EditorDelegateHelperObject):
-    def __init__(self, on_editor_play_simulation_started_callback=None, on_editor_play_simulation_ending_callback=None, on_editor_world_changed_callback=None):
-        unreal.Object.__init__(self)
-        self._editor_play_simulation_started_callback = on_editor_play_simulation_started_callback
-        self._editor_play_simulation_ending_callback = on_editor_play_simulation_ending_callback
-        self._on_editor_world_changed_callback = on_editor_world_changed_callback
-        self.bind_to_editor_delegates()
-        self.on_editor_play_simulation_started.add_function_unique(self, "handle_editor_play_simulation_started")
-        self.on_editor_play_simulation_ending.add_function_unique(self, "handle_editor_play_simulation_ending")
-        self.on_editor_world_changed.add_function_unique(self, "handle_editor_world_changed")
-    
-    
-    # callback to handle the editor event: play simulation started
-    @unreal.ufunction(ret=None,params=[])
-    def handle_editor_play_simulation_started(self):
-        if(self._editor_play_simulation_started_callback is not None):
-            self._editor_play_simulation_started_callback()
-        
-    
-        return
-        
-        
-    # callback to handle the editor event: play simulation ended
-    @unreal.ufunction(ret=None,params=[])
-    def handle_editor_play_simulation_ending(self):
-        if(self._editor_play_simulation_ending_callback is not None):
-            self._editor_play_simulation_ending_callback()
-        
-    
-        return
-        
-    
-    # callback to handle the editor event: world changed
-    @unreal.ufunction(ret=None,params=[])
-    def handle_editor_world_changed(self):
-        if(self._on_editor_world_changed_callback is not None):
-            self._on_editor_world_changed_callback()
-        
-    
-        return
+import logging
 
 
+# forwards the log records of the PIE Script core to the editor's output log
+class PIEScriptUnrealLogHandler(logging.Handler):
+    def emit(self, record):
+        msg = self.format(record)
+        if(record.levelno >= logging.ERROR):
+            unreal.log_error(msg)
+        elif(record.levelno >= logging.WARNING):
+            unreal.log_warning(msg)
+        else:
+            unreal.log(msg)
+            
+            
 # class object that communicates with a PIEScript Messenger object that exists at runtime
 # in an editor play simulation. Provides functions for starting and stopping a PIE session
 # and sending / receiving messages from the runtime messenger object.
-class PIEScript():
+# adapts PIEScriptCore to the editor. the message type constants, editor delegates and editor timers are set up
+# on the first start(), so importing this module or creating a PIEScript costs next to nothing at editor startup.
+class PIEScript(PIEScriptCore):
 
     def __init__(self):
-    
-        # socket connection
-        self.c_ip_address = unreal.PIEScriptBpFunctionLibrary.get_pie_script_socket_address()
-        self.c_port = unreal.PIEScriptBpFunctionLibrary.get_pie_script_socket_port()
-        self.c_server_address = (self.c_ip_address, self.c_port)
-        self._socket = None
-        self._client = None
-        self._client_address = None
-        
-        # message listening thread
-        self._listen_thread = None
-        self._b_continue_listen_thread = False
-        self.c_listen_thread_sleep_duration = 0.01
-        self._listen_buffer_size = 32
-        self._message_queue = []
-        
-        # message type constants - defined by a C++ Blueprint Function Library that is accessible in Python through 
-        # the Unreal Engine reflection system.
-        self.c_socket_message_heartbeat = unreal.PIEScriptBpFunctionLibrary.get_pie_script_socket_message_heartbeat()
-        self.c_socket_message_greeting = unreal.PIEScriptBpFunctionLibrary.get_pie_script_socket_message_greeting()
-        self.c_socket_message_goodbye = unreal.PIEScriptBpFunctionLibrary.get_pie_script_socket_message_goodbye()
-        self.c_runtime_message_beginplay = unreal.PIEScriptBpFunctionLibrary.get_pie_script_runtime_message_begin_play()
-        self.c_runtime_message_endplay = unreal.PIEScriptBpFunctionLibrary.get_pie_script_runtime_message_end_play()
+        super().__init__()
         
-        # editor event handling
+        # editor event handling -- set up by initialize_editor() on the first call to start() or start_listening()
+        self._b_is_editor_initialized = False
         self.c_editor_simulation_periodic_tick_duration = 0.5
         self.c_editor_periodic_tick_duration = 0.5
-        self._editor_delegate_object = PIEScriptEditorDelegateHelperObject(
-            on_editor_play_simulation_started_callback=self.handle_editor_play_simulation_started, 
-            on_editor_play_simulation_ending_callback=self.handle_editor_play_simulation_ending,
-            on_editor_world_changed_callback=self.handle_editor_world_changed)
+        self._editor_delegate_object = None
         self._editor_simulation_timer_object = None
         self._editor_timer_object = None
         self._b_has_started_pie_session = False
         self._b_is_waiting_to_return_from_editor_simulation = False
         
-        self._start_editor_periodic_timer()
+        # watchdog -- a PIE session stopped by an expired watchdog timeout is started again once it has ended
+        self._b_is_watchdog_restart_enabled = False
+        self._b_is_watchdog_restart_pending = False
         
     def __del__(self):
         if(self._editor_delegate_object is not None):
@@ -133,14 +51,7 @@ class PIEScript():
         if(self._editor_simulation_timer_object is not None):
             del self._editor_simulation_timer_object
             
-        if(self._message_queue is not None):
-            self._message_queue = []
-            
-        if(self._client is not None):
-            self._client.close()
-            
-        if(self._socket is not None):
-            self._socket.close()
+        super().__del__()
             
             
     # print help to the log
@@ -156,14 +67,71 @@ class PIEScript():
         unreal.log("You can run python code by typing it into this console -- make sure 'Python' is selected in the dropdown on the bottom left")
         unreal.log("PIEScript uses the PIEScript class on python side to start() and stop() a PIE session")
         unreal.log("It expects a PIEScript Messenger component to be instantiated in your level on BeginPlay() and it will connect via sockets")
+        unreal.log("Use set_random_seed(), set_fixed_timestep() and set_time_dilation() to have the messenger make simulations deterministic and faster than real time")
+        unreal.log("Handle your own message types with '.register_message_handler(message_type, handler, b_has_payload)' or by decorating methods with '@pie_script.pie_script_message_handler(message_type)'")
+        unreal.log("Use set_watchdog_timeouts(connect_timeout, first_message_timeout, message_timeout, race_timeout) to stop hung PIE sessions, and set_watchdog_restart_enabled(True) to start them again")
         
         
         return
         
         
-    # get number of received messages waiting in the message queue
-    def get_number_of_pending_received_messages(self):
-        return len(self._message_queue)
+    # get a message type constant from the PIE Script function library,
+    # or the given default message when the plugin version in use does not provide it
+    @staticmethod
+    def get_optional_pie_script_message(function_name, default_message):
+        message_function = getattr(unreal.PIEScriptBpFunctionLibrary, function_name, None)
+        if(message_function is None):
+            return default_message
+            
+            
+        return message_function()
+        
+        
+    # check if the message type constants, editor delegates and editor timers have been set up
+    def is_editor_initialized(self):
+        return self._b_is_editor_initialized
+        
+        
+    # sets up the message type constants, editor delegates and editor timers, called by the first start() or
+    # start_listening(). call it earlier to have the editor tick this script before it starts listening
+    def initialize_editor(self):
+        if(self._b_is_editor_initialized == True):
+            return
+            
+        self._b_is_editor_initialized = True
+        
+        # forward the log messages of the core to the output log
+        if(any(isinstance(handler, PIEScriptUnrealLogHandler) for handler in c_logger.handlers) == False):
+            c_logger.addHandler(PIEScriptUnrealLogHandler())
+            c_logger.setLevel(logging.INFO)
+            c_logger.propagate = False
+        
+        # socket connection
+        self.set_server_address(unreal.PIEScriptBpFunctionLibrary.get_pie_script_socket_address(), unreal.PIEScriptBpFunctionLibrary.get_pie_script_socket_port())
+        
+        # message type constants - defined by a C++ Blueprint Function Library that is accessible in Python through 
+        # the Unreal Engine reflection system.
+        self.c_socket_message_heartbeat = unreal.PIEScriptBpFunctionLibrary.get_pie_script_socket_message_heartbeat()
+        self.c_socket_message_greeting = unreal.PIEScriptBpFunctionLibrary.get_pie_script_socket_message_greeting()
+        self.c_socket_message_goodbye = unreal.PIEScriptBpFunctionLibrary.get_pie_script_socket_message_goodbye()
+        self.c_runtime_message_beginplay = unreal.PIEScriptBpFunctionLibrary.get_pie_script_runtime_message_begin_play()
+        self.c_runtime_message_endplay = unreal.PIEScriptBpFunctionLibrary.get_pie_script_runtime_message_end_play()
+        self.c_runtime_message_set_random_seed = PIEScript.get_optional_pie_script_message("get_pie_script_runtime_message_set_random_seed", self.c_runtime_message_set_random_seed)
+        self.c_runtime_message_set_fixed_timestep = PIEScript.get_optional_pie_script_message("get_pie_script_runtime_message_set_fixed_timestep", self.c_runtime_message_set_fixed_timestep)
+        self.c_runtime_message_set_time_dilation = PIEScript.get_optional_pie_script_message("get_pie_script_runtime_message_set_time_dilation", self.c_runtime_message_set_time_dilation)
+        self.refresh_message_handlers()
+        
+        # editor event handling
+        from pie_script_editor_objects import PIEScriptEditorDelegateHelperObject
+        self._editor_delegate_object = PIEScriptEditorDelegateHelperObject(
+            on_editor_play_simulation_started_callback=self.handle_editor_play_simulation_started, 
+            on_editor_play_simulation_ending_callback=self.handle_editor_play_simulation_ending,
+            on_editor_world_changed_callback=self.handle_editor_world_changed)
+        
+        self._start_editor_periodic_timer()
+        
+        
+        return
         
         
     # check if this script is waiting to return from an ending editor play simulation
@@ -171,131 +139,47 @@ class PIEScript():
         return self._b_is_waiting_to_return_from_editor_simulation
         
 
-    # set the listen thread receive message buffer size
-    def set_listen_buffer_size(self, size):
-        self._listen_buffer_size = size
-        
-
-     # check if this PIE script has a bound socket
-    def is_socket_connected(self):
-        return self._socket is not None and self._client is not None
-
-
-    # check if this PIE script has a background thread that is actively listening for client messages
-    def is_listening_for_messages(self):
-        return self._b_continue_listen_thread is True and self._listen_thread is not None
-
-
     # check if this PIE script has started a PIE session
     def has_started_pie_session(self):
         return self._b_has_started_pie_session
+        
+        
+    # enable / disable starting a PIE session again once the watchdog has stopped it and it has ended
+    def set_watchdog_restart_enabled(self, b_enabled):
+        self._b_is_watchdog_restart_enabled = b_enabled
+        
+        
+    # check if a PIE session stopped by the watchdog is started again once it has ended
+    def is_watchdog_restart_enabled(self):
+        return self._b_is_watchdog_restart_enabled
 
 
     # call to start the PIE Script and intialize communications with the runtime messenger
     def start(self):
-    
-        # create a socket at server side
-        # using TCP / IP protocol
-        self._socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-
-        # bind the socket with server
-        # and port number
-        self._socket.bind(self.c_server_address)
-
-        # allow maximum 1 connection to
-        # the socket
-        self._socket.listen(1)
-        
-        # start background thread to wait for clients and listen for messages from them
-        self._start_listen_thread()
+        self.initialize_editor()
         
         # launch PIE session which should instantiate the runtime PIEScript Messenger 
         # the Messenger will connect to this socket
-        self._start_pie_session()
-        
-        
-        return
-        
-    
-    # call to send the goodbye message to the runtime messenger and end the PIE Script
-    def stop(self):
-    
-        # send goodbye message
-        #if(self.is_socket_connected()):
-        #    self.send_message(self.c_socket_message_goodbye)
-            
-        self.force_stop()
+        super().start()
         
         
         return
         
     
-    # forces the PIE Script to end immediately
-    def force_stop(self):
-        # disconnect client
-        if(self._client is None):
-            unreal.log_warning("no connected client")
-        else:
-            self._client.close()
-            self._client = None
-    
-        # close socket
-        if(self._socket is None):
-            unreal.log_error("socket does not exist")
-        else:
-            self._socket.close()
-            self._socket = None
-            
-        # stop listening for messages
-        if(self.is_listening_for_messages()):
-            self._stop_listen_thread()
-            
-        # end the PIE session
-        self._stop_pie_session()
+    # call to open the server socket and accept connections without launching a PIE session
+    def start_listening(self):
+        self.initialize_editor()
         
-        
-        return
-        
-        
-    # call to send a message to the PIE Script Messenger in a live PIE session
-    def send_message(self, msg):
-        if(self.is_socket_connected() == True):
-            try:
-                self._client.send(msg.encode())
-                #unreal.log("sent '" + msg + "'")
-            except ConnectionResetError as cre:
-                unreal.log_error("connection reset exception:\n" + str(cre) + "")
-                
-                # stop PIE session, stop background thread, and close connection
-                self.force_stop()
-            except Exception as e:
-                unreal.log_error("exception:\n" + str(e) + "")
-        else:
-            unreal.log_error("not connected to socket, failed to send '" + msg + "'")
+        super().start_listening()
         
         
         return
         
-        
-    # overridable handler for when a message is received from a PIE Script Messenger in a live PIE session
-    def receive_message(self, msg, b_was_handled):
-        #unreal.log("received '" + msg + "'")
-        
-        if(b_was_handled == False):
-            if(msg == self.c_runtime_message_beginplay):
-                self.handle_begin_play()
-            elif(msg == self.c_runtime_message_endplay):
-                self.handle_end_play()
-            elif(msg == self.c_socket_message_heartbeat):
-                self.handle_socket_heartbeat()
-            
-            
-        return
     
-   
     # overridable handler for when the the editor play simulation started delegate is broadcasted
     def handle_editor_play_simulation_started(self):
         #unreal.log("editor play simulation started")
+        self._instrumentation.end_phase("pie_start")
         self._start_editor_simulation_periodic_timer()
         
         
@@ -328,181 +212,48 @@ class PIEScript():
         return
     
    
-    # overridable handler for when the begin play message is received
-    # from a PIE Script Messenger in a live PIE session
-    def handle_begin_play(self):
-        #unreal.log("begin play received")
-        
-        
-        return
-        
-        
-    # overridable handler for when the end play message is received
-    # from a PIE Script Messenger in a live PIE session
-    def handle_end_play(self):
-        #unreal.log("end play received")
-        
-        # stop the pie script
-        self.stop()
-        
-        return
-    
-    
-    # overridable handler called when a client connection is accepted
-    def handle_accepted_client_connection(self):
-        unreal.log("client connected at address '" + str(self._client_address) + "'")
-        
-        self.send_message(self.c_socket_message_greeting)
-        
-        
-        return
-        
-    
-    # overridable handler called when a client connection sends a heartbeat
-    def handle_socket_heartbeat(self):
-        # anything todo ?
-        
-    
-        return
-        
-    
     # overridable handler called periodically on the main thread when pie simulation is NOT running
     def handle_editor_periodic_tick(self):
+        # messages from connections that outlive PIE sessions arrive while no simulation is running
+        self.dispatch_pending_received_messages()
+        
         if(self.is_waiting_to_return_from_editor_simulation() == True):
             self._b_is_waiting_to_return_from_editor_simulation = False
+            self._instrumentation.end_phase("end_play_to_ended")
             self.handle_editor_play_simulation_ended()
             
+            # restart the session the watchdog stopped, unless the ended handler already started the next one
+            if(self._b_is_watchdog_restart_pending == True):
+                self._b_is_watchdog_restart_pending = False
+                if(self.has_started_pie_session() == False):
+                    unreal.log_warning("restarting PIE session stopped by the watchdog")
+                    self._begin_pie_session()
+                    
+        self.check_watchdog()
+            
     
         return
         
     
     # overridable handler called periodically on the main thread while pie simulation IS running
     def handle_editor_simulation_periodic_tick(self):
-        pending_message_count = self.get_number_of_pending_received_messages()
-        
-        if(pending_message_count > 0):
-            message_string = self._message_queue[0]
-            self._message_queue = self._message_queue[1:]
-            
-            self.receive_message(message_string, False)
+        self.dispatch_pending_received_messages()
+        self.check_watchdog()
         
     
         return
         
         
-    # creates and starts a listen thread in the background to listen for messages from the connected client
-    def _start_listen_thread(self):
-        if(self._listen_thread is not None):
-            unreal.log_error("listen thread already exists")
-            return
-            
-        self._b_continue_listen_thread = True
-        self._listen_thread = threading.Thread(target=self._do_listen_thread, args=(self.handle_accepted_client_connection,), daemon=True)
-        self._listen_thread.start()
+    # overridable handler called when a watchdog timeout expired, force stops the PIE session
+    # and starts it again once it has ended when watchdog restarts are enabled
+    def handle_watchdog_timeout(self, timeout_name, connection_id):
+        super().handle_watchdog_timeout(timeout_name, connection_id)
         
-        
-        return
-        
-        
-    # blocks and forces the listen thread to return    
-    def _stop_listen_thread(self):
-        if(self._listen_thread is None):
-            unreal.log_error("listen thread does not exist")
-            return
-        
-        self._b_continue_listen_thread = False
-        self._listen_thread = None
-        
-        
-        return
-      
-      
-    # thread that listens for messages from the connected client    
-    def _do_listen_thread(self, on_connection_accepted = None):
-        while(self.is_listening_for_messages() == True):
-            if(self._socket is None):
-                unreal.log_error("socket does not exist")
-            elif(self._client is None):
-                unreal.log("waiting for client to connect...")
-                # wait for a client and accept the connection
-                try:
-                    self._client, self._client_address = self._socket.accept()
-                    on_connection_accepted()
-                except Exception as e:
-                    unreal.log_error("exception:\n" + str(e))
-                    self._socket = None
-            else:
-                try:
-                    data = self._receive_buffered_data()
-                    if(len(data) > 0):
-                        self._process_raw_message_data(data)
-                except ConnectionAbortedError as cae:
-                    break
-                except Exception as e:
-                    unreal.log_error("exception:\n" + str(e))
-                    
-                
+        if(self.is_watchdog_restart_enabled() == True):
+            self._b_is_watchdog_restart_pending = True
             
-            time.sleep(self.c_listen_thread_sleep_duration)
-                
-                
-        unreal.log("listen thread aborting")
-        
-        
-        return
-        
-        
-    # pulls raw data from the socket until it no longer provides any
-    def _receive_buffered_data(self):
-        if(self.is_listening_for_messages() == False or self._client is None):
-            unreal.log_error("not currently receiving data")
-            return
-        
-        buff_size = self._listen_buffer_size
-        data = b''
-        while True:
-            part = self._client.recv(buff_size)
-            data += part
-            if(len(part) < buff_size):
-                break
-        return data
-     
-     
-    # converts raw socket data into strings and enqueues them as messages
-    def _process_raw_message_data(self, data):
-        if(len(data) <= 0):
-            return
             
-        data_bytes = data
-        
-        while(True):
-            message_string = PIEScript.extract_string_from_raw_data(data_bytes)
-            if(message_string is not None):
-                self._message_queue.append(message_string)
-                message_length = len(message_string)
-                data_bytes = data_bytes[message_length:]
-            else:
-                break
-                
-        
         return
-    
-    
-    # extracts a string from an array of bytes
-    @staticmethod
-    def extract_string_from_raw_data(data):
-        if (len(data) <= 0):
-            return None
-    
-        message_string = ""
-        for byte in data:
-            byte_char = chr(byte + 1)
-            message_string += byte_char
-            if(byte_char == '\0'):
-                break
-                
-                
-        return message_string
         
         
     # begins a PIE Play Simulation by executing a custom editor console command   
@@ -511,6 +262,8 @@ class PIEScript():
             if(len(unreal.EditorLevelLibrary.get_pie_worlds(True)) > 0):
                 unreal.EditorLevelLibrary.editor_end_play()
             
+            self._instrumentation.begin_phase("pie_start")
+            self._instrumentation.begin_phase("client_accept")
             unreal.EditorLevelLibrary.editor_play_simulate()
             #self._execute_editor_console_command(self.c_command_start)
             
@@ -526,6 +279,7 @@ class PIEScript():
     # ends a PIE Play Simulation by executing a custom editor console command   
     def _stop_pie_session(self):
         if(self.has_started_pie_session() == True):
+            self._instrumentation.begin_phase("end_play_to_ended")
             unreal.EditorLevelLibrary.editor_end_play()
             #self._execute_editor_console_command(self.c_command_end)
             
@@ -539,6 +293,7 @@ class PIEScript():
         
     # call to start the periodic timer 
     def _start_editor_simulation_periodic_timer(self):
+        from pie_script_editor_objects import PIEScriptEditorTimerObject
         game_world = unreal.EditorLevelLibrary.get_game_world()
         
         if(game_world is None):
@@ -563,6 +318,7 @@ class PIEScript():
         
     # call to start the periodic timer 
     def _start_editor_periodic_timer(self):
+        from pie_script_editor_objects import PIEScriptEditorTimerObject
         editor_world = unreal.EditorLevelLibrary.get_editor_world()
         
         if(editor_world is None):
@@ -589,5 +345,3 @@ class PIEScript():
     #def _execute_editor_console_command(self, command):
         #unreal.PIEScriptBpFunctionLibrary.execute_editor_console_command(command)
         #return
-    
-    
\ No newline at end of file
@@ -0,0 +1,240 @@
+import unreal
+import pie_script
+
+import asyncio
+
+
+# event loop that counts the callbacks scheduled on it, tasks and futures schedule their steps and done
+# callbacks with call_soon(), so an unchanged count after a loop iteration means nothing is ready to run
+class PIEScriptEventLoop(asyncio.SelectorEventLoop):
+
+    def __init__(self):
+        super().__init__()
+        self._number_of_scheduled_callbacks = 0
+        
+        
+    # schedules the callback to run on the next iteration of the loop
+    def call_soon(self, callback, *args, context=None):
+        self._number_of_scheduled_callbacks += 1
+        
+        
+        return super().call_soon(callback, *args, context=context)
+        
+        
+    # get the number of callbacks scheduled with call_soon() since the loop was created
+    def get_number_of_scheduled_callbacks(self):
+        return self._number_of_scheduled_callbacks
+        
+        
+# PIE Script with an asyncio front end. Coroutines scheduled with run() are driven by the editor periodic
+# timers PIEScript already uses, so awaiting messages, simulations and timeouts needs no extra threads.
+# The event loop only advances on those ticks, timeouts resolve with the granularity of the tick duration.
+class AsyncPIEScript(pie_script.PIEScript):
+
+    def __init__(self):
+        self._event_loop = PIEScriptEventLoop()
+        self._connection_waiters = []
+        self._simulation_ended_waiters = []
+        self._message_waiters = []
+        self._message_subscribers = []
+        self.c_max_event_loop_iterations_per_run = 64
+        super().__init__()
+        
+    def __del__(self):
+        if(self._event_loop is not None and self._event_loop.is_running() == False):
+            self._event_loop.close()
+            
+        super().__del__()
+        
+        
+    # print help to the log
+    @staticmethod
+    def help():
+        unreal.log("=== Async PIE Script ===")
+        unreal.log("Built on top of PIE Script, schedule a coroutine with '.run(coroutine)' and use within it:")
+        unreal.log("\t await pie.start_async() - launch a PIE session and wait for the runtime messenger to connect")
+        unreal.log("\t await pie.wait_for(message_type, timeout=None) - wait for a message, any message when message_type is None")
+        unreal.log("\t async for msg in pie.messages() - iterate over every received message")
+        unreal.log("\t await pie.run_simulation() - run a PIE session until the editor has returned from it")
+        
+        
+        return
+        
+        
+    # schedules a coroutine on the event loop driven by the editor ticks
+    # returns the asyncio task running it
+    def run(self, coroutine):
+        # the editor ticks drive the event loop, they have to be running before the first start()
+        self.initialize_editor()
+        
+        task = self._event_loop.create_task(coroutine)
+        self._run_event_loop_until_idle()
+        
+        
+        return task
+        
+        
+    # get the event loop driven by the editor ticks
+    def get_event_loop(self):
+        return self._event_loop
+        
+        
+    # launches a PIE session and waits until the runtime messenger has connected
+    # start() stays synchronous, PIEScript and its subclasses call it to launch sessions themselves
+    async def start_async(self, timeout=None):
+        connection_waiter = self._event_loop.create_future()
+        self._connection_waiters.append(connection_waiter)
+        
+        self.start()
+        
+        try:
+            await asyncio.wait_for(connection_waiter, timeout)
+        finally:
+            if(connection_waiter in self._connection_waiters):
+                self._connection_waiters.remove(connection_waiter)
+                
+                
+        return
+        
+        
+    # waits for the next received message of the given type, or for any message when message_type is None
+    # returns the received message string
+    async def wait_for(self, message_type=None, timeout=None):
+        message_waiter = self._event_loop.create_future()
+        waiter_entry = (message_type, message_waiter)
+        self._message_waiters.append(waiter_entry)
+        
+        try:
+            return await asyncio.wait_for(message_waiter, timeout)
+        finally:
+            if(waiter_entry in self._message_waiters):
+                self._message_waiters.remove(waiter_entry)
+                
+                
+    # yields every message received from the moment iteration begins
+    # the subscription ends when the generator is closed, or finalized by the event loop once it is abandoned
+    async def messages(self):
+        message_subscriber = asyncio.Queue()
+        
+        try:
+            self._message_subscribers.append(message_subscriber)
+            while(True):
+                yield await message_subscriber.get()
+        finally:
+            if(message_subscriber in self._message_subscribers):
+                self._message_subscribers.remove(message_subscriber)
+                
+                
+    # starts a PIE session if none is running and waits until the editor has returned from it
+    async def run_simulation(self, timeout=None):
+        simulation_ended_waiter = self._event_loop.create_future()
+        self._simulation_ended_waiters.append(simulation_ended_waiter)
+        
+        if(self.has_started_pie_session() == False):
+            self.start()
+            
+        try:
+            await asyncio.wait_for(simulation_ended_waiter, timeout)
+        finally:
+            if(simulation_ended_waiter in self._simulation_ended_waiters):
+                self._simulation_ended_waiters.remove(simulation_ended_waiter)
+                
+                
+        return
+        
+        
+    # overridable handler for when a message is received from a PIE Script Messenger in a live PIE session
+    def receive_message(self, msg, b_was_handled):
+        super().receive_message(msg, b_was_handled)
+        
+        for message_subscriber in self._message_subscribers:
+            message_subscriber.put_nowait(msg)
+            
+        for waiter_entry in list(self._message_waiters):
+            message_type, message_waiter = waiter_entry
+            if(message_type is None or message_type == msg):
+                self._message_waiters.remove(waiter_entry)
+                if(message_waiter.done() == False):
+                    message_waiter.set_result(msg)
+                    
+        # let awaiting coroutines react before the next message is dispatched
+        self._run_event_loop_until_idle()
+        
+        
+        return
+        
+        
+    # overridable handler called when a client connection is accepted
+    def handle_accepted_client_connection(self):
+        super().handle_accepted_client_connection()
+        
+        # called on the listen thread, resolve the waiters on the next editor tick
+        self._event_loop.call_soon_threadsafe(self._resolve_waiters, self._connection_waiters)
+        
+        
+        return
+        
+        
+    # overridable handler for when the the editor has finished returning from the play simulation
+    def handle_editor_play_simulation_ended(self):
+        super().handle_editor_play_simulation_ended()
+        
+        self._resolve_waiters(self._simulation_ended_waiters)
+        
+        
+        return
+        
+        
+    # overridable handler called periodically on the main thread when pie simulation is NOT running
+    def handle_editor_periodic_tick(self):
+        super().handle_editor_periodic_tick()
+        
+        self._run_event_loop_until_idle()
+        
+        
+        return
+        
+        
+    # overridable handler called periodically on the main thread while pie simulation IS running
+    def handle_editor_simulation_periodic_tick(self):
+        # let coroutines start waiting for the messages this tick is about to dispatch
+        self._run_event_loop_until_idle()
+        
+        super().handle_editor_simulation_periodic_tick()
+        
+        self._run_event_loop_until_idle()
+        
+        
+        return
+        
+        
+    # resolves and removes every waiter in the given list
+    def _resolve_waiters(self, waiters):
+        resolved_waiters = list(waiters)
+        waiters.clear()
+        
+        for waiter in resolved_waiters:
+            if(waiter.done() == False):
+                waiter.set_result(None)
+                
+                
+        return
+        
+        
+    # runs the event loop until every callback that is ready, including expired timeouts and the task steps
+    # they wake up in turn, has run, then returns
+    def _run_event_loop_until_idle(self):
+        if(self._event_loop.is_running() == True or self._event_loop.is_closed() == True):
+            return
+            
+        for iteration in range(self.c_max_event_loop_iterations_per_run):
+            self._event_loop.call_soon(self._event_loop.stop)
+            number_of_scheduled_callbacks = self._event_loop.get_number_of_scheduled_callbacks()
+            self._event_loop.run_forever()
+            
+            # the iteration ran every callback that was ready, it is idle unless those scheduled new ones
+            if(self._event_loop.get_number_of_scheduled_callbacks() == number_of_scheduled_callbacks):
+                break
+                
+                
+        return
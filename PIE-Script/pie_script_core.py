@@ -0,0 +1,1768 @@
+from pie_script_protocol import PIEScriptFrameCodec, PIEScriptReceiveRingBuffer, PIEScriptStreamDecoder
+from pie_script_instrumentation import PIEScriptInstrumentation
+
+import time
+import socket
+import logging
+import threading
+import selectors
+import contextlib
+import collections
+
+
+# log messages of the core go through the standard logging module, the editor adapter forwards them to the output log
+c_logger = logging.getLogger("pie_script")
+
+
+# decorator registering a PIE Script method as the handler of a message type, the method is called with the
+# message's payload string when b_has_payload is true and without arguments otherwise. message_type is a message
+# string, or the name of the attribute holding it when the string is only known at runtime, e.g.
+# 'c_runtime_message_beginplay'. subclasses overriding a decorated method keep handling its message type.
+def pie_script_message_handler(message_type, b_has_payload=False):
+    def register_message_handler(handler_function):
+        handler_function._pie_script_message_handlers = getattr(handler_function, "_pie_script_message_handlers", ()) + ((message_type, b_has_payload),)
+        
+        
+        return handler_function
+        
+        
+    return register_message_handler
+
+
+# thread-safe first-in first-out queue that hands received messages from the listen thread to the main thread.
+# appending and popping from opposite ends of a deque is atomic, so no lock is needed for a single producer and
+# consumer. records the queue depth and how long messages wait before they are dispatched, into the given
+# histogram as well when there is one.
+class PIEScriptMessageQueue():
+    def __init__(self, wait_duration_histogram=None):
+        self._messages = collections.deque()
+        self._wait_duration_histogram = wait_duration_histogram
+        self.reset_statistics()
+        
+        
+    # get the number of messages waiting to be dequeued
+    def get_number_of_messages(self):
+        return len(self._messages)
+        
+        
+    # discard all waiting messages
+    def clear(self):
+        self._messages.clear()
+        
+        
+    # adds a received message payload to the back of the queue, called from the listen thread
+    def enqueue(self, frame_type, payload):
+        self._messages.append((frame_type, payload, time.perf_counter()))
+        self._total_number_of_enqueued_messages += 1
+        
+        depth = len(self._messages)
+        if(depth > self._max_depth):
+            self._max_depth = depth
+            
+            
+        return
+        
+        
+    # removes the message at the front of the queue, called from the main thread
+    # returns a (frame_type, payload) tuple or None when the queue is empty
+    def dequeue(self):
+        try:
+            frame_type, payload, enqueue_time = self._messages.popleft()
+        except IndexError:
+            return None
+            
+        wait_duration = time.perf_counter() - enqueue_time
+        self._total_number_of_dequeued_messages += 1
+        self._total_wait_duration += wait_duration
+        if(wait_duration > self._max_wait_duration):
+            self._max_wait_duration = wait_duration
+        if(self._wait_duration_histogram is not None):
+            self._wait_duration_histogram.record(wait_duration)
+        
+        
+        return (frame_type, payload)
+        
+        
+    # clears the recorded queue depth and wait time statistics
+    def reset_statistics(self):
+        self._total_number_of_enqueued_messages = 0
+        self._total_number_of_dequeued_messages = 0
+        self._max_depth = 0
+        self._total_wait_duration = 0.0
+        self._max_wait_duration = 0.0
+        
+        
+    # get the recorded queue depth and wait time statistics, durations are in seconds
+    def get_statistics(self):
+        average_wait_duration = 0.0
+        if(self._total_number_of_dequeued_messages > 0):
+            average_wait_duration = self._total_wait_duration / self._total_number_of_dequeued_messages
+            
+            
+        return {
+            "depth": len(self._messages),
+            "max_depth": self._max_depth,
+            "enqueued": self._total_number_of_enqueued_messages,
+            "dequeued": self._total_number_of_dequeued_messages,
+            "average_wait": average_wait_duration,
+            "max_wait": self._max_wait_duration,
+        }
+        
+        
+# bounded first-in first-out queue of encoded messages waiting to be written to a connection's socket. the main
+# thread enqueues, the listen thread writes the pending bytes, coalescing small messages into one write, and
+# consumes what the socket took. not thread-safe, PIEScriptConnection synchronizes it. records the queue depth,
+# how long messages wait until they are fully written and how often the socket took less than it was given.
+class PIEScriptSendQueue():
+    c_default_capacity = 4 * 1024 * 1024
+    
+    def __init__(self, capacity=c_default_capacity, wait_duration_histogram=None):
+        self._messages = collections.deque()
+        self._capacity = capacity
+        self._number_of_pending_bytes = 0
+        self._head_offset = 0
+        self._wait_duration_histogram = wait_duration_histogram
+        self.reset_statistics()
+        
+        
+    # set the number of pending bytes beyond which enqueueing fails
+    def set_capacity(self, capacity):
+        self._capacity = capacity
+        
+        
+    # get the number of pending bytes beyond which enqueueing fails
+    def get_capacity(self):
+        return self._capacity
+        
+        
+    # get the number of bytes waiting to be written
+    def get_number_of_pending_bytes(self):
+        return self._number_of_pending_bytes
+        
+        
+    # check if every enqueued message has been written
+    def is_empty(self):
+        return len(self._messages) == 0
+        
+        
+    # discard all waiting messages
+    def clear(self):
+        self._messages.clear()
+        self._number_of_pending_bytes = 0
+        self._head_offset = 0
+        
+        
+    # adds encoded message data to the back of the queue
+    # raises BlockingIOError when the data does not fit within the capacity, a message is always accepted by an empty queue
+    # returns True when the queue was empty, meaning the listen thread has to be told there is data to write
+    def enqueue(self, data):
+        b_was_empty = len(self._messages) == 0
+        if(b_was_empty == False and self._number_of_pending_bytes + len(data) > self._capacity):
+            self._total_number_of_overflows += 1
+            raise BlockingIOError("send queue holds '" + str(self._number_of_pending_bytes) + "' pending bytes, enqueueing '" + str(len(data)) + "' more exceeds its capacity of '" + str(self._capacity) + "'")
+            
+        self._messages.append((data, time.perf_counter()))
+        self._number_of_pending_bytes += len(data)
+        self._total_number_of_enqueued_messages += 1
+        if(self._number_of_pending_bytes > self._max_pending_bytes):
+            self._max_pending_bytes = self._number_of_pending_bytes
+            
+            
+        return b_was_empty
+        
+        
+    # get up to the given number of pending bytes from the front of the queue, joining consecutive messages so
+    # they are written at once. the bytes stay queued until consume() is called with the number that was written
+    def peek(self, max_size):
+        if(len(self._messages) == 0):
+            return b""
+            
+        head_data = self._messages[0][0]
+        if(len(self._messages) == 1 or len(head_data) - self._head_offset >= max_size):
+            return memoryview(head_data)[self._head_offset:self._head_offset + max_size]
+            
+        chunks = [memoryview(head_data)[self._head_offset:]]
+        size = len(chunks[0])
+        for message_index in range(1, len(self._messages)):
+            data = self._messages[message_index][0]
+            if(size + len(data) > max_size):
+                break
+            chunks.append(data)
+            size += len(data)
+            
+            
+        return b"".join(chunks)
+        
+        
+    # removes the given number of written bytes from the front of the queue
+    def consume(self, length):
+        self._number_of_pending_bytes -= length
+        self._total_number_of_written_bytes += length
+        
+        while(length > 0):
+            data, enqueue_time = self._messages[0]
+            remaining_length = len(data) - self._head_offset
+            if(length < remaining_length):
+                self._head_offset += length
+                break
+                
+            length -= remaining_length
+            self._messages.popleft()
+            self._head_offset = 0
+            
+            wait_duration = time.perf_counter() - enqueue_time
+            self._total_number_of_written_messages += 1
+            self._total_wait_duration += wait_duration
+            if(wait_duration > self._max_wait_duration):
+                self._max_wait_duration = wait_duration
+            if(self._wait_duration_histogram is not None):
+                self._wait_duration_histogram.record(wait_duration)
+                
+                
+        return
+        
+        
+    # records a write to the socket, partial when the socket took fewer bytes than it was given
+    def record_write(self, b_was_partial):
+        self._total_number_of_writes += 1
+        if(b_was_partial == True):
+            self._total_number_of_partial_writes += 1
+            
+            
+    # clears the recorded queue depth, write and wait time statistics
+    def reset_statistics(self):
+        self._total_number_of_enqueued_messages = 0
+        self._total_number_of_written_messages = 0
+        self._total_number_of_written_bytes = 0
+        self._total_number_of_writes = 0
+        self._total_number_of_partial_writes = 0
+        self._total_number_of_overflows = 0
+        self._max_pending_bytes = 0
+        self._total_wait_duration = 0.0
+        self._max_wait_duration = 0.0
+        
+        
+    # get the recorded queue depth, write and wait time statistics, durations are in seconds
+    def get_statistics(self):
+        average_wait_duration = 0.0
+        if(self._total_number_of_written_messages > 0):
+            average_wait_duration = self._total_wait_duration / self._total_number_of_written_messages
+            
+            
+        return {
+            "depth": len(self._messages),
+            "pending_bytes": self._number_of_pending_bytes,
+            "max_pending_bytes": self._max_pending_bytes,
+            "enqueued": self._total_number_of_enqueued_messages,
+            "written": self._total_number_of_written_messages,
+            "written_bytes": self._total_number_of_written_bytes,
+            "writes": self._total_number_of_writes,
+            "partial_writes": self._total_number_of_partial_writes,
+            "overflows": self._total_number_of_overflows,
+            "average_wait": average_wait_duration,
+            "max_wait": self._max_wait_duration,
+        }
+        
+        
+# a runtime messenger connected to the PIE Script. owns the connection's socket, the stream decoder and queue
+# of messages received from it, the queue of messages waiting to be sent to it, and the frame protocol version agreed with it.
+class PIEScriptConnection():
+    c_max_coalesced_write_size = 64 * 1024
+    
+    def __init__(self, connection_id, client_socket, client_address, receive_buffer_capacity=4096, instrumentation=None, send_queue_capacity=PIEScriptSendQueue.c_default_capacity):
+        self._connection_id = connection_id
+        self._socket = client_socket
+        self._address = client_address
+        self._stream_decoder = PIEScriptStreamDecoder(receive_buffer_capacity)
+        self._instrumentation = instrumentation
+        self._message_queue = PIEScriptMessageQueue(instrumentation.get_histogram("queue_wait") if instrumentation is not None else None)
+        
+        # outbound messages -- written by the listen thread, the socket is shut down once they have been written
+        self._send_queue = PIEScriptSendQueue(send_queue_capacity, instrumentation.get_histogram("send_queue_wait") if instrumentation is not None else None)
+        self._send_lock = threading.Lock()
+        self._b_is_shutdown_pending = False
+        
+        # instrumentation -- a round trip is timed from a sent message to the next message received
+        # the accept, last message and last heartbeat times are what the watchdog tests its timeouts against
+        self._accept_time = time.perf_counter()
+        self._b_has_received_message = False
+        self._last_receive_time = None
+        self._last_heartbeat_time = None
+        self._round_trip_begin_time = None
+        
+        # framing protocol -- messages use the legacy text encoding until the runtime messenger
+        # answers the greeting with a handshake frame, after which both sides exchange frames
+        self._frame_protocol_version = 0
+        self._b_is_open = True
+        self._b_is_kept_open_across_sessions = False
+        
+        # message type and handler of a payload that arrives as its own message after its message type
+        self._expected_payload = None
+        
+        
+    # get the id messages received from this connection are tagged with
+    def get_connection_id(self):
+        return self._connection_id
+        
+        
+    # get the socket connected to the runtime messenger
+    def get_socket(self):
+        return self._socket
+        
+        
+    # get the address of the runtime messenger
+    def get_address(self):
+        return self._address
+        
+        
+    # get the decoder of the bytes received from this connection
+    def get_stream_decoder(self):
+        return self._stream_decoder
+        
+        
+    # get the queue of messages received from this connection waiting to be dispatched
+    def get_message_queue(self):
+        return self._message_queue
+        
+        
+    # get the recorded depth, write and wait time statistics of the queue of messages waiting to be sent
+    def get_send_queue_statistics(self):
+        with self._send_lock:
+            return self._send_queue.get_statistics()
+            
+            
+    # check if messages are waiting to be written to the socket
+    def has_pending_send_data(self):
+        return self._send_queue.is_empty() == False
+        
+        
+    # get the time.perf_counter() timestamp the connection was accepted at
+    def get_accept_time(self):
+        return self._accept_time
+        
+        
+    # check if a message has been received from this connection since it was accepted
+    def has_received_message(self):
+        return self._b_has_received_message
+        
+        
+    # get the time.perf_counter() timestamp the last message was received at, None before the first one
+    def get_last_receive_time(self):
+        return self._last_receive_time
+        
+        
+    # get the time.perf_counter() timestamp the last heartbeat was dispatched at, None before the first one
+    def get_last_heartbeat_time(self):
+        return self._last_heartbeat_time
+        
+        
+    # set the time.perf_counter() timestamp the last heartbeat was dispatched at
+    def set_last_heartbeat_time(self, heartbeat_time):
+        self._last_heartbeat_time = heartbeat_time
+        
+        
+    # get the negotiated frame protocol version, 0 when the legacy text encoding is in use
+    def get_frame_protocol_version(self):
+        return self._frame_protocol_version
+        
+        
+    # set the frame protocol version agreed with the runtime messenger
+    def set_frame_protocol_version(self, version):
+        self._frame_protocol_version = version
+        
+        
+    # check if messages are exchanged using length-prefixed frames
+    def is_using_frame_protocol(self):
+        return self._frame_protocol_version > 0
+        
+        
+    # check if the connection has not been shut down or closed by either side
+    def is_open(self):
+        return self._b_is_open
+        
+        
+    # set whether the connection stays open when a PIE session is stopped, used for connections
+    # that do not belong to a runtime messenger such as a tuning orchestrator
+    def set_kept_open_across_sessions(self, b_is_kept_open):
+        self._b_is_kept_open_across_sessions = b_is_kept_open
+        
+        
+    # check if the connection stays open when a PIE session is stopped
+    def is_kept_open_across_sessions(self):
+        return self._b_is_kept_open_across_sessions
+        
+        
+    # check if a message type and its payload can be sent in a single typed message frame
+    def is_using_typed_messages(self):
+        return self._frame_protocol_version >= PIEScriptFrameCodec.c_typed_message_protocol_version
+        
+        
+    # set the message type and handler of the payload the next message received from this connection is,
+    # for payloads that arrive as their own message after their message type
+    def set_expected_payload(self, message_type, handler):
+        self._expected_payload = (message_type, handler)
+        
+        
+    # get the message type the next message received from this connection is the payload of, None when no payload is expected
+    def get_expected_payload_message_type(self):
+        expected_payload = self._expected_payload
+        if(expected_payload is None):
+            return None
+            
+            
+        return expected_payload[0]
+        
+        
+    # removes the expected payload, returns its (message_type, handler) tuple or None when no payload is expected
+    def pop_expected_payload(self):
+        expected_payload = self._expected_payload
+        self._expected_payload = None
+        
+        
+        return expected_payload
+        
+        
+    # encodes a message string using the legacy text encoding or the negotiated frame protocol
+    def encode_message(self, msg):
+        if(self.is_using_frame_protocol() == True):
+            return PIEScriptFrameCodec.encode_message_frame(msg, self._frame_protocol_version)
+            
+            
+        return msg.encode()
+        
+        
+    # queues a message string to be sent to the runtime messenger
+    # raises BlockingIOError when the send queue is full, returns True when the listen thread has to be woken to write it
+    def send_message(self, msg):
+        return self.send_data(self.encode_message(msg))
+        
+        
+    # queues a message type and its payload string to be sent to the runtime messenger, in a single typed message frame
+    # when the negotiated frame protocol supports it, otherwise as the message type followed by the payload
+    # raises BlockingIOError when the send queue is full, returns True when the listen thread has to be woken to write it
+    def send_typed_message(self, message_type, payload):
+        if(self.is_using_typed_messages() == False):
+            b_needs_wakeup = self.send_message(message_type)
+            return self.send_message(payload) or b_needs_wakeup
+            
+            
+        return self.send_data(PIEScriptFrameCodec.encode_typed_message_frame(message_type, payload, self._frame_protocol_version))
+        
+        
+    # queues encoded message data to be written to the socket and records it in the instrumentation
+    # raises BlockingIOError when the send queue is full, returns True when the listen thread has to be woken to write it
+    def send_data(self, data):
+        with self._send_lock:
+            b_was_empty = self._send_queue.enqueue(data)
+            
+            # the listen thread ends the round trip, both sides hold the send lock while they touch its begin time
+            if(self._instrumentation is not None and self._round_trip_begin_time is None):
+                self._round_trip_begin_time = time.perf_counter()
+        
+        if(self._instrumentation is not None):
+            self._instrumentation.count("messages_sent")
+                
+                
+        return b_was_empty
+        
+        
+    # writes as much of the queued data to the non-blocking socket as it takes, small messages coalesced into
+    # one write. data the socket did not take stays queued for when it becomes writable. called by the listen thread
+    # returns True when data is still waiting to be written
+    def flush_send_queue(self):
+        while(True):
+            with self._send_lock:
+                data = self._send_queue.peek(PIEScriptConnection.c_max_coalesced_write_size)
+            if(len(data) == 0):
+                break
+                
+            try:
+                written_length = self._socket.send(data)
+            except BlockingIOError:
+                written_length = 0
+                
+            with self._send_lock:
+                self._send_queue.record_write(written_length < len(data))
+                self._send_queue.consume(written_length)
+                
+            if(self._instrumentation is not None):
+                self._instrumentation.count("bytes_sent", written_length)
+                self._instrumentation.count("send_writes")
+                if(written_length < len(data)):
+                    self._instrumentation.count("send_partial_writes")
+                    
+            # the socket buffer is full, wait until the socket is writable again
+            if(written_length < len(data)):
+                break
+                
+        with self._send_lock:
+            b_has_pending_data = self._send_queue.is_empty() == False
+            if(b_has_pending_data == False and self._b_is_shutdown_pending == True):
+                self._b_is_shutdown_pending = False
+                self._shutdown_socket()
+                
+                
+        return b_has_pending_data
+        
+        
+    # records the arrival of a message for the watchdog and in the instrumentation, called from the listen thread
+    def record_received_message(self):
+        receive_time = time.perf_counter()
+        self._last_receive_time = receive_time
+        
+        if(self._instrumentation is None):
+            self._b_has_received_message = True
+            return
+            
+        self._instrumentation.count("messages_received")
+        
+        if(self._b_has_received_message == False):
+            self._b_has_received_message = True
+            self._instrumentation.get_phase_histogram("first_message").record(receive_time - self._accept_time)
+            
+        # the main thread begins round trips when it sends, take the begin time under the send lock. without a
+        # round trip under way there is nothing to take, a send racing this check ends on the next message
+        round_trip_begin_time = None
+        if(self._round_trip_begin_time is not None):
+            with self._send_lock:
+                round_trip_begin_time = self._round_trip_begin_time
+                self._round_trip_begin_time = None
+            
+        if(round_trip_begin_time is not None):
+            self._instrumentation.get_histogram("message_round_trip").record(receive_time - round_trip_begin_time)
+            
+            
+        return
+        
+        
+    # shuts down the connection, the listen thread closes its socket once it notices. messages waiting to be sent
+    # are written first unless b_discard_pending_data is true
+    def shutdown(self, b_discard_pending_data=False):
+        self._b_is_open = False
+        
+        with self._send_lock:
+            if(b_discard_pending_data == True):
+                self._send_queue.clear()
+                
+            if(self._send_queue.is_empty() == False):
+                self._b_is_shutdown_pending = True
+                return
+                
+            self._shutdown_socket()
+            
+            
+        return
+        
+        
+    # closes the socket of the connection, called by the listen thread
+    def close(self):
+        self._b_is_open = False
+        self._socket.close()
+        
+        
+    # shuts down both directions of the socket
+    def _shutdown_socket(self):
+        try:
+            self._socket.shutdown(socket.SHUT_RDWR)
+        except OSError:
+            # the runtime messenger has already disconnected
+            pass
+            
+            
+        return
+        
+        
+# socket server, stream decoder, message queues and dispatcher of PIE Script, without any dependency on the
+# unreal module. it accepts runtime messengers, decodes what they send on a listen thread and dispatches it to
+# receive_message() whenever dispatch_pending_received_messages() is called, so it runs and can be profiled
+# outside of the editor. PIEScript in pie_script.py adapts it to the editor's PIE sessions, timers and delegates.
+class PIEScriptCore():
+    c_default_socket_address = "127.0.0.1"
+    c_default_socket_port = 0
+    
+    # names of the watchdog timeouts
+    c_watchdog_timeout_connect = "connect"
+    c_watchdog_timeout_first_message = "first_message"
+    c_watchdog_timeout_message = "message"
+    c_watchdog_timeout_race = "race"
+
+    def __init__(self):
+    
+        # socket connection, port 0 binds any free port and is replaced by the bound port once listening
+        self.c_ip_address = PIEScriptCore.c_default_socket_address
+        self.c_port = PIEScriptCore.c_default_socket_port
+        self.c_server_address = (self.c_ip_address, self.c_port)
+        self._socket = None
+        self.c_listen_backlog = 8
+        
+        # connected runtime messengers by connection id, the listen thread adds connections and
+        # the main thread removes them once they are closed and their received messages are dispatched
+        self._connections = {}
+        self._connections_lock = threading.Lock()
+        self._next_connection_id = 1
+        self._connection_context = threading.local()
+        
+        # message listening thread
+        self._listen_thread = None
+        self._b_continue_listen_thread = False
+        self._listen_thread_wakeup_receiver = None
+        self._listen_thread_wakeup_sender = None
+        self.c_listen_thread_join_timeout = 2.0
+        self._listen_buffer_size = 32
+        self._b_use_zero_copy_receive = True
+        self._message_dispatch_time_budget = 0.005
+        
+        # outbound messages are queued per connection and written by the listen thread, sends made within
+        # coalesce_sends() wake it once at the end instead of for every message
+        self._send_queue_capacity = PIEScriptSendQueue.c_default_capacity
+        self._send_coalescing_depth = 0
+        self._b_has_coalesced_sends = False
+        
+        # phase timers, latency histograms and byte and message counters
+        self._instrumentation = PIEScriptInstrumentation()
+        
+        # watchdog -- timeouts in seconds, None disables one. a PIE session is timed from start() until a runtime
+        # messenger connects, a race from begin play until end play, connections from their accept or last message
+        self._watchdog_timeouts = {
+            PIEScriptCore.c_watchdog_timeout_connect: None,
+            PIEScriptCore.c_watchdog_timeout_first_message: None,
+            PIEScriptCore.c_watchdog_timeout_message: None,
+            PIEScriptCore.c_watchdog_timeout_race: None,
+        }
+        self._watchdog_session_start_time = None
+        self._race_begin_time = None
+        self._race_connection_id = None
+        
+        # message handlers by message type, built from the decorated methods and register_message_handler()
+        # calls on the first dispatch after a change. None masks a decorated handler that was unregistered
+        self._registered_message_handlers = {}
+        self._message_handler_table = None
+        
+        # message type constants - the editor adapter replaces them with the ones the PIE Script plugin defines
+        self.c_socket_message_heartbeat = "PIEScriptHeartbeat"
+        self.c_socket_message_greeting = "PIEScriptGreeting"
+        self.c_socket_message_goodbye = "PIEScriptGoodbye"
+        self.c_runtime_message_beginplay = "PIEScriptBeginPlay"
+        self.c_runtime_message_endplay = "PIEScriptEndPlay"
+        self.c_runtime_message_set_random_seed = "PIEScriptSetRandomSeed"
+        self.c_runtime_message_set_fixed_timestep = "PIEScriptSetFixedTimestep"
+        self.c_runtime_message_set_time_dilation = "PIEScriptSetTimeDilation"
+        
+        # simulation settings sent to the runtime messenger on begin play, None leaves a setting to the runtime
+        self._random_seed = None
+        self._fixed_timestep = None
+        self._time_dilation = None
+        
+    def __del__(self):
+        self.close()
+            
+            
+    # set the address and port the server socket is bound to the next time it is opened
+    def set_server_address(self, ip_address, port):
+        self.c_ip_address = ip_address
+        self.c_port = port
+        self.c_server_address = (self.c_ip_address, self.c_port)
+        
+        
+    # get number of received messages waiting in the message queues of all connections
+    def get_number_of_pending_received_messages(self):
+        return sum(connection.get_message_queue().get_number_of_messages() for connection in self._get_connections())
+        
+        
+    # get queue depth and wait time statistics of the received message queue of the given connection,
+    # or combined over all connections when connection_id is None. durations are in seconds
+    def get_message_queue_statistics(self, connection_id=None):
+        if(connection_id is not None):
+            connection = self.get_connection(connection_id)
+            if(connection is None):
+                return None
+                
+            return connection.get_message_queue().get_statistics()
+            
+        statistics = {"depth": 0, "max_depth": 0, "enqueued": 0, "dequeued": 0, "average_wait": 0.0, "max_wait": 0.0}
+        for connection in self._get_connections():
+            connection_statistics = connection.get_message_queue().get_statistics()
+            statistics["average_wait"] += connection_statistics["average_wait"] * connection_statistics["dequeued"]
+            for key in ("depth", "enqueued", "dequeued"):
+                statistics[key] += connection_statistics[key]
+            for key in ("max_depth", "max_wait"):
+                statistics[key] = max(statistics[key], connection_statistics[key])
+                
+        if(statistics["dequeued"] > 0):
+            statistics["average_wait"] /= statistics["dequeued"]
+            
+            
+        return statistics
+        
+        
+    # get the instrumentation recording phase durations, message latencies and throughput.
+    # phases are 'first_message', 'race', the editor adapter's 'pie_start', 'client_accept' and 'end_play_to_ended' and subclass phases,
+    # histograms are 'message_round_trip', 'queue_wait' and 'send_queue_wait', counters are 'bytes_received', 'bytes_sent',
+    # 'messages_received', 'messages_sent', 'send_writes', 'send_partial_writes', 'send_queue_overflows', 'watchdog_timeouts'
+    # and 'watchdog_<timeout name>_timeouts'
+    def get_instrumentation(self):
+        return self._instrumentation
+        
+        
+    # get a snapshot of every phase duration, latency histogram, counter and rate, durations are in seconds
+    def get_instrumentation_report(self):
+        return self._instrumentation.get_report()
+        
+        
+    # writes the instrumentation report as JSON to the given file
+    def export_instrumentation_report(self, file_path):
+        self._instrumentation.export(file_path)
+        
+        
+    # set the time in milliseconds the main thread may spend dispatching received messages per periodic tick
+    # at least one pending message is dispatched every tick regardless of the budget
+    def set_message_dispatch_time_budget(self, budget_ms):
+        self._message_dispatch_time_budget = budget_ms / 1000.0
+        
+        
+    # get the time in milliseconds the main thread may spend dispatching received messages per periodic tick
+    def get_message_dispatch_time_budget(self):
+        return self._message_dispatch_time_budget * 1000.0
+        
+        
+    # set the seed the runtime messenger seeds random number generation with on begin play, None leaves it unseeded
+    def set_random_seed(self, seed):
+        self._random_seed = seed
+        
+        
+    # get the seed the runtime messenger seeds random number generation with on begin play, None when unseeded
+    def get_random_seed(self):
+        return self._random_seed
+        
+        
+    # set the fixed time step in seconds the runtime messenger makes the simulation advance by every frame,
+    # None keeps the variable frame time
+    def set_fixed_timestep(self, timestep):
+        self._fixed_timestep = timestep
+        
+        
+    # get the fixed time step in seconds of the simulation, None with a variable frame time
+    def get_fixed_timestep(self):
+        return self._fixed_timestep
+        
+        
+    # set the global time dilation the runtime messenger applies on begin play, None keeps real time
+    def set_time_dilation(self, time_dilation):
+        self._time_dilation = time_dilation
+        
+        
+    # get the global time dilation applied on begin play, None for real time
+    def get_time_dilation(self):
+        return self._time_dilation
+        
+        
+    # sends the configured random seed, fixed time step and time dilation to the runtime messenger
+    # called on begin play, call again to re-apply them when a simulation is restarted in place
+    def send_simulation_settings(self, connection_id=None):
+        if(self._random_seed is not None):
+            self.send_typed_message(self.c_runtime_message_set_random_seed, str(self._random_seed), connection_id)
+            
+        if(self._fixed_timestep is not None):
+            self.send_typed_message(self.c_runtime_message_set_fixed_timestep, repr(float(self._fixed_timestep)), connection_id)
+            
+        if(self._time_dilation is not None):
+            self.send_typed_message(self.c_runtime_message_set_time_dilation, repr(float(self._time_dilation)), connection_id)
+            
+            
+        return
+        
+        
+    # get the frame protocol version negotiated with the given connection, 0 when the legacy text encoding is in use
+    def get_frame_protocol_version(self, connection_id=None):
+        connection = self._resolve_connection(connection_id)
+        if(connection is None):
+            return 0
+            
+            
+        return connection.get_frame_protocol_version()
+        
+        
+    # check if messages are exchanged with the given connection using length-prefixed frames
+    def is_using_frame_protocol(self, connection_id=None):
+        return self.get_frame_protocol_version(connection_id) > 0
+        
+        
+    # get the ids of all open runtime messenger connections
+    def get_connection_ids(self):
+        return [connection.get_connection_id() for connection in self._get_connections() if connection.is_open() == True]
+        
+        
+    # get the connection with the given id, or None if there is none
+    def get_connection(self, connection_id):
+        with self._connections_lock:
+            return self._connections.get(connection_id)
+            
+            
+    # get the id of the connection whose message is being handled or that was just accepted on the calling thread,
+    # None outside of message and connection handlers
+    def get_current_connection_id(self):
+        connection = getattr(self._connection_context, "connection", None)
+        if(connection is None):
+            return None
+            
+            
+        return connection.get_connection_id()
+        
+
+    # set the number of bytes that may wait to be sent to a connection before it counts as stalled and is
+    # disconnected, applies to connections accepted afterwards
+    def set_send_queue_capacity(self, capacity):
+        self._send_queue_capacity = capacity
+        
+        
+    # get the number of bytes that may wait to be sent to a connection before it is disconnected
+    def get_send_queue_capacity(self):
+        return self._send_queue_capacity
+        
+        
+    # get the recorded depth, write and wait time statistics of the send queue of the given connection,
+    # or of the send queues of all connections combined when connection_id is None. durations are in seconds
+    def get_send_queue_statistics(self, connection_id=None):
+        if(connection_id is not None):
+            connection = self.get_connection(connection_id)
+            if(connection is None):
+                return None
+                
+            return connection.get_send_queue_statistics()
+            
+        statistics = {"depth": 0, "pending_bytes": 0, "max_pending_bytes": 0, "enqueued": 0, "written": 0, "written_bytes": 0, "writes": 0, "partial_writes": 0, "overflows": 0, "average_wait": 0.0, "max_wait": 0.0}
+        for connection in self._get_connections():
+            connection_statistics = connection.get_send_queue_statistics()
+            statistics["average_wait"] += connection_statistics["average_wait"] * connection_statistics["written"]
+            for key in ("depth", "pending_bytes", "enqueued", "written", "written_bytes", "writes", "partial_writes", "overflows"):
+                statistics[key] += connection_statistics[key]
+            for key in ("max_pending_bytes", "max_wait"):
+                statistics[key] = max(statistics[key], connection_statistics[key])
+                
+        if(statistics["written"] > 0):
+            statistics["average_wait"] /= statistics["written"]
+            
+            
+        return statistics
+        
+        
+    # messages sent within a with statement are written together once it ends, in as few writes as possible
+    # instead of waking the listen thread for every message. dispatch_pending_received_messages() uses it
+    @contextlib.contextmanager
+    def coalesce_sends(self):
+        self._send_coalescing_depth += 1
+        try:
+            yield
+        finally:
+            self._send_coalescing_depth -= 1
+            if(self._send_coalescing_depth == 0 and self._b_has_coalesced_sends == True):
+                self._b_has_coalesced_sends = False
+                self._wake_listen_thread()
+
+
+    # set the watchdog timeouts in seconds, None disables a timeout
+    #   connect_timeout - from start() until a runtime messenger connects
+    #   first_message_timeout - from a connection being accepted until its first message
+    #   message_timeout - from the last message of a connection, heartbeats included, until the next one
+    #   race_timeout - from begin play until end play
+    def set_watchdog_timeouts(self, connect_timeout=None, first_message_timeout=None, message_timeout=None, race_timeout=None):
+        self._watchdog_timeouts[PIEScriptCore.c_watchdog_timeout_connect] = connect_timeout
+        self._watchdog_timeouts[PIEScriptCore.c_watchdog_timeout_first_message] = first_message_timeout
+        self._watchdog_timeouts[PIEScriptCore.c_watchdog_timeout_message] = message_timeout
+        self._watchdog_timeouts[PIEScriptCore.c_watchdog_timeout_race] = race_timeout
+        
+        
+    # get the watchdog timeouts in seconds by timeout name, None when a timeout is disabled
+    def get_watchdog_timeouts(self):
+        return dict(self._watchdog_timeouts)
+        
+        
+    # get the number of times the watchdog timed out, of the timeout with the given name or of all of them when None
+    def get_number_of_watchdog_timeouts(self, timeout_name=None):
+        if(timeout_name is None):
+            return self._instrumentation.get_counter("watchdog_timeouts")
+            
+            
+        return self._instrumentation.get_counter("watchdog_" + timeout_name + "_timeouts")
+        
+        
+    # starts timing a race for the race phase and the race watchdog timeout, called on begin play and by
+    # subclasses restarting a race in place
+    def begin_race_phase(self):
+        self._race_begin_time = time.perf_counter()
+        self._race_connection_id = self.get_current_connection_id()
+        self._instrumentation.begin_phase("race")
+        
+        
+    # stops timing a race and records its duration in the race phase
+    def end_race_phase(self):
+        self._race_begin_time = None
+        self._instrumentation.end_phase("race")
+        
+        
+    # tests the watchdog timeouts and calls handle_watchdog_timeout() for the first one that expired
+    # returns the name of the expired timeout, None when none did. the editor adapter calls it every periodic tick,
+    # outside of the editor call it from the loop driving the core
+    def check_watchdog(self):
+        now = time.perf_counter()
+        
+        connect_timeout = self._watchdog_timeouts[PIEScriptCore.c_watchdog_timeout_connect]
+        session_start_time = self._watchdog_session_start_time
+        if(connect_timeout is not None and session_start_time is not None and now - session_start_time >= connect_timeout):
+            return self._expire_watchdog_timeout(PIEScriptCore.c_watchdog_timeout_connect, None, now - session_start_time)
+            
+        race_timeout = self._watchdog_timeouts[PIEScriptCore.c_watchdog_timeout_race]
+        race_begin_time = self._race_begin_time
+        if(race_timeout is not None and race_begin_time is not None and now - race_begin_time >= race_timeout):
+            return self._expire_watchdog_timeout(PIEScriptCore.c_watchdog_timeout_race, self._race_connection_id, now - race_begin_time)
+            
+        first_message_timeout = self._watchdog_timeouts[PIEScriptCore.c_watchdog_timeout_first_message]
+        message_timeout = self._watchdog_timeouts[PIEScriptCore.c_watchdog_timeout_message]
+        for connection in self._get_connections():
+            # connections that outlive PIE sessions, such as an orchestrator's, are not runtime messengers
+            if(connection.is_open() == False or connection.is_kept_open_across_sessions() == True):
+                continue
+                
+            last_receive_time = connection.get_last_receive_time()
+            if(last_receive_time is None):
+                if(first_message_timeout is not None and now - connection.get_accept_time() >= first_message_timeout):
+                    return self._expire_watchdog_timeout(PIEScriptCore.c_watchdog_timeout_first_message, connection.get_connection_id(), now - connection.get_accept_time())
+            elif(message_timeout is not None and now - last_receive_time >= message_timeout):
+                return self._expire_watchdog_timeout(PIEScriptCore.c_watchdog_timeout_message, connection.get_connection_id(), now - last_receive_time)
+                
+                
+        return None
+        
+        
+    # overridable handler called when a watchdog timeout expired, the PIE session is presumed hung
+    # connection_id is the id of the connection that timed out, None for the connect timeout.
+    # force stops the PIE session, subclasses restart it or move on to the next simulation once it has ended
+    def handle_watchdog_timeout(self, timeout_name, connection_id):
+        self.force_stop()
+        
+        
+        return
+        
+        
+    # set the listen thread receive message buffer size
+    def set_listen_buffer_size(self, size):
+        self._listen_buffer_size = size
+        
+        
+    # enable / disable reading socket data directly into the stream decoder's reusable receive buffer
+    # instead of allocating new bytes objects for every read
+    def set_zero_copy_receive_enabled(self, b_enabled):
+        self._b_use_zero_copy_receive = b_enabled
+        
+        
+    # check if socket data is read directly into the stream decoder's reusable receive buffer
+    def is_zero_copy_receive_enabled(self):
+        return self._b_use_zero_copy_receive
+        
+
+     # check if this PIE script has a bound socket and at least one connected runtime messenger
+    def is_socket_connected(self):
+        return self._socket is not None and len(self.get_connection_ids()) > 0
+
+
+    # check if this PIE script has a background thread that is actively listening for client messages
+    def is_listening_for_messages(self):
+        return self._b_continue_listen_thread is True and self._listen_thread is not None
+
+
+    # call to start listening for the runtime messenger and launch the simulation it runs in
+    def start(self):
+        self._begin_pie_session()
+        
+        
+        return
+        
+    
+    # call to open the server socket and accept connections without launching a PIE session
+    def start_listening(self):
+    
+        # the server socket and listen thread are created once and reused by every following PIE session
+        if(self._socket is None):
+            self._open_server_socket()
+        
+        # start background thread to wait for clients and listen for messages from them
+        if(self.is_listening_for_messages() == False):
+            self._start_listen_thread()
+            
+            
+        return
+        
+    
+    # call to send the goodbye message to the runtime messenger and end the PIE Script
+    def stop(self):
+    
+        # send goodbye message
+        #if(self.is_socket_connected()):
+        #    self.send_message(self.c_socket_message_goodbye)
+            
+        self.force_stop()
+        
+        
+        return
+        
+    
+    # forces the PIE Script to end immediately
+    # the server socket stays open and waits for the runtime messengers of the next PIE session
+    def force_stop(self):
+        # disconnect clients
+        connection_ids = [connection_id for connection_id in self.get_connection_ids() if self.get_connection(connection_id).is_kept_open_across_sessions() == False]
+        if(len(connection_ids) == 0):
+            c_logger.warning("no connected client")
+        
+        for connection_id in connection_ids:
+            self.disconnect_client(connection_id)
+            
+        # the stopped session and its race are no longer watched
+        self._watchdog_session_start_time = None
+        self._race_begin_time = None
+        self._instrumentation.cancel_phase("race")
+            
+        # end the PIE session
+        self._stop_pie_session()
+        
+        
+        return
+        
+        
+    # closes the server socket and stops listening for messages, the next call to start() opens a new server socket
+    def close(self):
+        # stop listening for messages before closing the sockets the listen thread is waiting on
+        if(self.is_listening_for_messages()):
+            self._stop_listen_thread()
+            
+        with self._connections_lock:
+            for connection in self._connections.values():
+                if(connection.is_open() == True):
+                    connection.close()
+            self._connections = {}
+            
+        if(self._socket is not None):
+            self._socket.close()
+            self._socket = None
+            
+            
+        return
+        
+        
+    # disconnects the runtime messenger with the given connection id and discards its pending received messages
+    def disconnect_client(self, connection_id):
+        connection = self.get_connection(connection_id)
+        if(connection is None or connection.is_open() == False):
+            c_logger.warning("no connected client with connection id '" + str(connection_id) + "'")
+            return
+            
+        connection.shutdown()
+        connection.get_message_queue().clear()
+        self._wake_listen_thread()
+        
+        
+        return
+        
+        
+    # call to send a message to a PIE Script Messenger in a live PIE session
+    # sends to the given connection, or when connection_id is None to the connection whose message is being handled,
+    # or otherwise to the first connected messenger
+    def send_message(self, msg, connection_id=None):
+        self._send_to_connection(connection_id, msg, None)
+        
+        
+        return
+        
+        
+    # call to send a message type and its payload string to a PIE Script Messenger in a live PIE session, in a
+    # single typed message frame when the connection supports it, otherwise as the message type followed by the payload
+    # sends to the same connection send_message() would
+    def send_typed_message(self, message_type, payload, connection_id=None):
+        self._send_to_connection(connection_id, message_type, payload)
+        
+        
+        return
+        
+        
+    # sends a message, or a message type and its payload when payload is not None, to the resolved connection
+    def _send_to_connection(self, connection_id, msg, payload):
+        connection = self._resolve_connection(connection_id)
+        
+        if(self._socket is not None and connection is not None and connection.is_open() == True):
+            try:
+                if(payload is None):
+                    b_needs_wakeup = connection.send_message(msg)
+                else:
+                    b_needs_wakeup = connection.send_typed_message(msg, payload)
+                #c_logger.info("sent '" + msg + "'")
+                
+                # the listen thread writes the queued message
+                if(b_needs_wakeup == True):
+                    if(self._send_coalescing_depth > 0):
+                        self._b_has_coalesced_sends = True
+                    else:
+                        self._wake_listen_thread()
+            except BlockingIOError as bioe:
+                # the runtime messenger stopped reading, drop it instead of queueing without bound
+                c_logger.error("client '" + str(connection.get_connection_id()) + "' is not keeping up, disconnecting it:\n" + str(bioe))
+                self._instrumentation.count("send_queue_overflows")
+                connection.shutdown(b_discard_pending_data=True)
+                connection.get_message_queue().clear()
+                self._wake_listen_thread()
+            except Exception as e:
+                c_logger.error("exception:\n" + str(e) + "")
+        else:
+            c_logger.error("not connected to socket, failed to send '" + msg + "'")
+        
+        
+        return
+        
+        
+    # call to send a message to every connected PIE Script Messenger
+    def broadcast_message(self, msg):
+        for connection_id in self.get_connection_ids():
+            self.send_message(msg, connection_id)
+            
+            
+        return
+        
+        
+    # registers the given callable as the handler of the given message type, replacing any handler it had.
+    # the handler is called with the message's payload string when b_has_payload is true and without arguments
+    # otherwise. message_type is a message string or the name of the attribute holding it, see pie_script_message_handler()
+    def register_message_handler(self, message_type, handler, b_has_payload=False):
+        self._registered_message_handlers[message_type] = (handler, b_has_payload)
+        self.refresh_message_handlers()
+        
+        
+    # unregisters the handler of the given message type, including a decorated one
+    def unregister_message_handler(self, message_type):
+        self._registered_message_handlers[message_type] = None
+        self.refresh_message_handlers()
+        
+        
+    # get the handler of the given message string, None when it has none
+    def get_message_handler(self, msg):
+        handler_entry = self._get_message_handler_table().get(msg)
+        if(handler_entry is None):
+            return None
+            
+            
+        return handler_entry[0]
+        
+        
+    # rebuilds the message handler table on the next dispatch, call after changing a message type constant
+    def refresh_message_handlers(self):
+        self._message_handler_table = None
+        
+        
+    # get the message type the next message received from the given connection is expected to be the payload of,
+    # None when no payload is expected. connection_id None resolves the connection like send_message() does
+    def get_expected_payload_message_type(self, connection_id=None):
+        connection = self._resolve_connection(connection_id)
+        if(connection is None):
+            return None
+            
+            
+        return connection.get_expected_payload_message_type()
+        
+        
+    # overridable handler for when a message is received from a PIE Script Messenger in a live PIE session
+    # called with every received message after its registered handler, if any, with b_was_handled true when it had one.
+    # typed messages are passed as their message type followed by their payload, like the legacy text encoding sends them
+    def receive_message(self, msg, b_was_handled):
+        #c_logger.info("received '" + msg + "'")
+        
+        
+        return
+        
+        
+    # looks up the handler of a received message and calls it, then passes the message on to receive_message()
+    # a payload sent after its message type as a separate message goes to the handler of the message type
+    def dispatch_received_message(self, connection, frame_type, payload):
+        msg, message_payload = PIEScriptStreamDecoder.decode_typed_message(frame_type, payload)
+        
+        expected_payload = connection.pop_expected_payload()
+        if(expected_payload is not None):
+            expected_payload[1](msg)
+            self.receive_message(msg, True)
+            return
+            
+        handler_entry = self._get_message_handler_table().get(msg)
+        if(handler_entry is not None):
+            handler, b_has_payload = handler_entry
+            if(b_has_payload == False):
+                handler()
+            elif(message_payload is not None):
+                handler(message_payload)
+            else:
+                connection.set_expected_payload(msg, handler)
+                
+        self.receive_message(msg, handler_entry is not None)
+        if(message_payload is not None):
+            self.receive_message(message_payload, handler_entry is not None)
+            
+            
+        return
+        
+        
+    # handler for the begin play message, times the race phase
+    @pie_script_message_handler("c_runtime_message_beginplay")
+    def _receive_begin_play(self):
+        self.begin_race_phase()
+        self.handle_begin_play()
+        
+        
+    # handler for the end play message, times the race phase
+    @pie_script_message_handler("c_runtime_message_endplay")
+    def _receive_end_play(self):
+        self.end_race_phase()
+        self.handle_end_play()
+        
+        
+    # handler for the heartbeat message, records it for the watchdog
+    @pie_script_message_handler("c_socket_message_heartbeat")
+    def _receive_socket_heartbeat(self):
+        connection = self._resolve_connection(None)
+        if(connection is not None):
+            connection.set_last_heartbeat_time(time.perf_counter())
+            
+        self.handle_socket_heartbeat()
+        
+   
+    # overridable handler for when the begin play message is received
+    # from a PIE Script Messenger in a live PIE session
+    def handle_begin_play(self):
+        #c_logger.info("begin play received")
+        
+        self.send_simulation_settings()
+        
+        
+        return
+        
+        
+    # overridable handler for when the end play message is received
+    # from a PIE Script Messenger in a live PIE session
+    def handle_end_play(self):
+        #c_logger.info("end play received")
+        
+        # stop the pie script
+        self.stop()
+        
+        return
+    
+    
+    # overridable handler called when a client connection is accepted
+    # get_current_connection_id() returns the id of the accepted connection
+    def handle_accepted_client_connection(self):
+        connection = self._resolve_connection(None)
+        c_logger.info("client '" + str(connection.get_connection_id()) + "' connected at address '" + str(connection.get_address()) + "'")
+        
+        # every connection starts out using the legacy text encoding, the greeting invites
+        # the runtime messenger to answer with a handshake frame if it supports framing
+        self.send_message(self.c_socket_message_greeting)
+        
+        
+        return
+        
+        
+    # overridable handler called when a client connection has been closed by the runtime messenger
+    # called on the listen thread, get_current_connection_id() returns the id of the closed connection
+    def handle_closed_client_connection(self):
+        connection = self._resolve_connection(None)
+        c_logger.info("client '" + str(connection.get_connection_id()) + "' at address '" + str(connection.get_address()) + "' disconnected")
+        
+        
+        return
+        
+    
+    # overridable handler called when a client connection sends a heartbeat
+    def handle_socket_heartbeat(self):
+        # anything todo ?
+        
+    
+        return
+        
+    
+    # dispatches pending received messages in the order they arrived, taking turns between connections,
+    # until every queue is empty or the per tick dispatch time budget is spent. the editor adapter calls it
+    # every periodic tick, outside of the editor call it from the loop driving the core
+    # messages sent by the handlers are coalesced and written by the listen thread after the last one returns
+    def dispatch_pending_received_messages(self):
+        # replies sent by the handlers are written together once dispatching is done
+        with self.coalesce_sends():
+            dispatch_deadline = time.perf_counter() + self._message_dispatch_time_budget
+            b_has_dispatched_message = True
+        
+            while(b_has_dispatched_message == True):
+                b_has_dispatched_message = False
+            
+                for connection in self._get_connections():
+                    message = connection.get_message_queue().dequeue()
+                    if(message is None):
+                        # closed connections are forgotten once all of their messages have been dispatched
+                        if(connection.is_open() == False):
+                            self._remove_connection(connection)
+                        continue
+                    
+                    b_has_dispatched_message = True
+                    frame_type, payload = message
+                
+                    self._connection_context.connection = connection
+                    try:
+                        self.dispatch_received_message(connection, frame_type, payload)
+                    finally:
+                        self._connection_context.connection = None
+                
+                    if(time.perf_counter() >= dispatch_deadline):
+                        return
+                    
+                    
+        return
+        
+        
+    # get the message handler table, mapping message strings to (handler, b_has_payload) tuples
+    # built from the decorated methods of every class of this script, then the registered handlers
+    def _get_message_handler_table(self):
+        if(self._message_handler_table is not None):
+            return self._message_handler_table
+            
+        message_handlers = {}
+        for script_class in reversed(type(self).__mro__):
+            for attribute_name, attribute in vars(script_class).items():
+                for message_type, b_has_payload in getattr(attribute, "_pie_script_message_handlers", ()):
+                    message_handlers[message_type] = (getattr(self, attribute_name), b_has_payload)
+                    
+        message_handlers.update(self._registered_message_handlers)
+        
+        self._message_handler_table = {self._resolve_message_type(message_type): handler_entry for message_type, handler_entry in message_handlers.items() if handler_entry is not None}
+        
+        
+        return self._message_handler_table
+        
+        
+    # get the message string of a message type, the value of the attribute it names or otherwise the message type itself
+    def _resolve_message_type(self, message_type):
+        msg = getattr(self, message_type, message_type)
+        if(isinstance(msg, str) == False):
+            return message_type
+            
+            
+        return msg
+        
+        
+    # get a snapshot of all registered connections ordered by connection id
+    def _get_connections(self):
+        with self._connections_lock:
+            return [self._connections[connection_id] for connection_id in sorted(self._connections)]
+            
+            
+    # get the connection with the given id, or when connection_id is None the connection whose message is being
+    # handled on the calling thread, or otherwise the first open connection
+    def _resolve_connection(self, connection_id):
+        if(connection_id is not None):
+            return self.get_connection(connection_id)
+            
+        connection = getattr(self._connection_context, "connection", None)
+        if(connection is not None):
+            return connection
+            
+        for connection in self._get_connections():
+            if(connection.is_open() == True):
+                return connection
+                
+                
+        return None
+        
+        
+    # starts listening and launches a PIE session, called by start() and by the watchdog restart
+    # which can not go through start() as subclasses may override it with another signature
+    def _begin_pie_session(self):
+        self.start_listening()
+        
+        # the connect watchdog timeout runs until the runtime messenger connects
+        self._watchdog_session_start_time = time.perf_counter()
+        
+        # launch the simulation which should instantiate the runtime messenger
+        # the messenger will connect to this socket
+        self._start_pie_session()
+        
+        
+        return
+        
+        
+    # logs and counts the expired watchdog timeout and calls its handler, returns the timeout name
+    def _expire_watchdog_timeout(self, timeout_name, connection_id, elapsed_time):
+        c_logger.warning("watchdog '" + timeout_name + "' timeout expired after '" + str(elapsed_time) + "' seconds" + ("" if connection_id is None else " on client '" + str(connection_id) + "'") + " -- stopping PIE session")
+        self._instrumentation.count("watchdog_timeouts")
+        self._instrumentation.count("watchdog_" + timeout_name + "_timeouts")
+        
+        # the expired timeout is not tested again until its session, race or connection begins anew
+        if(timeout_name == PIEScriptCore.c_watchdog_timeout_connect):
+            self._watchdog_session_start_time = None
+        elif(timeout_name == PIEScriptCore.c_watchdog_timeout_race):
+            self._race_begin_time = None
+            self._instrumentation.cancel_phase("race")
+            
+        self.handle_watchdog_timeout(timeout_name, connection_id)
+        
+        
+        return timeout_name
+        
+        
+    # registers a newly accepted connection and assigns it the next connection id
+    def _add_connection(self, client_socket, client_address):
+        with self._connections_lock:
+            connection = PIEScriptConnection(self._next_connection_id, client_socket, client_address, instrumentation=self._instrumentation, send_queue_capacity=self._send_queue_capacity)
+            self._connections[connection.get_connection_id()] = connection
+            self._next_connection_id += 1
+            
+            
+        return connection
+        
+        
+    # unregisters a closed connection
+    def _remove_connection(self, connection):
+        with self._connections_lock:
+            if(self._connections.get(connection.get_connection_id()) is connection):
+                del self._connections[connection.get_connection_id()]
+                
+                
+        return
+        
+        
+    # creates, binds and listens on the server socket the runtime messenger connects to
+    def _open_server_socket(self):
+    
+        # create a socket at server side
+        # using TCP / IP protocol
+        self._socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        
+        # allow rebinding the address while connections of a previous server socket are in TIME_WAIT,
+        # windows allows that by default and uses SO_REUSEADDR to share a bound address instead
+        if(hasattr(socket, "SO_EXCLUSIVEADDRUSE")):
+            self._socket.setsockopt(socket.SOL_SOCKET, socket.SO_EXCLUSIVEADDRUSE, 1)
+        else:
+            self._socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+
+        # bind the socket with server
+        # and port number
+        self._socket.bind(self.c_server_address)
+        if(self.c_port == 0):
+            self.set_server_address(self.c_ip_address, self._socket.getsockname()[1])
+
+        # allow several runtime messengers to
+        # connect to the socket
+        self._socket.listen(self.c_listen_backlog)
+        
+        
+        return
+        
+        
+    # creates and starts a listen thread in the background to listen for messages from connected clients
+    def _start_listen_thread(self):
+        if(self._listen_thread is not None):
+            c_logger.error("listen thread already exists")
+            return
+            
+        # the listen thread waits on the sockets without a timeout, writing to this socket pair wakes it up
+        self._listen_thread_wakeup_receiver, self._listen_thread_wakeup_sender = socket.socketpair()
+        self._listen_thread_wakeup_receiver.setblocking(False)
+            
+        self._b_continue_listen_thread = True
+        self._listen_thread = threading.Thread(target=self._do_listen_thread, args=(self.handle_accepted_client_connection,), daemon=True)
+        self._listen_thread.start()
+        
+        
+        return
+        
+        
+    # blocks and forces the listen thread to return    
+    def _stop_listen_thread(self):
+        if(self._listen_thread is None):
+            c_logger.error("listen thread does not exist")
+            return
+        
+        # the listen thread forgets itself when it returns, hold on to it while joining
+        listen_thread = self._listen_thread
+        self._b_continue_listen_thread = False
+        self._wake_listen_thread()
+        
+        # the listen thread can not join itself when a handler it called stops the script
+        if(listen_thread is not threading.current_thread()):
+            listen_thread.join(self.c_listen_thread_join_timeout)
+            if(listen_thread.is_alive() == True):
+                c_logger.error("listen thread did not return within '" + str(self.c_listen_thread_join_timeout) + "' seconds")
+                
+        self._listen_thread = None
+        
+        
+        return
+        
+        
+    # interrupts the listen thread's wait so it reacts to a changed state immediately
+    def _wake_listen_thread(self):
+        if(self._listen_thread_wakeup_sender is not None):
+            try:
+                self._listen_thread_wakeup_sender.send(b"\0")
+            except OSError:
+                # the wakeup buffer is full, the listen thread is already going to wake up
+                pass
+                
+                
+        return
+      
+      
+    # thread that waits for the server socket, the connected clients and the wakeup socket to become ready
+    # and accepts connections, receives messages and returns as soon as they do
+    def _do_listen_thread(self, on_connection_accepted = None):
+        selector = selectors.DefaultSelector()
+        selector.register(self._listen_thread_wakeup_receiver, selectors.EVENT_READ, "wakeup")
+        selector.register(self._socket, selectors.EVENT_READ, "server")
+        c_logger.info("waiting for clients to connect...")
+        
+        try:
+            while(self._b_continue_listen_thread == True):
+                for key, events in selector.select():
+                    if(self._b_continue_listen_thread == False):
+                        break
+                        
+                    if(key.data == "wakeup"):
+                        self._drain_listen_thread_wakeup()
+                    elif(key.data == "server"):
+                        # accept the waiting client connection
+                        try:
+                            client_socket, client_address = self._socket.accept()
+                            client_socket.setblocking(False)
+                            connection = self._add_connection(client_socket, client_address)
+                            self._instrumentation.end_phase("client_accept")
+                            self._watchdog_session_start_time = None
+                            selector.register(client_socket, selectors.EVENT_READ, connection)
+                            self._call_with_connection_context(connection, on_connection_accepted)
+                        except Exception as e:
+                            c_logger.error("exception:\n" + str(e))
+                    elif(events & selectors.EVENT_READ):
+                        connection = key.data
+                        try:
+                            b_is_client_connected = self._receive_client_data(connection)
+                        except (ConnectionAbortedError, ConnectionResetError):
+                            # only this client is gone, keep serving the others
+                            b_is_client_connected = False
+                        except Exception as e:
+                            c_logger.error("exception:\n" + str(e))
+                            b_is_client_connected = False
+                            
+                        if(b_is_client_connected == False):
+                            self._close_connection_on_listen_thread(selector, connection)
+                            
+                # write what the main thread and the handlers above have queued
+                self._flush_send_queues(selector)
+        finally:
+            for key in list(selector.get_map().values()):
+                if(isinstance(key.data, PIEScriptConnection)):
+                    # last chance for queued messages such as replies to end play, as far as the sockets take them
+                    try:
+                        key.data.flush_send_queue()
+                    except OSError:
+                        pass
+                    key.data.close()
+                    
+            selector.close()
+            self._listen_thread_wakeup_receiver.close()
+            self._listen_thread_wakeup_sender.close()
+            self._listen_thread_wakeup_receiver = None
+            self._listen_thread_wakeup_sender = None
+            
+            # a thread that returned on its own is forgotten, so the next start_listening() starts a new one
+            if(self._listen_thread is threading.current_thread()):
+                self._b_continue_listen_thread = False
+                self._listen_thread = None
+                
+            c_logger.info("listen thread aborting")
+        
+        
+        return
+        
+        
+    # writes the send queue of every connection that has data waiting, and waits for the socket to become
+    # writable for the connections whose socket did not take all of it. called by the listen thread
+    def _flush_send_queues(self, selector):
+        for key in list(selector.get_map().values()):
+            connection = key.data
+            if(isinstance(connection, PIEScriptConnection) == False):
+                continue
+                
+            b_has_pending_data = False
+            if(connection.has_pending_send_data() == True):
+                try:
+                    b_has_pending_data = connection.flush_send_queue()
+                except OSError as ose:
+                    c_logger.error("failed to send to client '" + str(connection.get_connection_id()) + "':\n" + str(ose))
+                    self._close_connection_on_listen_thread(selector, connection)
+                    continue
+                    
+            events = selectors.EVENT_READ | selectors.EVENT_WRITE if b_has_pending_data == True else selectors.EVENT_READ
+            if(key.events != events):
+                selector.modify(connection.get_socket(), events, connection)
+                
+                
+        return
+        
+        
+    # unregisters and closes a connection the runtime messenger closed or that failed, called by the listen thread
+    def _close_connection_on_listen_thread(self, selector, connection):
+        # the connection may already have been shut down from the main thread
+        b_was_open = connection.is_open()
+        selector.unregister(connection.get_socket())
+        connection.close()
+        
+        if(b_was_open == True):
+            self._call_with_connection_context(connection, self.handle_closed_client_connection)
+            
+            
+        return
+        
+        
+    # calls the given handler while the given connection is the current connection of the calling thread
+    def _call_with_connection_context(self, connection, handler):
+        self._connection_context.connection = connection
+        try:
+            handler()
+        finally:
+            self._connection_context.connection = None
+            
+            
+        return
+        
+        
+    # discards the bytes written to wake up the listen thread
+    def _drain_listen_thread_wakeup(self):
+        try:
+            while(len(self._listen_thread_wakeup_receiver.recv(64)) > 0):
+                pass
+        except BlockingIOError:
+            pass
+            
+            
+        return
+        
+        
+    # receives the data the given connection has ready and enqueues every message it completes
+    # returns False when the client has closed the connection
+    def _receive_client_data(self, connection):
+        try:
+            return self._receive_available_client_data(connection)
+        except BlockingIOError:
+            # the non-blocking socket had nothing to read after all
+            return True
+            
+            
+    # receives the data the given connection has ready and enqueues every message it completes
+    # returns False when the client has closed the connection
+    def _receive_available_client_data(self, connection):
+        if(self.is_zero_copy_receive_enabled() == True):
+            received_length = self._receive_buffered_data_into_decoder(connection)
+            if(received_length > 0):
+                self._process_decoded_messages(connection, connection.get_stream_decoder().decode_pending_messages())
+        else:
+            data = self._receive_buffered_data(connection)
+            received_length = len(data)
+            if(received_length > 0):
+                self._process_raw_message_data(connection, data)
+                
+        self._instrumentation.count("bytes_received", received_length)
+                
+                
+        return received_length > 0
+        
+        
+    # pulls the raw data the given connection's socket has ready
+    def _receive_buffered_data(self, connection):
+        if(self.is_listening_for_messages() == False):
+            c_logger.error("not currently receiving data")
+            return b''
+        
+        return connection.get_socket().recv(self._listen_buffer_size)
+     
+     
+    # reads the data the given connection's socket has ready directly into its stream decoder's receive buffer
+    # returns the number of bytes received
+    def _receive_buffered_data_into_decoder(self, connection):
+        if(self.is_listening_for_messages() == False):
+            c_logger.error("not currently receiving data")
+            return 0
+            
+        receive_buffer = connection.get_stream_decoder().get_receive_buffer()
+        received_length, read_size = receive_buffer.receive_from_socket(connection.get_socket(), self._listen_buffer_size)
+        return received_length
+     
+     
+    # feeds raw socket data to the given connection's stream decoder and enqueues every message it completes
+    def _process_raw_message_data(self, connection, data):
+        if(len(data) <= 0):
+            return
+            
+        self._process_decoded_messages(connection, connection.get_stream_decoder().feed(data))
+        
+        
+        return
+        
+        
+    # enqueues the raw payloads of messages decoded from the given connection, they are converted to strings when they are dispatched
+    def _process_decoded_messages(self, connection, decoded_messages):
+        try:
+            for frame_type, payload in decoded_messages:
+                if(PIEScriptStreamDecoder.is_message_frame_type(frame_type) == True):
+                    connection.get_message_queue().enqueue(frame_type, payload)
+                    connection.record_received_message()
+                elif(frame_type == PIEScriptFrameCodec.c_frame_type_handshake):
+                    self._handle_frame_protocol_handshake(connection, payload)
+                else:
+                    c_logger.warning("ignoring frame with unknown type '" + str(frame_type) + "'")
+        except ValueError as ve:
+            c_logger.error("discarding corrupt frame data:\n" + str(ve))
+        
+        
+        return
+        
+        
+    # agrees on the highest frame protocol version supported by both sides and confirms it to the runtime messenger
+    def _handle_frame_protocol_handshake(self, connection, payload):
+        if(len(payload) < 1):
+            c_logger.error("received handshake frame without a protocol version")
+            return
+            
+        version = min(payload[0], PIEScriptFrameCodec.c_protocol_version)
+        
+        # queued ahead of every message encoded with the agreed version, the listen thread writes it after this handler
+        connection.send_data(PIEScriptFrameCodec.encode_handshake_frame(version))
+        connection.set_frame_protocol_version(version)
+        
+        c_logger.info("using frame protocol version '" + str(version) + "' with client '" + str(connection.get_connection_id()) + "'")
+        
+        
+        return
+        
+        
+    # extracts the first legacy text message string from an array of bytes
+    @staticmethod
+    def extract_string_from_raw_data(data):
+        if (len(data) <= 0):
+            return None
+            
+        terminator_index = bytes(data).find(PIEScriptStreamDecoder.c_legacy_message_terminator)
+        if(terminator_index < 0):
+            terminator_index = len(data)
+                
+                
+        return PIEScriptStreamDecoder.decode_legacy_text(data[:terminator_index])
+        
+        
+    # overridable hook that launches the simulation the runtime messenger runs in, the core only listens for it
+    def _start_pie_session(self):
+        return
+        
+        
+    # overridable hook that ends the simulation the runtime messenger runs in
+    def _stop_pie_session(self):
+        return
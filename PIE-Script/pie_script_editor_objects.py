@@ -0,0 +1,75 @@
+import unreal
+ 
+
+@unreal.uclass()
+class PIEScriptEditorTimerObject(unreal.Object):
+    def __init__(self, outer_world, periodic_callback=None, periodic_tick_duration=1.0):
+        unreal.Object.__init__(self, outer=outer_world)
+        self._periodic_tick_timer_handle = None
+        self._periodic_tick_timer_duration = periodic_tick_duration
+        self._periodic_callback = periodic_callback
+    
+    
+    # overridable handler called periodically on the main thread
+    @unreal.ufunction(ret=None,params=[])
+    def handle_periodic_timer_callback(self):
+        if(self._periodic_callback is not None):
+            self._periodic_callback()
+        
+    
+        return
+        
+        
+    # call to enable / disable the periodic tick timer used to process messages in the main thread
+    def set_periodic_timer_enabled(self, b_enabled, world_context):
+        if(self._periodic_tick_timer_handle is not None and unreal.SystemLibrary.is_timer_active(world_context, "handle_periodic_timer_callback") == True):
+                unreal.SystemLibrary.clear_timer(self, self._periodic_tick_timer_handle)
+    
+        if(b_enabled == True):
+            self._periodic_tick_timer_handle = unreal.SystemLibrary.set_timer(self, "handle_periodic_timer_callback", self._periodic_tick_timer_duration, True)
+    
+    
+        return
+        
+
+@unreal.uclass()
+class PIEScriptEditorDelegateHelperObject(unreal.EditorDelegateHelperObject):
+    def __init__(self, on_editor_play_simulation_started_callback=None, on_editor_play_simulation_ending_callback=None, on_editor_world_changed_callback=None):
+        unreal.Object.__init__(self)
+        self._editor_play_simulation_started_callback = on_editor_play_simulation_started_callback
+        self._editor_play_simulation_ending_callback = on_editor_play_simulation_ending_callback
+        self._on_editor_world_changed_callback = on_editor_world_changed_callback
+        self.bind_to_editor_delegates()
+        self.on_editor_play_simulation_started.add_function_unique(self, "handle_editor_play_simulation_started")
+        self.on_editor_play_simulation_ending.add_function_unique(self, "handle_editor_play_simulation_ending")
+        self.on_editor_world_changed.add_function_unique(self, "handle_editor_world_changed")
+    
+    
+    # callback to handle the editor event: play simulation started
+    @unreal.ufunction(ret=None,params=[])
+    def handle_editor_play_simulation_started(self):
+        if(self._editor_play_simulation_started_callback is not None):
+            self._editor_play_simulation_started_callback()
+        
+    
+        return
+        
+        
+    # callback to handle the editor event: play simulation ended
+    @unreal.ufunction(ret=None,params=[])
+    def handle_editor_play_simulation_ending(self):
+        if(self._editor_play_simulation_ending_callback is not None):
+            self._editor_play_simulation_ending_callback()
+        
+    
+        return
+        
+    
+    # callback to handle the editor event: world changed
+    @unreal.ufunction(ret=None,params=[])
+    def handle_editor_world_changed(self):
+        if(self._on_editor_world_changed_callback is not None):
+            self._on_editor_world_changed_callback()
+        
+    
+        return
@@ -0,0 +1,265 @@
+import json
+import math
+import time
+import threading
+import contextlib
+
+
+# histogram of durations in seconds with logarithmic buckets, four buckets for every doubling of the duration
+# from a microsecond to about 18 minutes, and an open-ended last bucket counting every longer duration.
+# recording only increments a bucket count, so it is cheap enough to run for every message. thread-safe, the
+# listen thread and the main thread record into the same histograms.
+class PIEScriptHistogram():
+    c_smallest_bucket_upper_bound = 1e-6
+    c_buckets_per_doubling = 4
+    c_number_of_buckets = 122
+    
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+        
+        
+    # clears every recorded value
+    def reset(self):
+        with self._lock:
+            self._bucket_counts = [0] * PIEScriptHistogram.c_number_of_buckets
+            self._count = 0
+            self._total = 0.0
+            self._min = math.inf
+            self._max = 0.0
+            
+            
+        return
+        
+        
+    # get the upper bound in seconds of the bucket with the given index, the last bucket has no upper bound
+    @staticmethod
+    def get_bucket_upper_bound(bucket_index):
+        if(bucket_index >= PIEScriptHistogram.c_number_of_buckets - 1):
+            return math.inf
+            
+            
+        return PIEScriptHistogram.c_smallest_bucket_upper_bound * (2.0 ** (bucket_index / PIEScriptHistogram.c_buckets_per_doubling))
+        
+        
+    # get the index of the bucket the given duration in seconds is counted in
+    @staticmethod
+    def get_bucket_index(duration):
+        if(duration <= PIEScriptHistogram.c_smallest_bucket_upper_bound):
+            return 0
+            
+            
+        return min(PIEScriptHistogram.c_number_of_buckets - 1, int(math.ceil(math.log2(duration / PIEScriptHistogram.c_smallest_bucket_upper_bound) * PIEScriptHistogram.c_buckets_per_doubling)))
+        
+        
+    # records a duration in seconds
+    def record(self, duration):
+        bucket_index = PIEScriptHistogram.get_bucket_index(duration)
+        
+        with self._lock:
+            self._bucket_counts[bucket_index] += 1
+            self._count += 1
+            self._total += duration
+            if(duration < self._min):
+                self._min = duration
+            if(duration > self._max):
+                self._max = duration
+                
+                
+        return
+        
+        
+    # get the number of recorded durations
+    def get_count(self):
+        return self._count
+        
+        
+    # get the estimated duration the given fraction of the recorded durations are shorter than, 0.0 when empty
+    # estimates are the upper bound of the bucket the percentile falls in, clamped to the recorded extremes
+    def get_percentile(self, fraction):
+        with self._lock:
+            if(self._count == 0):
+                return 0.0
+                
+            rank = max(1, int(math.ceil(fraction * self._count)))
+            cumulative_count = 0
+            for bucket_index, bucket_count in enumerate(self._bucket_counts):
+                cumulative_count += bucket_count
+                if(cumulative_count >= rank):
+                    break
+                    
+                    
+            return min(max(PIEScriptHistogram.get_bucket_upper_bound(bucket_index), self._min), self._max)
+            
+            
+    # get the count, total, mean, extremes and percentiles of the recorded durations, and the count of every non empty bucket
+    def get_summary(self):
+        percentiles = {"p50": self.get_percentile(0.5), "p90": self.get_percentile(0.9), "p99": self.get_percentile(0.99)}
+        
+        with self._lock:
+            summary = {
+                "count": self._count,
+                "total": self._total,
+                "mean": self._total / self._count if self._count > 0 else 0.0,
+                "min": self._min if self._count > 0 else 0.0,
+                "max": self._max,
+                # the last bucket is unbounded, its upper bound is None so the report stays valid JSON
+                "buckets": [[PIEScriptHistogram.get_bucket_upper_bound(bucket_index) if bucket_index < PIEScriptHistogram.c_number_of_buckets - 1 else None, bucket_count] for bucket_index, bucket_count in enumerate(self._bucket_counts) if bucket_count > 0],
+            }
+            
+        summary.update(percentiles)
+        
+        
+        return summary
+        
+        
+# timers, histograms and counters of where the time of a PIE Script goes. phases are named stretches of work
+# such as starting a PIE session or a race, timed from begin_phase() to end_phase() and collected in a histogram
+# per phase. other histograms collect latencies such as message round trips, counters collect bytes and messages.
+class PIEScriptInstrumentation():
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._phase_histograms = {}
+        self._phase_begin_times = {}
+        self._histograms = {}
+        self._counters = {}
+        self._reset_time = time.perf_counter()
+        
+        
+    # clears every recorded duration and counter and restarts the clock rates are measured with
+    def reset(self):
+        with self._lock:
+            for histogram in list(self._phase_histograms.values()) + list(self._histograms.values()):
+                histogram.reset()
+            self._phase_begin_times = {}
+            self._counters = {name: 0 for name in self._counters}
+            self._reset_time = time.perf_counter()
+            
+            
+        return
+        
+        
+    # get the histogram of the durations of the phase with the given name, created on first use
+    def get_phase_histogram(self, phase_name):
+        with self._lock:
+            histogram = self._phase_histograms.get(phase_name)
+            if(histogram is None):
+                histogram = PIEScriptHistogram()
+                self._phase_histograms[phase_name] = histogram
+                
+                
+            return histogram
+            
+            
+    # get the histogram with the given name, created on first use
+    def get_histogram(self, histogram_name):
+        with self._lock:
+            histogram = self._histograms.get(histogram_name)
+            if(histogram is None):
+                histogram = PIEScriptHistogram()
+                self._histograms[histogram_name] = histogram
+                
+                
+            return histogram
+            
+            
+    # starts timing the phase with the given name, restarting it if it was already being timed
+    def begin_phase(self, phase_name):
+        with self._lock:
+            self._phase_begin_times[phase_name] = time.perf_counter()
+            
+            
+        return
+        
+        
+    # check if the phase with the given name is being timed
+    def is_phase_active(self, phase_name):
+        with self._lock:
+            return phase_name in self._phase_begin_times
+            
+            
+    # stops timing the phase with the given name and records its duration
+    # returns the duration in seconds, None when the phase was not being timed
+    def end_phase(self, phase_name):
+        with self._lock:
+            begin_time = self._phase_begin_times.pop(phase_name, None)
+        if(begin_time is None):
+            return None
+            
+        duration = time.perf_counter() - begin_time
+        self.get_phase_histogram(phase_name).record(duration)
+        
+        
+        return duration
+        
+        
+    # stops timing the phase with the given name without recording it
+    def cancel_phase(self, phase_name):
+        with self._lock:
+            self._phase_begin_times.pop(phase_name, None)
+            
+            
+        return
+        
+        
+    # times the phase with the given name for the duration of a with statement
+    @contextlib.contextmanager
+    def measure_phase(self, phase_name):
+        begin_time = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.get_phase_histogram(phase_name).record(time.perf_counter() - begin_time)
+            
+            
+    # adds the given amount to the counter with the given name
+    def count(self, counter_name, amount=1):
+        with self._lock:
+            self._counters[counter_name] = self._counters.get(counter_name, 0) + amount
+            
+            
+        return
+        
+        
+    # get the value of the counter with the given name
+    def get_counter(self, counter_name):
+        return self._counters.get(counter_name, 0)
+        
+        
+    # get the seconds passed since the instrumentation was created or reset
+    def get_elapsed_time(self):
+        return time.perf_counter() - self._reset_time
+        
+        
+    # get every counter divided by the elapsed time, keyed by the counter name followed by '_per_second'
+    def get_rates(self):
+        elapsed_time = self.get_elapsed_time()
+        with self._lock:
+            return {counter_name + "_per_second": (value / elapsed_time if elapsed_time > 0.0 else 0.0) for counter_name, value in self._counters.items()}
+            
+            
+    # get a snapshot of every phase, histogram, counter and rate
+    def get_report(self):
+        with self._lock:
+            phase_histograms = dict(self._phase_histograms)
+            histograms = dict(self._histograms)
+            counters = dict(self._counters)
+            
+            
+        return {
+            "elapsed": self.get_elapsed_time(),
+            "phases": {phase_name: histogram.get_summary() for phase_name, histogram in sorted(phase_histograms.items())},
+            "histograms": {histogram_name: histogram.get_summary() for histogram_name, histogram in sorted(histograms.items())},
+            "counters": counters,
+            "rates": self.get_rates(),
+        }
+        
+        
+    # writes the report as JSON to the given file
+    def export(self, file_path):
+        with open(file_path, "w", encoding="utf-8") as report_file:
+            json.dump(self.get_report(), report_file, indent=4, default=str)
+            
+            
+        return
@@ -0,0 +1,369 @@
+import struct
+
+
+# length-prefixed binary frame format that replaces the legacy text encoding once it has been agreed
+# with the runtime messenger during the greeting handshake. every frame is a fixed size header
+# (magic, protocol version, frame type tag, payload length) followed by the payload bytes.
+# typed message frames, from protocol version 2 on, carry a message type and its payload string in one frame
+# instead of sending the payload as a separate message after its header.
+class PIEScriptFrameCodec():
+    c_magic = b"PF"
+    c_protocol_version = 2
+    c_typed_message_protocol_version = 2
+    c_header = struct.Struct("<2sBBI")
+    c_max_payload_size = 16 * 1024 * 1024
+    
+    # frame type tags
+    c_frame_type_handshake = 0
+    c_frame_type_message = 1
+    c_frame_type_typed_message = 2
+    
+    # separates the message type from its payload within a typed message frame
+    c_typed_message_separator = b"\x00"
+    
+    
+    # packs a frame with the given type tag and payload bytes
+    @staticmethod
+    def encode_frame(frame_type, payload, version=None):
+        if(version is None):
+            version = PIEScriptFrameCodec.c_protocol_version
+            
+        header = PIEScriptFrameCodec.c_header.pack(PIEScriptFrameCodec.c_magic, version, frame_type, len(payload))
+        
+        
+        return header + payload
+        
+        
+    # packs a handshake frame advertising the given protocol version
+    @staticmethod
+    def encode_handshake_frame(version):
+        return PIEScriptFrameCodec.encode_frame(PIEScriptFrameCodec.c_frame_type_handshake, bytes((version,)), version)
+        
+        
+    # packs a message string into a message frame
+    @staticmethod
+    def encode_message_frame(msg, version=None):
+        return PIEScriptFrameCodec.encode_frame(PIEScriptFrameCodec.c_frame_type_message, msg.encode("utf-8"), version)
+        
+        
+    # packs a message type and its payload string into a typed message frame
+    @staticmethod
+    def encode_typed_message_frame(message_type, payload, version=None):
+        return PIEScriptFrameCodec.encode_frame(PIEScriptFrameCodec.c_frame_type_typed_message, message_type.encode("utf-8") + PIEScriptFrameCodec.c_typed_message_separator + payload.encode("utf-8"), version)
+        
+        
+    # check if the given data begins with a frame header
+    @staticmethod
+    def is_frame_data(data):
+        return len(data) >= len(PIEScriptFrameCodec.c_magic) and data[:len(PIEScriptFrameCodec.c_magic)] == PIEScriptFrameCodec.c_magic
+        
+        
+    # reads the frame header at the given offset
+    # returns (version, frame_type, payload_length) or None if the header has not been fully received yet
+    @staticmethod
+    def decode_frame_header(data, offset=0):
+        if(len(data) - offset < PIEScriptFrameCodec.c_header.size):
+            return None
+            
+        magic, version, frame_type, payload_length = PIEScriptFrameCodec.c_header.unpack_from(data, offset)
+        
+        if(magic != PIEScriptFrameCodec.c_magic):
+            raise ValueError("invalid frame magic '" + str(magic) + "' at offset '" + str(offset) + "'")
+            
+        if(payload_length > PIEScriptFrameCodec.c_max_payload_size):
+            raise ValueError("frame payload length '" + str(payload_length) + "' exceeds maximum '" + str(PIEScriptFrameCodec.c_max_payload_size) + "'")
+        
+        
+        return (version, frame_type, payload_length)
+        
+        
+    # slices every complete frame out of the given data starting at the given offset
+    # returns a list of (frame_type, payload) tuples and the offset of the first byte that was not consumed
+    @staticmethod
+    def decode_frames(data, offset=0):
+        frames = []
+        
+        while(True):
+            header = PIEScriptFrameCodec.decode_frame_header(data, offset)
+            if(header is None):
+                break
+                
+            version, frame_type, payload_length = header
+            payload_begin = offset + PIEScriptFrameCodec.c_header.size
+            payload_end = payload_begin + payload_length
+            if(payload_end > len(data)):
+                break
+                
+            frames.append((frame_type, bytes(data[payload_begin:payload_end])))
+            offset = payload_end
+            
+            
+        return frames, offset
+        
+        
+# reusable receive buffer that socket reads are written into directly with recv_into. the read and write
+# positions wrap back to the start whenever the reader catches up, and leftover bytes of a partial message
+# are moved to the front only when the free space at the end runs out, so steady traffic allocates nothing.
+class PIEScriptReceiveRingBuffer():
+    def __init__(self, capacity=4096):
+        self._buffer = bytearray(max(capacity, PIEScriptFrameCodec.c_header.size))
+        self._read_index = 0
+        self._write_index = 0
+        
+        
+    # discard all buffered bytes
+    def clear(self):
+        self._read_index = 0
+        self._write_index = 0
+        
+        
+    # get the total number of bytes the buffer can hold before it has to grow
+    def get_capacity(self):
+        return len(self._buffer)
+        
+        
+    # get the number of bytes written but not consumed yet
+    def get_number_of_readable_bytes(self):
+        return self._write_index - self._read_index
+        
+        
+    # get the underlying storage, readable bytes are located between get_read_index() and get_write_index()
+    def get_storage(self):
+        return self._buffer
+        
+        
+    # get the absolute index of the first readable byte in the underlying storage
+    def get_read_index(self):
+        return self._read_index
+        
+        
+    # get the absolute index following the last readable byte in the underlying storage
+    def get_write_index(self):
+        return self._write_index
+        
+        
+    # get a memoryview over the readable bytes
+    def get_readable_view(self):
+        return memoryview(self._buffer)[self._read_index:self._write_index]
+        
+        
+    # get a memoryview over free space to write at least the given number of bytes into
+    # leftover bytes are moved to the front or the storage grows when there is not enough free space left
+    def get_writable_view(self, minimum_size=1):
+        if(len(self._buffer) - self._write_index < minimum_size):
+            readable_length = self.get_number_of_readable_bytes()
+            
+            if(len(self._buffer) - readable_length < minimum_size):
+                self._buffer.extend(bytes(max(len(self._buffer), readable_length + minimum_size - len(self._buffer))))
+                
+            if(self._read_index > 0):
+                self._buffer[:readable_length] = self._buffer[self._read_index:self._write_index]
+                self._read_index = 0
+                self._write_index = readable_length
+                
+                
+        return memoryview(self._buffer)[self._write_index:]
+        
+        
+    # mark the given number of bytes as written after filling a writable view
+    def commit_write(self, length):
+        self._write_index += length
+        
+        
+    # copy the given bytes into the buffer
+    def write(self, data):
+        self.get_writable_view(len(data))[:len(data)] = data
+        self.commit_write(len(data))
+        
+        
+    # mark the given number of readable bytes as consumed
+    def consume(self, length):
+        self._read_index += length
+        
+        if(self._read_index >= self._write_index):
+            self._read_index = 0
+            self._write_index = 0
+            
+            
+    # reads from the given socket directly into the free space of the buffer
+    # returns the number of bytes received and the number of bytes that could have been received
+    def receive_from_socket(self, client_socket, read_size):
+        view = self.get_writable_view(read_size)
+        writable_length = len(view)
+        with view:
+            received_length = client_socket.recv_into(view)
+            
+        self.commit_write(received_length)
+        
+        
+        return received_length, writable_length
+        
+        
+# stateful decoder that turns the raw byte stream received from the runtime messenger into complete messages.
+# bytes that do not form a complete message yet are carried over in a receive ring buffer until the next read
+# delivers the rest. decoded messages keep their raw payload bytes and only become strings at dispatch time.
+# legacy text messages are delivered without their terminator. runtime messengers that do not terminate their
+# legacy messages are decoded like the original per read loop did, every read completing one message, until
+# a terminator shows that messages may span reads.
+class PIEScriptStreamDecoder():
+    # legacy text messages arrive with every byte shifted down by one, which turns their null terminator into 0xff
+    c_legacy_message_terminator = 0xff
+    c_legacy_translation_table = bytes((byte + 1) % 256 for byte in range(256))
+    
+    # frame type tag reported for messages received in the legacy text encoding
+    c_frame_type_legacy_message = 0xff
+    
+    def __init__(self, buffer_capacity=4096):
+        self._receive_buffer = PIEScriptReceiveRingBuffer(buffer_capacity)
+        self._b_is_receiving_frames = False
+        self._b_has_received_legacy_terminator = False
+        
+        
+    # discard carried over bytes and return to the legacy text encoding, used when a new connection is accepted
+    def reset(self):
+        self._receive_buffer.clear()
+        self._b_is_receiving_frames = False
+        self._b_has_received_legacy_terminator = False
+        
+        
+    # check if a legacy message terminator has been received, after which legacy messages may span reads
+    def has_received_legacy_terminator(self):
+        return self._b_has_received_legacy_terminator
+        
+        
+    # check if the stream has switched from the legacy text encoding to frames
+    def is_receiving_frames(self):
+        return self._b_is_receiving_frames
+        
+        
+    # get the number of received bytes waiting for the rest of their message
+    def get_number_of_pending_bytes(self):
+        return self._receive_buffer.get_number_of_readable_bytes()
+        
+        
+    # get the receive ring buffer socket reads are written into
+    def get_receive_buffer(self):
+        return self._receive_buffer
+        
+        
+    # copies received bytes behind the carried over data and yields every message they complete
+    def feed(self, data):
+        self._receive_buffer.write(data)
+        
+        
+        return self.decode_pending_messages()
+        
+        
+    # yields a (frame_type, payload) tuple for every complete message in the receive buffer, call it once per read
+    # payloads are the raw message bytes, use decode_message() to turn message payloads into strings
+    def decode_pending_messages(self):
+        storage = self._receive_buffer.get_storage()
+        offset = self._receive_buffer.get_read_index()
+        
+        try:
+            while(offset < self._receive_buffer.get_write_index()):
+                # a runtime messenger that supports framing answers the greeting with a handshake frame
+                # and frames everything it sends afterwards
+                if(self._b_is_receiving_frames == False and storage.startswith(PIEScriptFrameCodec.c_magic, offset)):
+                    self._b_is_receiving_frames = True
+                    
+                if(self._b_is_receiving_frames == True):
+                    decoded_message, next_offset = self._decode_frame(storage, offset)
+                else:
+                    decoded_message, next_offset = self._decode_legacy_message(storage, offset)
+                    
+                if(decoded_message is None):
+                    break
+                    
+                self._receive_buffer.consume(next_offset - offset)
+                offset = next_offset
+                
+                yield decoded_message
+                
+            # the rest of the read is an unterminated legacy message, unless it is the beginning of a handshake frame
+            if(self._b_is_receiving_frames == False and self._b_has_received_legacy_terminator == False):
+                write_index = self._receive_buffer.get_write_index()
+                if(offset < write_index and (write_index - offset < len(PIEScriptFrameCodec.c_magic) and PIEScriptFrameCodec.c_magic.startswith(bytes(storage[offset:write_index]))) == False):
+                    with memoryview(storage) as view:
+                        payload = bytes(view[offset:write_index])
+                    self._receive_buffer.consume(write_index - offset)
+                    
+                    yield (PIEScriptStreamDecoder.c_frame_type_legacy_message, payload)
+        except ValueError:
+            # the stream can not be resynchronized once a frame header is corrupt
+            self._receive_buffer.clear()
+            raise
+        
+        
+        return
+        
+        
+    # decodes the frame starting at the given offset of the storage
+    # returns the decoded (frame_type, payload) or None if the frame is incomplete, and the offset following it
+    def _decode_frame(self, storage, offset):
+        write_index = self._receive_buffer.get_write_index()
+        
+        if(write_index - offset < PIEScriptFrameCodec.c_header.size):
+            return None, offset
+            
+        version, frame_type, payload_length = PIEScriptFrameCodec.decode_frame_header(storage, offset)
+        payload_begin = offset + PIEScriptFrameCodec.c_header.size
+        payload_end = payload_begin + payload_length
+        if(payload_end > write_index):
+            return None, offset
+            
+        with memoryview(storage) as view:
+            payload = bytes(view[payload_begin:payload_end])
+        
+        
+        return (frame_type, payload), payload_end
+        
+        
+    # decodes the legacy text message starting at the given offset of the storage
+    # returns the decoded (frame_type, payload) or None if its terminator has not been received, and the offset following it
+    def _decode_legacy_message(self, storage, offset):
+        terminator_index = storage.find(PIEScriptStreamDecoder.c_legacy_message_terminator, offset, self._receive_buffer.get_write_index())
+        if(terminator_index < 0):
+            return None, offset
+            
+        self._b_has_received_legacy_terminator = True
+        
+        with memoryview(storage) as view:
+            payload = bytes(view[offset:terminator_index])
+        
+        
+        return (PIEScriptStreamDecoder.c_frame_type_legacy_message, payload), terminator_index + 1
+        
+        
+    # check if the given frame type carries a message string
+    @staticmethod
+    def is_message_frame_type(frame_type):
+        return frame_type == PIEScriptFrameCodec.c_frame_type_message or frame_type == PIEScriptStreamDecoder.c_frame_type_legacy_message or frame_type == PIEScriptFrameCodec.c_frame_type_typed_message
+        
+        
+    # converts a message payload into a string according to the encoding its frame type uses
+    # typed message frames convert to their message type, use decode_typed_message() to get their payload as well
+    @staticmethod
+    def decode_message(frame_type, payload):
+        return PIEScriptStreamDecoder.decode_typed_message(frame_type, payload)[0]
+        
+        
+    # converts a message payload into a (message_type, payload) tuple of strings according to the encoding its
+    # frame type uses, the payload is None for every frame type but typed message frames
+    @staticmethod
+    def decode_typed_message(frame_type, payload):
+        if(frame_type == PIEScriptStreamDecoder.c_frame_type_legacy_message):
+            return PIEScriptStreamDecoder.decode_legacy_text(payload), None
+            
+        if(frame_type == PIEScriptFrameCodec.c_frame_type_typed_message):
+            message_type, separator, message_payload = bytes(payload).partition(PIEScriptFrameCodec.c_typed_message_separator)
+            return message_type.decode("utf-8"), message_payload.decode("utf-8")
+            
+            
+        return bytes(payload).decode("utf-8"), None
+        
+        
+    # converts legacy shifted text bytes into a string
+    @staticmethod
+    def decode_legacy_text(data):
+        return bytes(data).translate(PIEScriptStreamDecoder.c_legacy_translation_table).decode("latin-1")
@@ -1,7 +1,15 @@
 import unreal
 import pie_script
+from racing_ai_tuning_worker_messages import RacingAITuningWorkerMessages
+from racing_ai_tuning_results_store import RacingAITuningResultsStore
+from racing_ai_tuning_evaluation_cache import RacingAITuningEvaluationCache
+from racing_ai_tuning_optimizers import RacingAITuningControlPropertiesVector, c_racing_ai_tuning_optimizer_classes, make_racing_ai_tuning_optimizer, perturb_control_properties
+from racing_ai_tuning_surrogate import RacingAITuningSurrogateModel
+from racing_ai_tuning_scheduler import RacingAITuningSuccessiveHalvingScheduler
+from racing_ai_tuning_statistics import RacingAITuningRaceTimeStatistics
 
 import datetime
+import logging
 import time
 import sys
 #import socket
@@ -13,20 +21,72 @@ class RacingAITuner(pie_script.PIEScript):
 
     def __init__(self):
         super().__init__()
-        self._b_is_expecting_ai_control_properties_json_string = False
-        self._b_is_expecting_race_time_string = False
         self._number_of_simulations_ran = 0
         self._total_number_of_desired_simulations = 0
         self._best_race_time = sys.float_info.max
         self._ai_control_properties_json_string = ""
         self._tuning_ai_controller_class_path = ""
-        self.c_racer_ai_tuning_message_control_props_json_string = unreal.RacerAiTuningBpFunctionLibrary.get_racer_ai_tuning_message_incoming_ai_control_properties()
-        self.c_racer_ai_tuning_message_race_time = unreal.RacerAiTuningBpFunctionLibrary.get_racer_ai_tuning_message_incoming_race_time()
-        self.c_racer_ai_tuning_message_accept_control_props = unreal.RacerAiTuningBpFunctionLibrary.get_racer_ai_tuning_message_accept_control_properties()
-        self.c_racer_ai_tuning_message_deny_control_props = unreal.RacerAiTuningBpFunctionLibrary.get_racer_ai_tuning_message_deny_control_properties()
-        self.set_listen_buffer_size(4096) # must be larger than size of largest message -- json control properties
+        
+        # message type constants - initialize_editor() replaces them with the ones the Racer AI Tuning plugin defines
+        self.c_racer_ai_tuning_message_control_props_json_string = "RacerAITuningIncomingControlProps"
+        self.c_racer_ai_tuning_message_race_time = "RacerAITuningIncomingRaceTime"
+        self.c_racer_ai_tuning_message_accept_control_props = "RacerAITuningAcceptControlProps"
+        self.c_racer_ai_tuning_message_deny_control_props = "RacerAITuningDenyControlProps"
+        self.c_racer_ai_tuning_message_reset_race = "RacerAITuningResetRace"
+        self.c_racer_ai_tuning_message_split_time = "RacerAITuningIncomingSplitTime"
+        self.c_racer_ai_tuning_message_abort_race = "RacerAITuningAbortRace"
+        self.c_racer_ai_tuning_message_race_fidelity = "RacerAITuningRaceFidelity"
+        self.set_listen_buffer_size(4096) # sized to receive the json control properties in a single read
         self._tuning_begin_timestamp = None
         self._tuning_end_timestamp = None
+        self._b_is_warm_session_enabled = False
+        self._b_is_full_restart_requested = False
+        self._warm_session_full_restart_interval = 0
+        self._number_of_races_in_pie_session = 0
+        self._warm_session_control_properties_json_string = None
+        self._resolved_blueprint_classes = {}
+        self._pending_asset_save_paths = set()
+        self.c_save_policy_every_simulation = "every_simulation"
+        self.c_save_policy_best_only = "best_only"
+        self.c_save_policy_end_of_tuning = "end_of_tuning"
+        self._save_policy = self.c_save_policy_best_only
+        self._results_store = None
+        self._racing_ai_control_properties_json_string = None
+        self._race_begin_timestamp = None
+        self._evaluation_cache = None
+        self._number_of_memoized_proposals = 0
+        self._number_of_consecutive_unraced_proposals = 0
+        self._b_is_awaiting_replacement_proposal = False
+        self._deferred_end_play_timestamp = None
+        self.c_max_consecutive_unraced_proposals = 32
+        self.c_memoized_proposal_reply_timeout = 1.0
+        self._optimizer_name = None
+        self._optimizer_options = {}
+        self._optimizer = None
+        self._control_properties_vector = None
+        self._optimizer_candidate_ids = {}
+        self._surrogate_model = None
+        self._race_split_times = []
+        self._best_race_split_times = []
+        self._b_is_early_abort_enabled = False
+        self._early_abort_margin = 0.0
+        self._early_abort_relative_margin = 0.0
+        self._aborted_race_projected_time = None
+        self._number_of_aborted_races = 0
+        self._scheduler_options = None
+        self._scheduler = None
+        self._scheduler_candidate_ids = {}
+        self._next_race_fidelity = 1.0
+        self._race_fidelity = 1.0
+        self._noise_aware_acceptance_options = None
+        self._race_time_statistics = None
+        self._best_control_properties_key = None
+        self._b_is_reevaluating_candidate = False
+        self._deferred_proposal_json_string = None
+        self._number_of_reevaluations = 0
+        self._max_race_time_samples_per_candidate = 3
+        self._instrumentation_report_path = None
+        self._accepted_control_properties_json_string = None
         
     @staticmethod
     def help():
@@ -37,13 +97,63 @@ class RacingAITuner(pie_script.PIEScript):
         unreal.log("\t game_mode_reference - string reference to gamemode, right click on a Racing AI Tuning Game Mode blueprint in the content browser and select 'Copy Reference'")
         unreal.log("\t ai_controller_reference - string reference to ai controller, right click on a Racer AI Controller blueprint in the content browser and select 'Copy Reference'")
         unreal.log("\t number_of_simulations - the number of simulations to run")
+        unreal.log("\t b_resume - continue from the results store set with '.set_results_store_path(file_path)' instead of starting over")
         unreal.log("A copy of the Racer AI Controller blueprint will be created with '_AITuningCopy' appended to it's name.")
         unreal.log("The editor will load an unsaved untitled copy of the provided level, set it's game mode to the AI Tuning Game Mode, and set the AI Tuning Game Mode's default AI racer.")
+        unreal.log("Call '.set_warm_session_enabled(True)' before tuning to restart races in place within one PIE session instead of restarting PIE for every simulation.")
+        unreal.log("Call '.set_optimizer(optimizer_name)' to let a python optimizer choose the control properties to race instead of the runtime: " + str(sorted(c_racing_ai_tuning_optimizer_classes.keys())))
+        unreal.log("Call '.set_successive_halving_enabled(True)' to race many candidates over part of the race and promote the best of them to longer races.")
+        unreal.log("Call '.set_simulation_settings(random_seed, fixed_timestep, time_dilation)' to race deterministically and faster than real time.")
+        unreal.log("Call '.set_instrumentation_report_path(file_path)' to write where the time of the tuning run went to a JSON file when it finishes.")
+        unreal.log("Call '.set_save_policy(policy)' to choose when the tuning ai controller is saved to disk: 'every_simulation', 'best_only' (default) or 'end_of_tuning'.")
+        unreal.log("Call '.set_watchdog_timeouts(connect_timeout, first_message_timeout, message_timeout, race_timeout)' to fail the control properties of a hung simulation and move on to the next one.")
         
         
         return
+        
+        
+    # get a racer ai tuning message from the racer ai tuning function library,
+    # or the given default message when the plugin version in use does not provide it
+    @staticmethod
+    def get_optional_racer_ai_tuning_message(function_name, default_message):
+        message_function = getattr(unreal.RacerAiTuningBpFunctionLibrary, function_name, None)
+        if(message_function is None):
+            return default_message
+            
+            
+        return message_function()
      
      
+    # resolves the racer ai tuning message type constants, then sets up the PIE Script message type constants,
+    # editor delegates and editor timers. called by the first start() or start_listening()
+    def initialize_editor(self):
+        if(self.is_editor_initialized() == True):
+            return
+            
+        # message type constants - defined by the Racer AI Tuning Blueprint Function Library
+        self.c_racer_ai_tuning_message_control_props_json_string = unreal.RacerAiTuningBpFunctionLibrary.get_racer_ai_tuning_message_incoming_ai_control_properties()
+        self.c_racer_ai_tuning_message_race_time = unreal.RacerAiTuningBpFunctionLibrary.get_racer_ai_tuning_message_incoming_race_time()
+        self.c_racer_ai_tuning_message_accept_control_props = unreal.RacerAiTuningBpFunctionLibrary.get_racer_ai_tuning_message_accept_control_properties()
+        self.c_racer_ai_tuning_message_deny_control_props = unreal.RacerAiTuningBpFunctionLibrary.get_racer_ai_tuning_message_deny_control_properties()
+        self.c_racer_ai_tuning_message_reset_race = self.get_optional_racer_ai_tuning_message("get_racer_ai_tuning_message_reset_race", self.c_racer_ai_tuning_message_reset_race)
+        self.c_racer_ai_tuning_message_split_time = self.get_optional_racer_ai_tuning_message("get_racer_ai_tuning_message_incoming_split_time", self.c_racer_ai_tuning_message_split_time)
+        self.c_racer_ai_tuning_message_abort_race = self.get_optional_racer_ai_tuning_message("get_racer_ai_tuning_message_abort_race", self.c_racer_ai_tuning_message_abort_race)
+        self.c_racer_ai_tuning_message_race_fidelity = self.get_optional_racer_ai_tuning_message("get_racer_ai_tuning_message_race_fidelity", self.c_racer_ai_tuning_message_race_fidelity)
+        
+        # resolves the PIE Script constants and builds the message handler table from all of them
+        super().initialize_editor()
+        
+        # forward the log messages of the racing ai tuning modules to the output log
+        racing_ai_tuning_logger = logging.getLogger("racing_ai_tuning")
+        if(any(isinstance(handler, pie_script.PIEScriptUnrealLogHandler) for handler in racing_ai_tuning_logger.handlers) == False):
+            racing_ai_tuning_logger.addHandler(pie_script.PIEScriptUnrealLogHandler())
+            racing_ai_tuning_logger.setLevel(logging.INFO)
+            racing_ai_tuning_logger.propagate = False
+        
+        
+        return
+        
+        
     # get the currently cached json string representing ai control properties
     def get_cached_ai_control_properties_json_string(self):
         return self._ai_control_properties_json_string
@@ -51,12 +161,12 @@ class RacingAITuner(pie_script.PIEScript):
      
     # check if the tuner is expecting that the next message received is a race time string
     def is_expecting_race_time_string_on_next_message(self):
-        return self._b_is_expecting_race_time_string
+        return self.get_expected_payload_message_type() == self.c_racer_ai_tuning_message_race_time
      
      
     # check if the tuner is expecting that the next message received is a json string representing ai control properties
     def is_expecting_ai_control_properties_json_string_on_next_message(self):
-        return self._b_is_expecting_ai_control_properties_json_string
+        return self.get_expected_payload_message_type() == self.c_racer_ai_tuning_message_control_props_json_string
      
      
     # get total number of simulations that will be executed
@@ -67,73 +177,438 @@ class RacingAITuner(pie_script.PIEScript):
     # get number of simulations that have been executed
     def get_number_of_simulations_ran(self):
         return self._number_of_simulations_ran
-    
-    
-    # overridable handler for when a message is received from a PIE Script Messenger in a live PIE session
-    def receive_message(self, msg, b_was_handled):
-        
-        b_did_this_class_handle_message = False
-        
-        # make sure message was not already handled
-        if(b_was_handled == False):
+     
+     
+    # enable / disable warm sessions, the race is restarted in place by the runtime with the next control properties
+    # instead of ending the PIE session and starting a new one for every simulation
+    def set_warm_session_enabled(self, b_enabled):
+        self._b_is_warm_session_enabled = b_enabled
+     
+     
+    # check if races are restarted in place within one PIE session
+    def is_warm_session_enabled(self):
+        return self._b_is_warm_session_enabled
+     
+     
+    # set the number of races after which a warm session is fully restarted, 0 never restarts it
+    def set_warm_session_full_restart_interval(self, number_of_races):
+        self._warm_session_full_restart_interval = number_of_races
+     
+     
+    # get the number of races after which a warm session is fully restarted, 0 never restarts it
+    def get_warm_session_full_restart_interval(self):
+        return self._warm_session_full_restart_interval
+     
+     
+    # requests that the next simulation starts a new PIE session even when warm sessions are enabled
+    def request_full_restart(self):
+        self._b_is_full_restart_requested = True
+     
+     
+    # set when modified tuning assets are saved to disk, one of:
+    #   c_save_policy_every_simulation - save whenever the control properties are set
+    #   c_save_policy_best_only - save when a race time improves on the best and when tuning finishes
+    #   c_save_policy_end_of_tuning - save once when tuning finishes
+    def set_save_policy(self, save_policy):
+        if(save_policy not in (self.c_save_policy_every_simulation, self.c_save_policy_best_only, self.c_save_policy_end_of_tuning)):
+            unreal.log_error("unknown save policy '" + str(save_policy) + "'")
+            return
             
-            if(msg == self.c_racer_ai_tuning_message_control_props_json_string):
-                unreal.log("expecting incoming ai control properties")
-                b_did_this_class_handle_message = True
-                self._b_is_expecting_ai_control_properties_json_string = True
-                
-            elif(self.is_expecting_ai_control_properties_json_string_on_next_message() == True):
-                unreal.log("received incoming ai control properties")
-                b_did_this_class_handle_message = True
-                self._b_is_expecting_ai_control_properties_json_string = False
-                self.handle_received_ai_control_properties_json_string(msg)
-            
-            elif(msg == self.c_racer_ai_tuning_message_race_time):
-                unreal.log("expecting incoming race time")
-                b_did_this_class_handle_message = True
-                self._b_is_expecting_race_time_string = True
-                
-            elif(self.is_expecting_race_time_string_on_next_message() == True):
-                #unreal.log("received incoming race time")
-                b_did_this_class_handle_message = True
-                self._b_is_expecting_race_time_string = False
-                self.handle_received_race_time_string(msg)
-                
-                
+        self._save_policy = save_policy
+     
+     
+    # get when modified tuning assets are saved to disk
+    def get_save_policy(self):
+        return self._save_policy
+     
+     
+    # get the paths of modified assets waiting to be saved
+    def get_pending_asset_save_paths(self):
+        return list(self._pending_asset_save_paths)
+     
+     
+    # configures the simulation settings of every race of a run, each race is seeded with the same random seed and
+    # advances by the same fixed time step, so control properties race the same way every time they are raced.
+    # None leaves a setting to the runtime
+    def set_simulation_settings(self, random_seed=None, fixed_timestep=None, time_dilation=None):
+        self.set_random_seed(random_seed)
+        self.set_fixed_timestep(fixed_timestep)
+        self.set_time_dilation(time_dilation)
+     
+     
+    # check if races are seeded and advance by a fixed time step, making race times repeatable
+    def is_simulation_deterministic(self):
+        return self.get_random_seed() is not None and self.get_fixed_timestep() is not None
+     
+     
+    # set the JSON file the instrumentation report is written to when tuning finishes, None does not write it
+    def set_instrumentation_report_path(self, file_path):
+        self._instrumentation_report_path = file_path
+     
+     
+    # get the JSON file the instrumentation report is written to when tuning finishes
+    def get_instrumentation_report_path(self):
+        return self._instrumentation_report_path
+     
+     
+    # set the JSON lines file every evaluated control properties set is recorded to, None stops recording
+    # results are synced to disk when tuning finishes, or after every written batch when b_sync_every_flush is True
+    def set_results_store_path(self, file_path, b_sync_every_flush=False):
+        if(self._results_store is not None):
+            self._results_store.close()
             
-        super().receive_message(msg, b_was_handled or b_did_this_class_handle_message)
-        
-        
-        return
-        
-        
+        self._results_store = None
+        if(file_path is not None):
+            self._results_store = RacingAITuningResultsStore(file_path, b_sync_every_flush=b_sync_every_flush)
+     
+     
+    # get the store evaluated control properties are recorded to, None when not recording
+    def get_results_store(self):
+        return self._results_store
+     
+     
+    # enable / disable answering proposals of already evaluated control properties from their cached race time
+    # instead of racing them again, numbers within quantization_step of each other count as identical
+    # the runtime messenger is expected to propose new control properties after the answer
+    def set_memoization_enabled(self, b_enabled, quantization_step=0.0):
+        if(b_enabled == False):
+            self._evaluation_cache = None
+        elif(self._evaluation_cache is None):
+            self._evaluation_cache = RacingAITuningEvaluationCache(quantization_step)
+        else:
+            self._evaluation_cache.set_quantization_step(quantization_step)
+     
+     
+    # check if proposals of already evaluated control properties are answered from their cached race time
+    def is_memoization_enabled(self):
+        return self._evaluation_cache is not None
+     
+     
+    # get the cache of evaluated control properties, None when memoization is disabled
+    def get_evaluation_cache(self):
+        return self._evaluation_cache
+     
+     
+    # get the number of proposals answered from a cached race time instead of a race
+    def get_number_of_memoized_proposals(self):
+        return self._number_of_memoized_proposals
+     
+     
+    # set the optimizer that chooses the control properties of every race, None lets the runtime propose them
+    # the optimizer starts from the first control properties the runtime sends, options are passed to its constructor
+    def set_optimizer(self, optimizer_name, **options):
+        if(optimizer_name is not None and optimizer_name not in c_racing_ai_tuning_optimizer_classes):
+            unreal.log_error("unknown optimizer '" + str(optimizer_name) + "', expected one of " + str(sorted(c_racing_ai_tuning_optimizer_classes.keys())))
+            return
+            
+        self._optimizer_name = optimizer_name
+        self._optimizer_options = options
+        self._optimizer = None
+     
+     
+    # get the optimizer choosing the control properties, None before the first control properties were received
+    def get_optimizer(self):
+        return self._optimizer
+     
+     
+    # enable / disable screening control properties with a surrogate model of the race times raced so far
+    # control properties unlikely to beat the best race time are denied, or told their predicted race time
+    # when an optimizer chooses them, instead of being raced. options are passed to the surrogate model
+    def set_surrogate_screening_enabled(self, b_enabled, **options):
+        self._surrogate_model = RacingAITuningSurrogateModel(**options) if b_enabled == True else None
+     
+     
+    # get the surrogate model screening control properties, None when screening is disabled
+    def get_surrogate_model(self):
+        return self._surrogate_model
+     
+     
+    # enable / disable aborting races that fall behind the split times of the best race by more than
+    # margin seconds plus relative_margin times the best split time
+    # the runtime messenger is expected to stream split times and end the race when told to abort it
+    def set_early_abort_enabled(self, b_enabled, margin=0.5, relative_margin=0.0):
+        self._b_is_early_abort_enabled = b_enabled
+        self._early_abort_margin = margin
+        self._early_abort_relative_margin = relative_margin
+     
+     
+    # check if races falling behind the split times of the best race are aborted
+    def is_early_abort_enabled(self):
+        return self._b_is_early_abort_enabled
+     
+     
+    # get the split times of the race with the best race time
+    def get_best_race_split_times(self):
+        return list(self._best_race_split_times)
+     
+     
+    # get the number of races aborted for falling behind the best race
+    def get_number_of_aborted_races(self):
+        return self._number_of_aborted_races
+     
+     
+    # enable / disable scheduling candidates by successive halving, options are passed to the scheduler
+    # candidates race a fraction of the full race, the runtime messenger is expected to shorten races accordingly
+    def set_successive_halving_enabled(self, b_enabled, **options):
+        self._scheduler_options = options if b_enabled == True else None
+        self._scheduler = None
+     
+     
+    # get the successive halving scheduler, None before the first control properties were received
+    def get_scheduler(self):
+        return self._scheduler
+     
+     
+    # enable / disable noise aware acceptance. candidates are accepted when a t-test shows them faster than the best
+    # candidate at the significance level, and raced again, up to max_samples_per_candidate times, while the test is
+    # undecided. the noise of single samples is pooled over repeated races, or prior_noise_deviation before any
+    def set_noise_aware_acceptance_enabled(self, b_enabled, significance_level=0.05, max_samples_per_candidate=3, prior_noise_deviation=None):
+        self._noise_aware_acceptance_options = None
+        self._race_time_statistics = None
+        
+        if(b_enabled == True):
+            self._noise_aware_acceptance_options = {"significance_level": significance_level, "prior_noise_deviation": prior_noise_deviation}
+            self._race_time_statistics = RacingAITuningRaceTimeStatistics(**self._noise_aware_acceptance_options)
+            self._max_race_time_samples_per_candidate = max_samples_per_candidate
+     
+     
+    # get the race time samples of every raced candidate, None when noise aware acceptance is disabled
+    def get_race_time_statistics(self):
+        return self._race_time_statistics
+     
+     
+    # get the number of races that raced a candidate again because its race times were within noise of the best
+    def get_number_of_reevaluations(self):
+        return self._number_of_reevaluations
+     
+     
+    # get how the simulation budget was spent at every rung of the successive halving scheduler, None without one
+    def get_simulation_budget_report(self):
+        if(self._scheduler is None):
+            return None
+            
+            
+        return self._scheduler.get_budget_report()
+    
+    
     # handler for when the expected race time string is received
     # from a PIE Script Messenger in a live PIE session
+    @pie_script.pie_script_message_handler("c_racer_ai_tuning_message_race_time", b_has_payload=True)
     def handle_received_race_time_string(self, race_time_string):
         race_time = sys.float_info.max
+        b_is_race_time_valid = False
         
         try:
             race_time = float(race_time_string)
+            b_is_race_time_valid = True
         except Exception as e:
             unreal.log_error("exception:\n" + str(e))
+            
+        # an aborted race stands in with the time it was on course for when it was aborted
+        b_was_aborted = self._aborted_race_projected_time is not None
+        if(b_was_aborted == True):
+            race_time = self._aborted_race_projected_time
+            b_is_race_time_valid = True
+            
+        if(self._scheduler is not None):
+            candidate_id = self._scheduler_candidate_ids.pop(self._racing_ai_control_properties_json_string, None)
+            if(candidate_id is not None):
+                self._scheduler.tell(candidate_id, race_time if b_is_race_time_valid == True else None)
+                
+        recorded_race_time = race_time if b_is_race_time_valid == True else None
         
-        if(race_time < self._best_race_time):
-            self._best_race_time = race_time
+        # only full races are compared with the best race time, shortened ones were already ranked by the scheduler
+        b_is_full_race = self._race_fidelity >= 1.0
+        if(b_is_full_race == False):
+            b_is_race_time_valid = False
+        
+        # the time an aborted race was on course for is a projection, it does not count towards the mean of the cache
+        if(self._evaluation_cache is not None and b_is_race_time_valid == True and b_was_aborted == False):
+            self._evaluation_cache.add_result(self._racing_ai_control_properties_json_string, race_time)
+            
+        if(self._surrogate_model is not None and b_is_race_time_valid == True and b_was_aborted == False and self._racing_ai_control_properties_json_string is not None):
+            self._surrogate_model.add_observation(self._get_control_properties_vector(self._racing_ai_control_properties_json_string).to_vector(self._racing_ai_control_properties_json_string), race_time)
+            
+        if(self._optimizer is not None):
+            candidate_id = self._optimizer_candidate_ids.pop(self._racing_ai_control_properties_json_string, None)
+            if(candidate_id is not None):
+                self._optimizer.tell(candidate_id, race_time if b_is_race_time_valid == True else None)
+            
+        b_needs_reevaluation = False
+        if(self._race_time_statistics is not None and b_is_race_time_valid == True and b_was_aborted == False):
+            b_accepted, b_needs_reevaluation = self._test_race_time_against_best(race_time)
+        else:
+            b_accepted = race_time < self._best_race_time and b_was_aborted == False and b_is_full_race == True
+            
+        if(b_needs_reevaluation == True):
+            # race the candidate again before answering the runtime
+            self._number_of_reevaluations += 1
+            self._b_is_reevaluating_candidate = True
+            self._ai_control_properties_json_string = self._racing_ai_control_properties_json_string
+            unreal.log("received race time: '" + str(race_time_string) + "' -- within noise of the best race time '" + str(self._best_race_time) + "', racing control properties again...")
+        elif(b_accepted == True):
+            if(self._race_time_statistics is None):
+                self._best_race_time = race_time
+            self._best_race_split_times = self._race_split_times
+            self._accepted_control_properties_json_string = self._racing_ai_control_properties_json_string
             unreal.log("received race time: '" + str(race_time_string) + "' -- accepting control properties...")
             self.send_message(self.c_racer_ai_tuning_message_accept_control_props)
+            
+            if(self.get_save_policy() == self.c_save_policy_best_only):
+                self.flush_pending_asset_saves()
+        elif(b_is_full_race == False):
+            unreal.log("received race time: '" + str(race_time_string) + "' over '" + str(self._race_fidelity) + "' of the race -- denying control properties...")
+            self.send_message(self.c_racer_ai_tuning_message_deny_control_props)
+        elif(b_was_aborted == True):
+            unreal.log("aborted race was on course for race time '" + str(race_time) + "' -- denying control properties (best race time: '" + str(self._best_race_time) + "')...")
+            self.send_message(self.c_racer_ai_tuning_message_deny_control_props)
         else:
             unreal.log("received race time: '" + str(race_time_string) + "' -- denying control properties (best race time: '" + str(self._best_race_time) + "')...")
             self.send_message(self.c_racer_ai_tuning_message_deny_control_props)
+            
+        # continue with the proposal that arrived while the candidate was raced again
+        if(b_needs_reevaluation == False and self._b_is_reevaluating_candidate == True):
+            self._b_is_reevaluating_candidate = False
+            if(self._deferred_proposal_json_string is not None):
+                deferred_proposal_json_string = self._deferred_proposal_json_string
+                self._deferred_proposal_json_string = None
+                self.handle_received_ai_control_properties_json_string(deferred_proposal_json_string)
+            
+        if(self._results_store is not None and self._results_store.is_open() == True):
+            race_duration = None
+            if(self._race_begin_timestamp is not None):
+                race_duration = time.monotonic() - self._race_begin_timestamp
+                
+            self._results_store.append_result(
+                self._racing_ai_control_properties_json_string,
+                recorded_race_time,
+                simulation=self._number_of_simulations_ran,
+                accepted=b_accepted,
+                aborted=b_was_aborted,
+                fidelity=self._race_fidelity,
+                split_times=self._race_split_times,
+                race_seconds=race_duration)
+                
+        self._race_split_times = []
+        self._aborted_race_projected_time = None
+        
+        
+        return
+        
+        
+    # adds a race time sample of the raced control properties and tests them against the best control properties
+    # returns an (accepted, needs reevaluation) tuple
+    def _test_race_time_against_best(self, race_time):
+        key = self._racing_ai_control_properties_json_string
+        self._race_time_statistics.add_sample(key, race_time)
+        
+        # the first race sets the best race time
+        if(self._best_race_time == sys.float_info.max or key == self._best_control_properties_key):
+            self._best_control_properties_key = key
+            self._best_race_time = self._race_time_statistics.get_mean(key)
+            return self._race_time_statistics.get_number_of_samples(key) == 1, False
+            
+        comparison = self._race_time_statistics.compare(key, self._best_control_properties_key)
+        if(comparison == RacingAITuningRaceTimeStatistics.c_comparison_faster):
+            self._best_control_properties_key = key
+            self._best_race_time = self._race_time_statistics.get_mean(key)
+            return True, False
+            
+        # control properties the tuner did not set and candidates chosen by an optimizer or scheduler are not raced again
+        b_can_reevaluate = key is not None and self._optimizer_name is None and self._scheduler_options is None
+        if(comparison == RacingAITuningRaceTimeStatistics.c_comparison_undecided and b_can_reevaluate == True and self._race_time_statistics.get_number_of_samples(key) < self._max_race_time_samples_per_candidate):
+            return False, True
+            
+            
+        return False, False
+        
         
+    # handler for when an expected split time string is received
+    # from a PIE Script Messenger in a live PIE session, split times arrive in checkpoint order
+    @pie_script.pie_script_message_handler("c_racer_ai_tuning_message_split_time", b_has_payload=True)
+    def handle_received_split_time_string(self, split_time_string):
+        try:
+            split_time = float(split_time_string)
+        except ValueError as e:
+            unreal.log_error("exception:\n" + str(e))
+            return
+            
+        split_index = len(self._race_split_times)
+        self._race_split_times.append(split_time)
         
+        if(self.is_early_abort_enabled() == False or self._aborted_race_projected_time is not None or split_index >= len(self._best_race_split_times)):
+            return
+            
+        best_split_time = self._best_race_split_times[split_index]
+        if(split_time > best_split_time * (1.0 + self._early_abort_relative_margin) + self._early_abort_margin):
+            # the race is on course to finish behind the best race by at least the time it lost so far
+            self._aborted_race_projected_time = self._best_race_time + (split_time - best_split_time)
+            self._number_of_aborted_races += 1
+            unreal.log("split time '" + str(split_time) + "' at checkpoint '" + str(split_index) + "' is behind the best race's '" + str(best_split_time) + "' -- aborting race...")
+            self.send_message(self.c_racer_ai_tuning_message_abort_race)
+            
+            
         return
         
         
     # handler for when the expected ai control properties json message is received
     # from a PIE Script Messenger in a live PIE session
+    @pie_script.pie_script_message_handler("c_racer_ai_tuning_message_control_props_json_string", b_has_payload=True)
     def handle_received_ai_control_properties_json_string(self, json_string):
+        # the candidate being raced again keeps racing, the proposal waits until it is accepted or denied
+        if(self._b_is_reevaluating_candidate == True):
+            self._deferred_proposal_json_string = json_string
+            return
+            
+        # the scheduler chooses the next control properties and the fraction of the race to race them for
+        if(self._scheduler_options is not None):
+            if(self._scheduler is None):
+                self._create_scheduler(json_string)
+            self._ask_scheduler_for_next_control_properties()
+            return
+            
+        # the optimizer chooses the next control properties, the runtime's proposal only seeds it
+        if(self._optimizer_name is not None):
+            if(self._optimizer is None):
+                self._create_optimizer(json_string)
+            self._ask_optimizer_for_next_control_properties()
+            return
+            
         self._ai_control_properties_json_string = json_string
         
+        cached_race_time = None
+        b_is_unpromising = False
+        if(self._number_of_consecutive_unraced_proposals < self.c_max_consecutive_unraced_proposals):
+            if(self._evaluation_cache is not None):
+                cached_race_time = self._evaluation_cache.get_race_time(json_string)
+                
+            if(cached_race_time is None and self._surrogate_model is not None):
+                b_is_unpromising = self._surrogate_model.is_candidate_promising(self._get_control_properties_vector(json_string).to_vector(json_string), self._best_race_time) == False
+            
+        if(cached_race_time is not None or b_is_unpromising == True):
+            # answer right away and wait for the runtime to propose other control properties
+            self._number_of_consecutive_unraced_proposals += 1
+            self._b_is_awaiting_replacement_proposal = True
+            
+            if(b_is_unpromising == True):
+                unreal.log("proposed control properties are unlikely to beat the best race time -- denying control properties...")
+                self.send_message(self.c_racer_ai_tuning_message_deny_control_props)
+                return
+                
+            self._number_of_memoized_proposals += 1
+            if(cached_race_time < self._best_race_time):
+                self._best_race_time = cached_race_time
+                self._accepted_control_properties_json_string = json_string
+                unreal.log("proposed control properties were already evaluated with race time '" + str(cached_race_time) + "' -- accepting control properties...")
+                self.send_message(self.c_racer_ai_tuning_message_accept_control_props)
+            else:
+                unreal.log("proposed control properties were already evaluated with race time '" + str(cached_race_time) + "' -- denying control properties...")
+                self.send_message(self.c_racer_ai_tuning_message_deny_control_props)
+            return
+            
+        self._number_of_consecutive_unraced_proposals = 0
+        self._release_deferred_end_play()
+        
         
         return
         
@@ -143,6 +618,9 @@ class RacingAITuner(pie_script.PIEScript):
     def handle_begin_play(self):
         super().handle_begin_play()
         
+        if(self._scheduler is not None):
+            self.send_typed_message(self.c_racer_ai_tuning_message_race_fidelity, str(self._race_fidelity))
+        
         
         return
         
@@ -150,6 +628,17 @@ class RacingAITuner(pie_script.PIEScript):
     # overridable handler for when the end play message is received
     # from a PIE Script Messenger in a live PIE session
     def handle_end_play(self):
+        # the race ended while a replacement for a memoized proposal is on its way, hold on to the session for it
+        if(self._b_is_awaiting_replacement_proposal == True and self._deferred_end_play_timestamp is None):
+            self._deferred_end_play_timestamp = time.monotonic()
+            return
+            
+        if(self._can_reset_race_in_warm_session() == True):
+            self._number_of_simulations_ran += 1
+            unreal.log("resetting race for simulation '" + str(self._number_of_simulations_ran + 1) + "' of '" + str(self.get_total_number_of_desired_simulations()) + "'")
+            self._reset_race_in_warm_session()
+            return
+            
         super().handle_end_play()
         
         
@@ -184,6 +673,22 @@ class RacingAITuner(pie_script.PIEScript):
     def handle_editor_simulation_periodic_tick(self):
         super().handle_editor_simulation_periodic_tick()
         
+        # stop waiting for a replacement proposal the runtime did not send, the next race uses the memoized one
+        if(self._deferred_end_play_timestamp is not None and time.monotonic() - self._deferred_end_play_timestamp >= self.c_memoized_proposal_reply_timeout):
+            unreal.log_warning("no replacement for memoized control properties was proposed")
+            self._release_deferred_end_play()
+        
+        
+        return
+    
+   
+    # overridable handler called when a watchdog timeout expired, the raced control properties fail
+    # and the PIE session is force stopped, the next simulation starts once the editor has returned from it
+    def handle_watchdog_timeout(self, timeout_name, connection_id):
+        self._fail_racing_control_properties(timeout_name)
+        
+        super().handle_watchdog_timeout(timeout_name, connection_id)
+        
         
         return
     
@@ -192,6 +697,14 @@ class RacingAITuner(pie_script.PIEScript):
     def handle_editor_play_simulation_started(self):
         super().handle_editor_play_simulation_started()
         
+        self._number_of_races_in_pie_session = 0
+        self._b_is_full_restart_requested = False
+        self._race_begin_timestamp = time.monotonic()
+        self._b_is_awaiting_replacement_proposal = False
+        self._deferred_end_play_timestamp = None
+        self._race_split_times = []
+        self._aborted_race_projected_time = None
+        
         
         return
     
@@ -230,30 +743,47 @@ class RacingAITuner(pie_script.PIEScript):
         
         
     # start tuning in a given level, with the given ai tuning game mode class, and given ai controller class
-    def begin_tuning(self, level_path, game_mode_path, ai_controller_path, number_of_simulations = 1):
+    # number_of_simulations counts the simulations of a resumed run as well
+    def begin_tuning(self, level_path, game_mode_path, ai_controller_path, number_of_simulations = 1, b_resume = False):
     
-        # create tuning ai controller copy
-        if(self.create_tuning_ai_controller(ai_controller_path) == False):
-            return
-        
-        # set tuning ai game mode default ai controller to the tuning ai controller copy
-        if(self.set_game_mode_class_default_ai_controller(game_mode_path, self.get_ai_tuning_ai_controller_path()) == False):
-            return
-            
-        # duplicate the given level and load into the duplicate
-        if(self.duplicate_level_and_load_copy(level_path) == False):
+        if(self.prepare_tuning_level(level_path, game_mode_path, ai_controller_path) == False):
             return
             
         # clear cached best race time
         self._best_race_time = sys.float_info.max
         
-        # set the current level game mode class override to the tuning ai game mode
-        self.set_editor_world_game_mode(game_mode_path)
-        
         self._number_of_simulations_ran = 0
         self._total_number_of_desired_simulations = number_of_simulations
+        self._warm_session_control_properties_json_string = None
+        self._racing_ai_control_properties_json_string = None
+        self._optimizer = None
+        self._best_race_split_times = []
+        self._scheduler = None
+        self._race_fidelity = 1.0
+        self._next_race_fidelity = 1.0
+        self._best_control_properties_key = None
+        self._b_is_reevaluating_candidate = False
+        self._deferred_proposal_json_string = None
+        if(self._noise_aware_acceptance_options is not None):
+            self._race_time_statistics = RacingAITuningRaceTimeStatistics(**self._noise_aware_acceptance_options)
+        
+        if(self._results_store is not None):
+            self._results_store.open()
+            
+            if(b_resume == True):
+                self._resume_from_results_store()
+            
+        if(self.get_number_of_simulations_ran() >= number_of_simulations):
+            unreal.log("all '" + str(number_of_simulations) + "' simulations already ran")
+            self.handle_finish_tuning()
+            return
     
         unreal.log("beginning tuning for level '" + level_path + "', using tuning game mode at '" + game_mode_path + "' and template ai controller '" + ai_controller_path + "'")
+        if(self.is_simulation_deterministic() == True):
+            unreal.log("racing deterministically with random seed '" + str(self.get_random_seed()) + "' and fixed time step '" + str(self.get_fixed_timestep()) + "'")
+        
+        # measure this tuning run on its own
+        self.get_instrumentation().reset()
         
         # launch PIE session and connect to runtime messenger
         self.start()
@@ -265,12 +795,69 @@ class RacingAITuner(pie_script.PIEScript):
         return
     
 
+    # creates the tuning ai controller copy, loads a copy of the given level and sets it up to use the tuning game mode
+    # returns true on success
+    def prepare_tuning_level(self, level_path, game_mode_path, ai_controller_path):
+    
+        # create tuning ai controller copy
+        if(self.create_tuning_ai_controller(ai_controller_path) == False):
+            return False
+        
+        # set tuning ai game mode default ai controller to the tuning ai controller copy
+        if(self.set_game_mode_class_default_ai_controller(game_mode_path, self.get_ai_tuning_ai_controller_path()) == False):
+            return False
+            
+        # duplicate the given level and load into the duplicate
+        if(self.duplicate_level_and_load_copy(level_path) == False):
+            return False
+        
+        # set the current level game mode class override to the tuning ai game mode
+        self.set_editor_world_game_mode(game_mode_path)
+        
+        
+        return True
+    
+
     # called when tuning is finished
     def handle_finish_tuning(self):
+        # races reset in place never wrote their control properties to the tuning ai controller,
+        # leave it with the properties of the last race like a cold run does
+        if(self._warm_session_control_properties_json_string is not None):
+            self.set_ai_tuning_ai_controller_control_properties_from_json_string(self.get_ai_tuning_ai_controller_path(), self._warm_session_control_properties_json_string)
+            self._warm_session_control_properties_json_string = None
+            
+        # leave the tuning ai controller with the best control properties the optimizer found
+        if(self._optimizer is not None and self._optimizer.get_best()[0] is not None):
+            self.set_ai_tuning_ai_controller_control_properties_from_json_string(self.get_ai_tuning_ai_controller_path(), self._control_properties_vector.to_json_string(self._optimizer.get_best()[0]))
+            
+        # or with the best full race of the scheduler
+        if(self._scheduler is not None):
+            if(self._scheduler.get_best()[1] < sys.float_info.max):
+                self.set_ai_tuning_ai_controller_control_properties_from_json_string(self.get_ai_tuning_ai_controller_path(), self._scheduler.get_best()[0])
+                
+            for rung_statistics in self._scheduler.get_budget_report():
+                unreal.log("fidelity '" + str(rung_statistics["fidelity"]) + "': '" + str(rung_statistics["evaluations"]) + "' races costing '" + str(rung_statistics["full_race_equivalents"]) + "' full races, best race time '" + str(rung_statistics["best_race_time"]) + "'")
+            
+        self.flush_pending_asset_saves()
+        
+        if(self._results_store is not None):
+            self._results_store.close()
+            
         self._tuning_end_timestamp = datetime.datetime.utcnow()
         if(self._tuning_begin_timestamp is not None):
             elapsed_time = (self._tuning_end_timestamp - self._tuning_begin_timestamp).total_seconds()
             unreal.log("tuning completed after '" + str(elapsed_time) + "' seconds with best race time '" + str(self._best_race_time) + "'")
+            
+        if(self.get_number_of_watchdog_timeouts() > 0):
+            unreal.log_warning("'" + str(self.get_number_of_watchdog_timeouts()) + "' simulations were stopped by the watchdog")
+            
+        instrumentation_report = self.get_instrumentation_report()
+        for phase_name, phase_summary in instrumentation_report["phases"].items():
+            unreal.log("phase '" + phase_name + "': '" + str(phase_summary["count"]) + "' times, '" + str(phase_summary["total"]) + "' seconds in total, '" + str(phase_summary["mean"]) + "' seconds on average")
+            
+        if(self._instrumentation_report_path is not None):
+            self.export_instrumentation_report(self._instrumentation_report_path)
+            unreal.log("instrumentation report written to '" + self._instrumentation_report_path + "'")
         
         
         return
@@ -295,6 +882,69 @@ class RacingAITuner(pie_script.PIEScript):
         return path.replace(old_name, new_name)
         
         
+    # get the generated class and class default object of the blueprint at the given reference path
+    # resolved classes are cached by reference path and resolved again once they are no longer valid
+    # returns a (class, class default object) tuple, (None, None) if the class could not be loaded
+    def get_blueprint_class_and_default_object(self, blueprint_path):
+        if(blueprint_path is None or blueprint_path == ""):
+            return (None, None)
+            
+        resolved_blueprint_class = self._resolved_blueprint_classes.get(blueprint_path)
+        if(resolved_blueprint_class is not None):
+            blueprint_class, blueprint_class_default_object = resolved_blueprint_class
+            if(unreal.SystemLibrary.is_valid(blueprint_class) == True and unreal.SystemLibrary.is_valid(blueprint_class_default_object) == True):
+                return resolved_blueprint_class
+                
+            # the blueprint was reloaded or recompiled since it was resolved
+            del self._resolved_blueprint_classes[blueprint_path]
+            
+        blueprint_class = unreal.load_class(None, blueprint_path[:-1] + "_C'")
+        if(blueprint_class is None):
+            return (None, None)
+            
+        resolved_blueprint_class = (blueprint_class, unreal.get_default_object(blueprint_class))
+        self._resolved_blueprint_classes[blueprint_path] = resolved_blueprint_class
+        
+        
+        return resolved_blueprint_class
+        
+        
+    # forgets the resolved class of the blueprint at the given reference path, or of every blueprint when None
+    # call after reloading or replacing a blueprint asset outside of this tuner
+    def invalidate_resolved_blueprint_classes(self, blueprint_path=None):
+        if(blueprint_path is None):
+            self._resolved_blueprint_classes.clear()
+        else:
+            self._resolved_blueprint_classes.pop(blueprint_path, None)
+            
+            
+        return
+        
+        
+    # saves the asset at the given class path now or once the save policy allows it
+    def save_asset(self, asset_class_path):
+        if(self.get_save_policy() == self.c_save_policy_every_simulation):
+            with self.get_instrumentation().measure_phase("asset_save"):
+                unreal.EditorAssetLibrary.save_asset(asset_class_path)
+        else:
+            self._pending_asset_save_paths.add(asset_class_path)
+            
+            
+        return
+        
+        
+    # saves every modified asset waiting to be saved
+    def flush_pending_asset_saves(self):
+        for asset_class_path in self._pending_asset_save_paths:
+            with self.get_instrumentation().measure_phase("asset_save"):
+                unreal.EditorAssetLibrary.save_asset(asset_class_path)
+            
+        self._pending_asset_save_paths.clear()
+        
+        
+        return
+        
+        
     # duplicate a given ai controller and cache a reference to it
     # returns true on success
     def create_tuning_ai_controller(self, ai_controller_class_path):
@@ -314,7 +964,8 @@ class RacingAITuner(pie_script.PIEScript):
         self.set_ai_tuning_ai_controller_path(new_ai_controller_class_path)
         
         # check if new controller already exists
-        if(unreal.load_class(None, new_ai_controller_class_path[:-1] + "_C'") is not None):
+        self.invalidate_resolved_blueprint_classes(new_ai_controller_class_path)
+        if(self.get_blueprint_class_and_default_object(new_ai_controller_class_path)[0] is not None):
             unreal.log("copy of ai controller at '" + ai_controller_class_path + "' named '" + new_ai_controller_name + "' already exists -- using it in place")
             return True
         
@@ -329,17 +980,8 @@ class RacingAITuner(pie_script.PIEScript):
     # set the default ai controller class property for the given game mode class
     # returns true on success
     def set_game_mode_class_default_ai_controller(self, game_mode_path, ai_controller_path):
-        game_mode_class = None
-        ai_controller_class = None
-        
-        if(ai_controller_path is not None and ai_controller_path != ""):
-            ai_controller_class_path = ai_controller_path[:-1] + "_C'"
-            ai_controller_class = unreal.load_class(None, ai_controller_class_path)
-        
-        if(game_mode_path is not None and game_mode_path != ""):
-            game_mode_class_path = game_mode_path[:-1] + "_C'"
-            game_mode_class = unreal.load_class(None, game_mode_class_path)
-            game_mode_class_default_object = unreal.get_default_object(game_mode_class)
+        ai_controller_class = self.get_blueprint_class_and_default_object(ai_controller_path)[0]
+        game_mode_class, game_mode_class_default_object = self.get_blueprint_class_and_default_object(game_mode_path)
             
         if(game_mode_class is None):
             unreal.log_error("failed to set game mode at '" + game_mode_path + "' ai controller to '" + ai_controller_path + "'")
@@ -347,7 +989,7 @@ class RacingAITuner(pie_script.PIEScript):
         
         game_mode_class_default_object.set_editor_property("default_racer_ai_controller_class", ai_controller_class)
         
-        unreal.EditorAssetLibrary.save_asset(game_mode_class_path)
+        unreal.EditorAssetLibrary.save_asset(game_mode_path[:-1] + "_C'")
         
         unreal.log("set game mode at '" + game_mode_path + "' to use ai controller '" + ai_controller_path + "'")
         
@@ -374,11 +1016,7 @@ class RacingAITuner(pie_script.PIEScript):
         
     # set the currently loaded level's game mode to the class at the given path
     def set_editor_world_game_mode(self, game_mode_path):
-        game_mode_class = None
-        
-        if(game_mode_path is not None and game_mode_path != ""):
-            game_mode_class_path = game_mode_path[:-1] + "_C'"
-            game_mode_class = unreal.load_class(None, game_mode_class_path)
+        game_mode_class = self.get_blueprint_class_and_default_object(game_mode_path)[0]
     
         w = unreal.EditorLevelLibrary.get_editor_world()
         ws = w.get_world_settings()
@@ -392,22 +1030,16 @@ class RacingAITuner(pie_script.PIEScript):
         
     # sets ai control properties for the given ai controller class using the given json string to construct the properties
     def set_ai_tuning_ai_controller_control_properties_from_json_string(self, ai_controller_path, json_string):
-        ai_controller_class = None
-        ai_controller_class_default_object = None
-        
-        if(ai_controller_path is not None and ai_controller_path != ""):
-            ai_controller_class_path = ai_controller_path[:-1] + "_C'"
-            ai_controller_class = unreal.load_class(None, ai_controller_class_path)
-            ai_controller_class_default_object = unreal.get_default_object(ai_controller_class)
+        ai_controller_class, ai_controller_class_default_object = self.get_blueprint_class_and_default_object(ai_controller_path)
             
         if(ai_controller_class is None or ai_controller_class_default_object is None):
-            unreal.log_error("could not find racer ai controller class at '" + ai_controller_path + "'")
+            unreal.log_error("could not find racer ai controller class at '" + str(ai_controller_path) + "'")
             return
         
         ai_control_props = unreal.RacerAiTuningBpFunctionLibrary.convert_json_string_to_racing_ai_control_properties(json_string)
         ai_controller_class_default_object.set_editor_property("control_properties", ai_control_props)
         
-        unreal.EditorAssetLibrary.save_asset(ai_controller_class_path)
+        self.save_asset(ai_controller_path[:-1] + "_C'")
         
         unreal.log("set control properties of racer ai controller at '" + ai_controller_path + "'")
         #unreal.log("set control properties of racer ai controller at '" + ai_controller_path + "' using json string:\n" + json_string)
@@ -427,6 +1059,9 @@ class RacingAITuner(pie_script.PIEScript):
         
         if(ai_control_props_json_string != "" and ai_control_props_json_string is not None):
             self.set_ai_tuning_ai_controller_control_properties_from_json_string(ai_controller_path, ai_control_props_json_string)
+            self._warm_session_control_properties_json_string = None
+            self._racing_ai_control_properties_json_string = ai_control_props_json_string
+            self._race_fidelity = self._next_race_fidelity
         else:
             unreal.log_error("no control properties were received")
         
@@ -437,3 +1072,360 @@ class RacingAITuner(pie_script.PIEScript):
         return
         
         
+    # creates the scheduler, its first bracket starts from the cached control properties of a resumed run or the given ones
+    def _create_scheduler(self, json_string):
+        initial_json_string = self.get_cached_ai_control_properties_json_string()
+        if(initial_json_string == "" or initial_json_string is None):
+            initial_json_string = json_string
+            
+        self._scheduler = RacingAITuningSuccessiveHalvingScheduler(perturb_control_properties, **self._scheduler_options)
+        self._scheduler.start(initial_json_string)
+        self._scheduler_candidate_ids = {}
+        
+        
+        return
+        
+        
+    # caches the next candidate of the scheduler and its fidelity for the next race
+    def _ask_scheduler_for_next_control_properties(self):
+        candidate = self._scheduler.ask()
+        
+        # the scheduler is still waiting for the race time of its last candidate
+        if(candidate is None):
+            return
+            
+        candidate_id, candidate_json_string, fidelity = candidate
+        self._ai_control_properties_json_string = candidate_json_string
+        self._next_race_fidelity = fidelity
+        self._scheduler_candidate_ids[candidate_json_string] = candidate_id
+        
+        
+        return
+        
+        
+    # creates the optimizer, starting from the cached control properties of a resumed run or the given ones
+    def _create_optimizer(self, json_string):
+        initial_json_string = self.get_cached_ai_control_properties_json_string()
+        if(initial_json_string == "" or initial_json_string is None):
+            initial_json_string = json_string
+            
+        self._control_properties_vector = self._get_control_properties_vector(initial_json_string)
+        self._optimizer = make_racing_ai_tuning_optimizer(self._optimizer_name, self._control_properties_vector.get_initial_vector(), **self._optimizer_options)
+        self._optimizer_candidate_ids = {}
+        
+        unreal.log("created '" + self._optimizer_name + "' optimizer for '" + str(self._control_properties_vector.get_dimension()) + "' control properties")
+        
+        
+        return
+        
+        
+    # caches the next candidate of the optimizer as the control properties of the next race
+    # candidates that were already evaluated or are screened out are told their cached or predicted race time instead
+    def _ask_optimizer_for_next_control_properties(self):
+        for candidate_index in range(self.c_max_consecutive_unraced_proposals):
+            candidate = self._optimizer.ask()
+            
+            # the optimizer is still waiting for the race time of its last candidate
+            if(candidate is None):
+                return
+                
+            candidate_id, candidate_vector = candidate
+            candidate_json_string = self._control_properties_vector.to_json_string(candidate_vector)
+            
+            cached_race_time = None
+            if(self._evaluation_cache is not None):
+                cached_race_time = self._evaluation_cache.get_race_time(candidate_json_string)
+                
+            if(cached_race_time is not None):
+                self._number_of_memoized_proposals += 1
+                self._optimizer.tell(candidate_id, cached_race_time)
+                continue
+                
+            # the predicted race time stands in for the race of a candidate that is unlikely to beat the best one
+            if(self._surrogate_model is not None and self._surrogate_model.is_candidate_promising(candidate_vector, self._best_race_time) == False):
+                self._optimizer.tell(candidate_id, self._surrogate_model.predict(candidate_vector)[0])
+                continue
+                
+            self._ai_control_properties_json_string = candidate_json_string
+            self._optimizer_candidate_ids[candidate_json_string] = candidate_id
+            return
+            
+            
+        return
+        
+        
+    # get the converter between control properties json strings and parameter vectors
+    # created from the layout of the given control properties json string the first time it is needed
+    def _get_control_properties_vector(self, json_string):
+        if(self._control_properties_vector is None):
+            self._control_properties_vector = RacingAITuningControlPropertiesVector(json_string)
+            
+            
+        return self._control_properties_vector
+        
+        
+    # stops waiting for a replacement proposal and handles the end play message deferred while waiting, if any
+    def _release_deferred_end_play(self):
+        self._b_is_awaiting_replacement_proposal = False
+        
+        if(self._deferred_end_play_timestamp is not None):
+            self._deferred_end_play_timestamp = None
+            self.handle_end_play()
+            
+            
+        return
+        
+        
+    # continues a previous run from the results store, from its simulation count and best control properties
+    def _resume_from_results_store(self):
+        self._number_of_simulations_ran = self._results_store.get_number_of_results()
+        
+        # the recorded full races answer memoized proposals as well, like the races of this run
+        if(self._evaluation_cache is not None):
+            for result in self._results_store.get_results():
+                if(result.get("aborted", False) == False and result.get("fidelity", 1.0) >= 1.0):
+                    self._evaluation_cache.add_result(result.get("control_properties"), result.get("race_time"))
+                
+        # and are the race time samples noise aware acceptance tests with
+        if(self._race_time_statistics is not None):
+            for result in self._results_store.get_results():
+                if(result.get("race_time") is not None and result.get("aborted", False) == False and result.get("fidelity", 1.0) >= 1.0):
+                    self._race_time_statistics.add_sample(result.get("control_properties"), result["race_time"])
+        
+        best_result = self._results_store.get_best_result()
+        if(best_result is not None):
+            self._best_race_time = best_result["race_time"]
+            self._best_race_split_times = best_result.get("split_times", [])
+            
+            if(self._race_time_statistics is not None):
+                self._best_control_properties_key = best_result["control_properties"]
+                self._best_race_time = self._race_time_statistics.get_mean(self._best_control_properties_key)
+            
+            # the first resumed simulation races with the best control properties found so far
+            if(best_result["control_properties"] is not None):
+                self._accepted_control_properties_json_string = best_result["control_properties"]
+                self._ai_control_properties_json_string = best_result["control_properties"]
+                self._racing_ai_control_properties_json_string = best_result["control_properties"]
+                self.set_ai_tuning_ai_controller_control_properties_from_json_string(self.get_ai_tuning_ai_controller_path(), best_result["control_properties"])
+                
+        unreal.log("resuming tuning after '" + str(self._number_of_simulations_ran) + "' recorded simulations with best race time '" + str(self._best_race_time) + "'")
+        
+        
+        return
+        
+        
+    # records the raced control properties as failed without a race time, tells the optimizer or scheduler
+    # and chooses the control properties of the next simulation, called when the watchdog stops a hung simulation
+    def _fail_racing_control_properties(self, failure):
+        if(self._scheduler is not None):
+            candidate_id = self._scheduler_candidate_ids.pop(self._racing_ai_control_properties_json_string, None)
+            if(candidate_id is not None):
+                self._scheduler.tell(candidate_id, None)
+                
+        if(self._optimizer is not None):
+            candidate_id = self._optimizer_candidate_ids.pop(self._racing_ai_control_properties_json_string, None)
+            if(candidate_id is not None):
+                self._optimizer.tell(candidate_id, None)
+                
+        if(self._results_store is not None and self._results_store.is_open() == True):
+            race_duration = None
+            if(self._race_begin_timestamp is not None):
+                race_duration = time.monotonic() - self._race_begin_timestamp
+                
+            self._results_store.append_result(
+                self._racing_ai_control_properties_json_string,
+                None,
+                simulation=self._number_of_simulations_ran,
+                accepted=False,
+                aborted=False,
+                fidelity=self._race_fidelity,
+                split_times=self._race_split_times,
+                race_seconds=race_duration,
+                failure=failure)
+                
+        self._race_split_times = []
+        self._aborted_race_projected_time = None
+        self._b_is_reevaluating_candidate = False
+        self._deferred_proposal_json_string = None
+        
+        # the next simulation races a new candidate, racing the failed one again would likely hang again
+        if(self._scheduler is not None):
+            self._ask_scheduler_for_next_control_properties()
+        elif(self._optimizer is not None):
+            self._ask_optimizer_for_next_control_properties()
+        elif(self._ai_control_properties_json_string == self._racing_ai_control_properties_json_string and self._accepted_control_properties_json_string is not None):
+            # the runtime proposes its next candidate from the last accepted control properties
+            self._ai_control_properties_json_string = self._accepted_control_properties_json_string
+            
+        unreal.log_warning("control properties of simulation '" + str(self._number_of_simulations_ran + 1) + "' failed with a '" + failure + "' watchdog timeout")
+        
+        
+        return
+        
+        
+    # check if the race that just ended can be followed by another race in the same PIE session
+    def _can_reset_race_in_warm_session(self):
+        if(self.is_warm_session_enabled() == False or self._b_is_full_restart_requested == True):
+            return False
+            
+        # the last simulation ends the PIE session, finishing tuning once the editor has returned from it
+        if(self.get_number_of_simulations_ran() + 1 >= self.get_total_number_of_desired_simulations()):
+            return False
+            
+        full_restart_interval = self.get_warm_session_full_restart_interval()
+        if(full_restart_interval > 0 and self._number_of_races_in_pie_session + 1 >= full_restart_interval):
+            return False
+            
+        ai_control_props_json_string = self.get_cached_ai_control_properties_json_string()
+        if(ai_control_props_json_string == "" or ai_control_props_json_string is None):
+            unreal.log_error("no control properties were received, restarting PIE session")
+            return False
+            
+        connection = self.get_connection(self.get_current_connection_id())
+        
+        
+        return connection is not None and connection.is_open() == True
+        
+        
+    # asks the runtime messenger to restart the race in place with the cached control properties
+    # if the connection fails the PIE session is force stopped and the next simulation starts a new one
+    def _reset_race_in_warm_session(self):
+        ai_control_props_json_string = self.get_cached_ai_control_properties_json_string()
+        
+        self._number_of_races_in_pie_session += 1
+        self._warm_session_control_properties_json_string = ai_control_props_json_string
+        self._racing_ai_control_properties_json_string = ai_control_props_json_string
+        self._race_begin_timestamp = time.monotonic()
+        self._race_split_times = []
+        self._aborted_race_projected_time = None
+        self._race_fidelity = self._next_race_fidelity
+        self.begin_race_phase()
+        
+        # the race restarts without a new begin play, re-apply the seed so it races like a fresh one
+        self.send_simulation_settings()
+        
+        if(self._scheduler is not None):
+            self.send_typed_message(self.c_racer_ai_tuning_message_race_fidelity, str(self._race_fidelity))
+            
+        self.send_typed_message(self.c_racer_ai_tuning_message_reset_race, ai_control_props_json_string)
+        
+        
+        return
+
+
+# tuner run by a worker editor process of a RacingAITuningOrchestrator. instead of iterating on the control
+# properties proposed by the runtime, it runs one simulation for every candidate the orchestrator sends over
+# its own connection to this PIE Script and reports the race time back to it.
+class RacingAITuningWorker(RacingAITuner):
+
+    def __init__(self):
+        super().__init__()
+        self._orchestrator_connection_id = None
+        self._pending_evaluation_control_properties_json_string = None
+        self._b_is_evaluating = False
+        
+        
+    # creates a worker that prepares the given level and waits for candidates from the orchestrator
+    # used by the worker command of RacingAITuningOrchestrator.make_editor_worker_command()
+    @staticmethod
+    def run_worker(level_path, game_mode_path, ai_controller_path, random_seed=None, fixed_timestep=None, time_dilation=None):
+        # keep the worker alive for the lifetime of the editor process
+        global racing_ai_tuning_worker
+        racing_ai_tuning_worker = RacingAITuningWorker()
+        racing_ai_tuning_worker.set_simulation_settings(random_seed, fixed_timestep, time_dilation)
+        racing_ai_tuning_worker.begin_worker(level_path, game_mode_path, ai_controller_path)
+        
+        
+        return racing_ai_tuning_worker
+        
+        
+    # prepares the given level and opens the server socket the orchestrator and the runtime messenger connect to
+    def begin_worker(self, level_path, game_mode_path, ai_controller_path):
+        if(self.prepare_tuning_level(level_path, game_mode_path, ai_controller_path) == False):
+            return
+            
+        self.start_listening()
+        
+        unreal.log("tuning worker listening on port '" + str(self.c_port) + "'")
+        
+        
+        return
+        
+        
+    # handler for when the orchestrator introduces its connection
+    @pie_script.pie_script_message_handler(RacingAITuningWorkerMessages.c_orchestrator_hello)
+    def handle_orchestrator_hello(self):
+        # the orchestrator's connection is kept open while PIE sessions come and go
+        self._orchestrator_connection_id = self.get_current_connection_id()
+        self.get_connection(self._orchestrator_connection_id).set_kept_open_across_sessions(True)
+        
+        
+        return
+        
+        
+    # handler for when the orchestrator sends control properties to evaluate
+    @pie_script.pie_script_message_handler(RacingAITuningWorkerMessages.c_evaluate_control_properties, b_has_payload=True)
+    def handle_evaluate_control_properties(self, control_properties_json_string):
+        if(self.get_current_connection_id() != self._orchestrator_connection_id):
+            unreal.log_warning("ignoring control properties to evaluate from a connection that is not the orchestrator's")
+            return
+            
+        self._pending_evaluation_control_properties_json_string = control_properties_json_string
+        self._begin_pending_evaluation()
+        
+        
+        return
+        
+        
+    # reports the race time of the evaluated control properties to the orchestrator
+    # the runtime is told to deny them, the orchestrator decides which candidate is best
+    def handle_received_race_time_string(self, race_time_string):
+        self.send_message(self.c_racer_ai_tuning_message_deny_control_props)
+        
+        if(self._b_is_evaluating == True):
+            self._b_is_evaluating = False
+            self.send_typed_message(RacingAITuningWorkerMessages.c_race_time, race_time_string, self._orchestrator_connection_id)
+        
+        
+        return
+        
+        
+    # overridable handler called when a watchdog timeout expired, the evaluation fails once the
+    # force stopped simulation has ended, the orchestrator decides what to evaluate next
+    def handle_watchdog_timeout(self, timeout_name, connection_id):
+        pie_script.PIEScript.handle_watchdog_timeout(self, timeout_name, connection_id)
+        
+        
+        return
+        
+        
+    # overridable handler for when the editor play simulation has finished ending
+    def handle_editor_play_simulation_ended(self):
+        pie_script.PIEScript.handle_editor_play_simulation_ended(self)
+        
+        # a simulation that ended without a race time fails its evaluation
+        if(self._b_is_evaluating == True):
+            self._b_is_evaluating = False
+            self.send_message(RacingAITuningWorkerMessages.c_evaluation_failed, self._orchestrator_connection_id)
+            
+        self._begin_pending_evaluation()
+        
+        
+        return
+        
+        
+    # runs a simulation for the control properties the orchestrator sent, once no simulation is running
+    def _begin_pending_evaluation(self):
+        if(self._pending_evaluation_control_properties_json_string is None or self.has_started_pie_session() == True or self.is_waiting_to_return_from_editor_simulation() == True):
+            return
+            
+        control_properties_json_string = self._pending_evaluation_control_properties_json_string
+        self._pending_evaluation_control_properties_json_string = None
+        
+        self.set_ai_tuning_ai_controller_control_properties_from_json_string(self.get_ai_tuning_ai_controller_path(), control_properties_json_string)
+        self._number_of_simulations_ran += 1
+        self._b_is_evaluating = True
+        self.start()
+        
+        
+        return
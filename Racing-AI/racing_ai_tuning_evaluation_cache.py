@@ -0,0 +1,124 @@
+import json
+import hashlib
+
+
+# cache of evaluated control properties mapped to their mean race time. control properties json strings are
+# canonicalized before hashing, so key order and formatting do not matter, and numbers can be quantized
+# to a step so near-identical proposals share an entry. every race time of an entry counts towards its mean,
+# the best of several noisy races would be an optimistic estimate.
+class RacingAITuningEvaluationCache():
+
+    def __init__(self, quantization_step=0.0):
+        # [sum of race times, number of race times] by key
+        self._race_times = {}
+        self._quantization_step = quantization_step
+        self._number_of_hits = 0
+        self._number_of_misses = 0
+
+
+    # set the step numbers are rounded to before hashing, 0 only matches identical numbers
+    # entries added with a different step no longer match, so the cache is cleared
+    def set_quantization_step(self, quantization_step):
+        if(quantization_step != self._quantization_step):
+            self.clear()
+
+        self._quantization_step = quantization_step
+
+
+    # get the step numbers are rounded to before hashing
+    def get_quantization_step(self):
+        return self._quantization_step
+
+
+    # get the number of cached evaluations
+    def get_number_of_entries(self):
+        return len(self._race_times)
+
+
+    # get the number of lookups that found a cached race time and the number that did not
+    def get_statistics(self):
+        return {
+            "entries": len(self._race_times),
+            "hits": self._number_of_hits,
+            "misses": self._number_of_misses,
+        }
+
+
+    # forgets every cached evaluation
+    def clear(self):
+        self._race_times = {}
+
+
+    # get the mean cached race time of the given control properties json string, None if they were not evaluated
+    def get_race_time(self, control_properties_json_string):
+        key = self.make_key(control_properties_json_string)
+        entry = self._race_times.get(key) if key is not None else None
+
+        if(entry is None):
+            self._number_of_misses += 1
+            return None
+
+        self._number_of_hits += 1
+
+
+        return entry[0] / entry[1]
+
+
+    # get the number of race times cached for the given control properties json string
+    def get_number_of_race_times(self, control_properties_json_string):
+        key = self.make_key(control_properties_json_string)
+        entry = self._race_times.get(key) if key is not None else None
+
+
+        return entry[1] if entry is not None else 0
+
+
+    # adds a race time of the given control properties json string to the mean of its entry
+    def add_result(self, control_properties_json_string, race_time):
+        key = self.make_key(control_properties_json_string)
+        if(key is None or race_time is None):
+            return
+
+        entry = self._race_times.get(key)
+        if(entry is None):
+            self._race_times[key] = [race_time, 1]
+        else:
+            entry[0] += race_time
+            entry[1] += 1
+
+
+        return
+
+
+    # get the hash of the canonical form of the given control properties json string, None if it is not valid json
+    def make_key(self, control_properties_json_string):
+        if(control_properties_json_string is None):
+            return None
+
+        try:
+            control_properties = json.loads(control_properties_json_string)
+        except ValueError:
+            return None
+
+        canonical_json_string = json.dumps(self._quantize(control_properties), sort_keys=True, separators=(",", ":"))
+
+
+        return hashlib.sha1(canonical_json_string.encode("utf-8")).hexdigest()
+
+
+    # rounds every number within the given json value to the quantization step
+    def _quantize(self, value):
+        if(isinstance(value, bool)):
+            return value
+        if(isinstance(value, (int, float))):
+            if(self._quantization_step > 0.0):
+                # the index of the step, so rounding leaves no float noise in the canonical string
+                return round(value / self._quantization_step)
+            return float(value)
+        if(isinstance(value, dict)):
+            return {key: self._quantize(item) for key, item in value.items()}
+        if(isinstance(value, list)):
+            return [self._quantize(item) for item in value]
+
+
+        return value
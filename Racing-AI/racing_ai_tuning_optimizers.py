@@ -0,0 +1,349 @@
+import sys
+import json
+import random
+
+
+# converts between control properties json strings and the parameter vector optimizers work on. every number
+# in the json, in document order, is one parameter, everything else is kept as it is.
+class RacingAITuningControlPropertiesVector():
+
+    def __init__(self, control_properties_json_string):
+        self._template = json.loads(control_properties_json_string)
+        self._initial_vector = []
+        RacingAITuningControlPropertiesVector._collect_numbers(self._template, self._initial_vector)
+
+
+    # get the parameters of the control properties the vector was created from
+    def get_initial_vector(self):
+        return list(self._initial_vector)
+
+
+    # get the number of parameters
+    def get_dimension(self):
+        return len(self._initial_vector)
+
+
+    # get the parameters of the given control properties json string, which has to have the same layout
+    def to_vector(self, control_properties_json_string):
+        vector = []
+        RacingAITuningControlPropertiesVector._collect_numbers(json.loads(control_properties_json_string), vector)
+
+
+        return vector
+
+
+    # get the control properties json string holding the given parameters
+    def to_json_string(self, vector):
+        remaining_parameters = iter(vector)
+
+
+        return json.dumps(RacingAITuningControlPropertiesVector._replace_numbers(self._template, remaining_parameters))
+
+
+    # appends every number within the given json value to the given list
+    @staticmethod
+    def _collect_numbers(value, numbers):
+        if(isinstance(value, bool)):
+            return
+        if(isinstance(value, (int, float))):
+            numbers.append(float(value))
+        elif(isinstance(value, dict)):
+            for item in value.values():
+                RacingAITuningControlPropertiesVector._collect_numbers(item, numbers)
+        elif(isinstance(value, list)):
+            for item in value:
+                RacingAITuningControlPropertiesVector._collect_numbers(item, numbers)
+
+
+        return
+
+
+    # get a copy of the given json value with its numbers taken in order from the given iterator
+    @staticmethod
+    def _replace_numbers(value, remaining_parameters):
+        if(isinstance(value, bool)):
+            return value
+        if(isinstance(value, int)):
+            return int(round(next(remaining_parameters)))
+        if(isinstance(value, float)):
+            return next(remaining_parameters)
+        if(isinstance(value, dict)):
+            return {key: RacingAITuningControlPropertiesVector._replace_numbers(item, remaining_parameters) for key, item in value.items()}
+        if(isinstance(value, list)):
+            return [RacingAITuningControlPropertiesVector._replace_numbers(item, remaining_parameters) for item in value]
+
+
+        return value
+
+
+# base class of the ask / tell optimizers. ask() hands out a candidate parameter vector with an id, tell() reports
+# the race time of a candidate back by that id. lower race times are better, a failed race is told as None.
+class RacingAITuningOptimizer():
+
+    def __init__(self, initial_vector):
+        self._initial_vector = list(initial_vector)
+        self._next_candidate_id = 0
+        self._number_of_evaluations = 0
+        self._best_vector = None
+        self._best_race_time = sys.float_info.max
+
+
+    # get a (candidate id, parameter vector) tuple to evaluate next, None while the optimizer waits for results
+    def ask(self):
+        raise NotImplementedError()
+
+
+    # reports the race time of the candidate with the given id, None when its race failed
+    def tell(self, candidate_id, race_time):
+        raise NotImplementedError()
+
+
+    # get the best parameter vector told so far and its race time, (None, sys.float_info.max) before any result
+    def get_best(self):
+        return self._best_vector, self._best_race_time
+
+
+    # get the number of results told
+    def get_number_of_evaluations(self):
+        return self._number_of_evaluations
+
+
+    # get a new candidate id
+    def _make_candidate_id(self):
+        candidate_id = self._next_candidate_id
+        self._next_candidate_id += 1
+
+
+        return candidate_id
+
+
+    # keeps track of the best result, returns the race time to optimize with, failed races count as the worst time
+    def _record_result(self, vector, race_time):
+        self._number_of_evaluations += 1
+
+        if(race_time is None):
+            return sys.float_info.max
+
+        if(race_time < self._best_race_time):
+            self._best_race_time = race_time
+            self._best_vector = list(vector)
+
+
+        return race_time
+
+
+    # get the initial step of every parameter, relative to its magnitude
+    @staticmethod
+    def get_initial_steps(vector, relative_scale):
+        return [abs(value) * relative_scale if value != 0.0 else relative_scale for value in vector]
+
+
+# Nelder-Mead downhill simplex. evaluates one candidate at a time, so it suits a single tuner best.
+class RacingAITuningNelderMeadOptimizer(RacingAITuningOptimizer):
+
+    def __init__(self, initial_vector, relative_scale=0.1):
+        super().__init__(initial_vector)
+        self._relative_scale = relative_scale
+        self._pending_candidate_id = None
+        self.c_reflection = 1.0
+        self.c_expansion = 2.0
+        self.c_contraction = 0.5
+        self.c_shrink = 0.5
+        self._search = self._search_steps()
+        self._next_vector = next(self._search)
+
+
+    # get a (candidate id, parameter vector) tuple to evaluate next, None while the last candidate has no result
+    def ask(self):
+        if(self._pending_candidate_id is not None):
+            return None
+
+        self._pending_candidate_id = self._make_candidate_id()
+
+
+        return self._pending_candidate_id, list(self._next_vector)
+
+
+    # reports the race time of the candidate with the given id, None when its race failed
+    def tell(self, candidate_id, race_time):
+        if(candidate_id != self._pending_candidate_id):
+            return
+
+        self._pending_candidate_id = None
+        race_time = self._record_result(self._next_vector, race_time)
+        self._next_vector = self._search.send(race_time)
+
+
+        return
+
+
+    # the simplex search, yields every vector to evaluate and is sent its race time
+    def _search_steps(self):
+        dimension = len(self._initial_vector)
+        initial_steps = RacingAITuningOptimizer.get_initial_steps(self._initial_vector, self._relative_scale)
+
+        simplex = []
+        for vertex_index in range(dimension + 1):
+            vertex = list(self._initial_vector)
+            if(vertex_index > 0):
+                vertex[vertex_index - 1] += initial_steps[vertex_index - 1]
+            simplex.append((vertex, (yield vertex)))
+
+        while(True):
+            simplex.sort(key=lambda vertex: vertex[1])
+            best_vertex, best_race_time = simplex[0]
+            worst_vertex, worst_race_time = simplex[-1]
+            second_worst_race_time = simplex[-2][1] if dimension > 0 else worst_race_time
+            centroid = [sum(vertex[0][i] for vertex in simplex[:-1]) / dimension for i in range(dimension)] if dimension > 0 else []
+
+            reflected = [c + self.c_reflection * (c - w) for c, w in zip(centroid, worst_vertex)]
+            reflected_race_time = yield reflected
+
+            if(reflected_race_time < best_race_time):
+                expanded = [c + self.c_expansion * (r - c) for c, r in zip(centroid, reflected)]
+                expanded_race_time = yield expanded
+                if(expanded_race_time < reflected_race_time):
+                    simplex[-1] = (expanded, expanded_race_time)
+                else:
+                    simplex[-1] = (reflected, reflected_race_time)
+                continue
+
+            if(reflected_race_time < second_worst_race_time):
+                simplex[-1] = (reflected, reflected_race_time)
+                continue
+
+            # contract towards the better of the reflected and the worst vertex
+            if(reflected_race_time < worst_race_time):
+                contracted = [c + self.c_contraction * (r - c) for c, r in zip(centroid, reflected)]
+                contracted_race_time = yield contracted
+                b_is_contraction_accepted = contracted_race_time <= reflected_race_time
+            else:
+                contracted = [c + self.c_contraction * (w - c) for c, w in zip(centroid, worst_vertex)]
+                contracted_race_time = yield contracted
+                b_is_contraction_accepted = contracted_race_time < worst_race_time
+
+            if(b_is_contraction_accepted == True):
+                simplex[-1] = (contracted, contracted_race_time)
+                continue
+
+            # shrink every vertex towards the best one
+            for vertex_index in range(1, len(simplex)):
+                shrunk = [b + self.c_shrink * (v - b) for b, v in zip(best_vertex, simplex[vertex_index][0])]
+                simplex[vertex_index] = (shrunk, (yield shrunk))
+
+
+# steady state differential evolution. every ask() creates a trial vector for the next member of the population,
+# several candidates can be evaluated at once, so it suits a pool of tuning workers.
+class RacingAITuningDifferentialEvolutionOptimizer(RacingAITuningOptimizer):
+
+    def __init__(self, initial_vector, population_size=None, relative_scale=0.1, differential_weight=0.7, crossover_probability=0.9, rng=None):
+        super().__init__(initial_vector)
+        self._rng = rng if rng is not None else random.Random()
+        self._differential_weight = differential_weight
+        self._crossover_probability = crossover_probability
+        self._population_size = population_size if population_size is not None else max(6, 4 * len(initial_vector))
+        self._population = []
+        self._pending_candidates = {}
+        self._next_target_index = 0
+
+        # the initial population scatters around the initial vector, which is its first member
+        initial_steps = RacingAITuningOptimizer.get_initial_steps(self._initial_vector, relative_scale)
+        self._unevaluated_members = [list(self._initial_vector)]
+        for member_index in range(1, self._population_size):
+            self._unevaluated_members.append([value + self._rng.gauss(0.0, step) for value, step in zip(self._initial_vector, initial_steps)])
+
+
+    # get the evaluated population as a list of (parameter vector, race time) tuples
+    def get_population(self):
+        return list(self._population)
+
+
+    # get a (candidate id, parameter vector) tuple to evaluate next
+    # None while the initial population is being evaluated and too few members have a result to build a trial
+    def ask(self):
+        if(len(self._unevaluated_members) > 0):
+            vector = self._unevaluated_members.pop(0)
+            target_index = None
+        elif(len(self._population) >= 4):
+            target_index = self._next_target_index % len(self._population)
+            self._next_target_index += 1
+            vector = self._make_trial_vector(target_index)
+        else:
+            return None
+
+        candidate_id = self._make_candidate_id()
+        self._pending_candidates[candidate_id] = (vector, target_index)
+
+
+        return candidate_id, list(vector)
+
+
+    # reports the race time of the candidate with the given id, None when its race failed
+    def tell(self, candidate_id, race_time):
+        pending_candidate = self._pending_candidates.pop(candidate_id, None)
+        if(pending_candidate is None):
+            return
+
+        vector, target_index = pending_candidate
+        race_time = self._record_result(vector, race_time)
+
+        if(target_index is None):
+            self._population.append((vector, race_time))
+        elif(race_time <= self._population[target_index][1]):
+            self._population[target_index] = (vector, race_time)
+
+
+        return
+
+
+    # builds a trial vector for the population member at the given index by mutation and binomial crossover
+    def _make_trial_vector(self, target_index):
+        target_vector = self._population[target_index][0]
+        other_indices = [index for index in range(len(self._population)) if index != target_index]
+        a, b, c = (self._population[index][0] for index in self._rng.sample(other_indices, 3))
+
+        always_crossed_index = self._rng.randrange(len(target_vector)) if len(target_vector) > 0 else 0
+        trial_vector = []
+        for i in range(len(target_vector)):
+            if(i == always_crossed_index or self._rng.random() < self._crossover_probability):
+                trial_vector.append(a[i] + self._differential_weight * (b[i] - c[i]))
+            else:
+                trial_vector.append(target_vector[i])
+
+
+        return trial_vector
+
+
+# optimizer classes by the name they are selected with
+c_racing_ai_tuning_optimizer_classes = {
+    "nelder_mead": RacingAITuningNelderMeadOptimizer,
+    "differential_evolution": RacingAITuningDifferentialEvolutionOptimizer,
+}
+
+
+# default candidate generator of the orchestrator and the successive halving scheduler, scales every number in
+# the best control properties by gaussian noise
+def perturb_control_properties(control_properties_json_string, best_race_time, relative_scale=0.05, rng=random):
+    def perturb(value):
+        if(isinstance(value, bool)):
+            return value
+        if(isinstance(value, (int, float))):
+            return value * (1.0 + rng.gauss(0.0, relative_scale))
+        if(isinstance(value, dict)):
+            return {key: perturb(item) for key, item in value.items()}
+        if(isinstance(value, list)):
+            return [perturb(item) for item in value]
+        return value
+
+
+    return json.dumps(perturb(json.loads(control_properties_json_string)))
+
+
+# creates the optimizer with the given name starting from the given parameter vector
+def make_racing_ai_tuning_optimizer(optimizer_name, initial_vector, **options):
+    optimizer_class = c_racing_ai_tuning_optimizer_classes.get(optimizer_name)
+    if(optimizer_class is None):
+        raise ValueError("unknown optimizer '" + str(optimizer_name) + "', expected one of " + str(sorted(c_racing_ai_tuning_optimizer_classes.keys())))
+
+
+    return optimizer_class(initial_vector, **options)
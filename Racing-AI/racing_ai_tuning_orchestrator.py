@@ -0,0 +1,529 @@
+import os
+import sys
+
+# the PIE Script protocol lives in the sibling PIE-Script directory, the editor has it on its path already,
+# the command line does not
+c_pie_script_directory = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "PIE-Script")
+if(os.path.isdir(c_pie_script_directory) == True and c_pie_script_directory not in sys.path):
+    sys.path.append(c_pie_script_directory)
+
+from pie_script_protocol import PIEScriptFrameCodec, PIEScriptStreamDecoder
+from racing_ai_tuning_results_store import RacingAITuningResultsStore
+from racing_ai_tuning_worker_messages import RacingAITuningWorkerMessages
+from racing_ai_tuning_optimizers import RacingAITuningControlPropertiesVector, c_racing_ai_tuning_optimizer_classes, make_racing_ai_tuning_optimizer, perturb_control_properties
+from racing_ai_tuning_surrogate import RacingAITuningSurrogateModel
+
+import json
+import time
+import socket
+import logging
+import argparse
+import selectors
+import subprocess
+
+
+# log messages of the orchestrator go through the standard logging module, the command line prints them to stderr
+c_logger = logging.getLogger("racing_ai_tuning.orchestrator")
+
+
+# connection from the orchestrator to a single worker process. the worker is a PIE Script server, so the
+# orchestrator connects to it like a runtime messenger would and agrees on the frame protocol right away.
+class RacingAITuningWorkerClient():
+    def __init__(self, worker_index, address):
+        self._worker_index = worker_index
+        self._address = address
+        self._socket = None
+        self._stream_decoder = PIEScriptStreamDecoder()
+        self._b_has_received_handshake = False
+        self._frame_protocol_version = 0
+        self._b_is_expecting_race_time = False
+        self._candidate = None
+        self._evaluation_begin_timestamp = None
+
+
+    # get the index of the worker process
+    def get_worker_index(self):
+        return self._worker_index
+
+
+    # get the connected socket
+    def get_socket(self):
+        return self._socket
+
+
+    # get the candidate json string the worker is evaluating, None when it is free
+    def get_candidate(self):
+        return self._candidate
+
+
+    # check if the worker is connected and not evaluating a candidate
+    def is_free(self):
+        return self._socket is not None and self._candidate is None
+
+
+    # connects to the worker, retrying until the worker has opened its server socket or the timeout expires
+    # returns true on success
+    def connect(self, timeout):
+        deadline = time.monotonic() + timeout
+
+        while(time.monotonic() < deadline):
+            try:
+                self._socket = socket.create_connection(self._address, timeout=max(0.1, deadline - time.monotonic()))
+                break
+            except OSError:
+                time.sleep(0.25)
+
+        if(self._socket is None):
+            return False
+
+        self._socket.settimeout(None)
+        self._socket.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        self._socket.sendall(PIEScriptFrameCodec.encode_handshake_frame(PIEScriptFrameCodec.c_protocol_version))
+
+        # the worker greets in the legacy text encoding before it confirms the handshake with a frame
+        received_data = b""
+        while(PIEScriptFrameCodec.c_magic not in received_data):
+            part = self._socket.recv(4096)
+            if(len(part) == 0):
+                self.close()
+                return False
+            received_data += part
+
+        for msg, payload in self.receive_messages(received_data[received_data.index(PIEScriptFrameCodec.c_magic):]):
+            pass
+
+        self.send_message(RacingAITuningWorkerMessages.c_orchestrator_hello)
+
+
+        return True
+
+
+    # closes the connection to the worker
+    def close(self):
+        if(self._socket is not None):
+            self._socket.close()
+            self._socket = None
+
+
+        return
+
+
+    # sends a message string as a frame
+    def send_message(self, msg):
+        self._socket.sendall(PIEScriptFrameCodec.encode_message_frame(msg))
+
+
+    # sends a message type and its payload string as a typed message frame, or as two frames to a worker
+    # that agreed on a protocol version without typed messages
+    def send_typed_message(self, message_type, payload):
+        if(self._frame_protocol_version < PIEScriptFrameCodec.c_typed_message_protocol_version):
+            self._socket.sendall(PIEScriptFrameCodec.encode_message_frame(message_type) + PIEScriptFrameCodec.encode_message_frame(payload))
+            return
+
+        self._socket.sendall(PIEScriptFrameCodec.encode_typed_message_frame(message_type, payload, self._frame_protocol_version))
+
+
+    # hands a candidate control properties json string to the worker
+    def begin_evaluation(self, candidate):
+        self._candidate = candidate
+        self._evaluation_begin_timestamp = time.monotonic()
+        self.send_typed_message(RacingAITuningWorkerMessages.c_evaluate_control_properties, candidate)
+
+
+        return
+
+
+    # decodes received data and yields a (message_type, payload) tuple for every message it completes,
+    # the payload is None unless the message arrived in a typed message frame
+    def receive_messages(self, data):
+        for frame_type, payload in self._stream_decoder.feed(data):
+            if(frame_type == PIEScriptFrameCodec.c_frame_type_handshake):
+                self._b_has_received_handshake = True
+                self._frame_protocol_version = payload[0] if len(payload) > 0 else 1
+            elif(PIEScriptStreamDecoder.is_message_frame_type(frame_type) == True):
+                yield PIEScriptStreamDecoder.decode_typed_message(frame_type, payload)
+
+
+    # handles a message received from the worker, the race time arrives as its payload, or as the next message
+    # from a worker that agreed on a protocol version without typed messages
+    # returns a (candidate, race_time, evaluation_duration) tuple when it completes an evaluation, otherwise None
+    def handle_message(self, msg, payload=None):
+        if(msg == RacingAITuningWorkerMessages.c_race_time and payload is None):
+            self._b_is_expecting_race_time = True
+            return None
+
+        if(msg == RacingAITuningWorkerMessages.c_evaluation_failed or msg == RacingAITuningWorkerMessages.c_race_time or self._b_is_expecting_race_time == True):
+            race_time_string = payload if msg == RacingAITuningWorkerMessages.c_race_time else msg
+            race_time = None
+            if(msg != RacingAITuningWorkerMessages.c_evaluation_failed):
+                self._b_is_expecting_race_time = False
+                try:
+                    race_time = float(race_time_string)
+                except ValueError:
+                    race_time = None
+
+            result = (self._candidate, race_time, time.monotonic() - self._evaluation_begin_timestamp)
+            self._candidate = None
+            self._evaluation_begin_timestamp = None
+            return result
+
+
+        return None
+
+
+# runs candidate control properties on a pool of worker processes in parallel. every worker is an editor
+# running a RacingAITuningWorker, or a stand-in process speaking the same protocol, listening on its own port.
+# candidates are handed to whichever worker is free and race times are gathered as they arrive.
+class RacingAITuningOrchestrator():
+
+    def __init__(self, worker_command, number_of_workers, base_port, host="127.0.0.1"):
+        self._worker_command = worker_command
+        self._number_of_workers = number_of_workers
+        self._base_port = base_port
+        self._host = host
+        self._worker_processes = []
+        self._worker_clients = []
+        self._results = []
+        self._best_race_time = sys.float_info.max
+        self._best_control_properties_json_string = ""
+        self._candidate_generator = None
+        self._results_store = None
+        self._optimizer_name = None
+        self._optimizer_options = {}
+        self._optimizer = None
+        self._control_properties_vector = None
+        self._optimizer_candidate_ids = {}
+        self._surrogate_model = None
+        self.c_worker_connect_timeout = 300.0
+        self.c_max_screened_candidates_per_evaluation = 32
+
+
+    # get the port the worker with the given index listens on
+    def get_worker_port(self, worker_index):
+        return self._base_port + worker_index
+
+
+    # get every evaluation result as a dictionary, in the order they arrived
+    def get_results(self):
+        return self._results
+
+
+    # get the best race time and the control properties json string that achieved it
+    def get_best_result(self):
+        return self._best_race_time, self._best_control_properties_json_string
+
+
+    # set the callable used to propose the next candidate, called with the best control properties json string
+    # and best race time so far, it returns a control properties json string
+    def set_candidate_generator(self, candidate_generator):
+        self._candidate_generator = candidate_generator
+
+
+    # set the optimizer that proposes the candidates, None uses the candidate generator instead
+    # the optimizer starts from the initial control properties given to run(), options are passed to its constructor
+    def set_optimizer(self, optimizer_name, **options):
+        if(optimizer_name is not None and optimizer_name not in c_racing_ai_tuning_optimizer_classes):
+            raise ValueError("unknown optimizer '" + str(optimizer_name) + "', expected one of " + str(sorted(c_racing_ai_tuning_optimizer_classes.keys())))
+
+        self._optimizer_name = optimizer_name
+        self._optimizer_options = options
+
+
+    # get the optimizer of the current or last run, None when candidates come from the candidate generator
+    def get_optimizer(self):
+        return self._optimizer
+
+
+    # enable / disable screening candidates with a surrogate model of the race times evaluated so far, candidates
+    # unlikely to beat the best race time are skipped. options are passed to the surrogate model
+    def set_surrogate_screening_enabled(self, b_enabled, **options):
+        self._surrogate_model = RacingAITuningSurrogateModel(**options) if b_enabled == True else None
+
+
+    # get the surrogate model screening candidates, None when screening is disabled
+    def get_surrogate_model(self):
+        return self._surrogate_model
+
+
+    # set the open results store every evaluation result is recorded to, run() continues from the best result in it
+    def set_results_store(self, results_store):
+        self._results_store = results_store
+
+
+    # launches the worker processes, '{port}' and '{worker_index}' in the worker command are replaced per worker
+    def start_workers(self):
+        for worker_index in range(self._number_of_workers):
+            port = self.get_worker_port(worker_index)
+            command = [argument.replace("{port}", str(port)).replace("{worker_index}", str(worker_index)) for argument in self._worker_command]
+            self._worker_processes.append(subprocess.Popen(command, env=RacingAITuningOrchestrator.get_worker_environment()))
+
+
+        return
+
+
+    # connects to every worker
+    # returns true if every worker accepted the connection
+    def connect_workers(self):
+        self._worker_clients = []
+
+        for worker_index in range(self._number_of_workers):
+            worker_client = RacingAITuningWorkerClient(worker_index, (self._host, self.get_worker_port(worker_index)))
+            if(worker_client.connect(self.c_worker_connect_timeout) == False):
+                c_logger.error("failed to connect to worker '" + str(worker_index) + "'")
+                return False
+
+            self._worker_clients.append(worker_client)
+
+
+        return True
+
+
+    # closes the worker connections and terminates the worker processes
+    def stop_workers(self):
+        for worker_client in self._worker_clients:
+            worker_client.close()
+
+        for worker_process in self._worker_processes:
+            worker_process.terminate()
+
+        for worker_process in self._worker_processes:
+            try:
+                worker_process.wait(10.0)
+            except subprocess.TimeoutExpired:
+                worker_process.kill()
+
+        self._worker_clients = []
+        self._worker_processes = []
+
+
+        return
+
+
+    # evaluates the given number of candidates on the connected workers, starting from the given control properties
+    # returns a summary dictionary of the run
+    def run(self, initial_control_properties_json_string, number_of_evaluations):
+        if(self._candidate_generator is None):
+            self._candidate_generator = perturb_control_properties
+
+        self._best_control_properties_json_string = initial_control_properties_json_string
+        if(self._results_store is not None and self._results_store.get_best_result() is not None):
+            best_result = self._results_store.get_best_result()
+            self._best_race_time = best_result["race_time"]
+            self._best_control_properties_json_string = best_result["control_properties"]
+            initial_control_properties_json_string = best_result["control_properties"]
+
+        number_of_started_evaluations = 0
+        number_of_finished_evaluations = 0
+        pending_candidates = [initial_control_properties_json_string]
+
+        self._control_properties_vector = RacingAITuningControlPropertiesVector(initial_control_properties_json_string)
+        self._optimizer = None
+        if(self._optimizer_name is not None):
+            # the first candidate of an optimizer is its initial vector
+            self._optimizer = make_racing_ai_tuning_optimizer(self._optimizer_name, self._control_properties_vector.get_initial_vector(), **self._optimizer_options)
+            self._optimizer_candidate_ids = {}
+            pending_candidates = []
+        begin_timestamp = time.monotonic()
+
+        selector = selectors.DefaultSelector()
+        for worker_client in self._worker_clients:
+            selector.register(worker_client.get_socket(), selectors.EVENT_READ, worker_client)
+
+        try:
+            while(number_of_finished_evaluations < number_of_evaluations and len(selector.get_map()) > 0):
+                # hand candidates to every free worker
+                for worker_client in self._worker_clients:
+                    if(worker_client.is_free() == True and number_of_started_evaluations < number_of_evaluations):
+                        if(len(pending_candidates) > 0):
+                            candidate = pending_candidates.pop(0)
+                        elif(self._optimizer is not None):
+                            candidate = self._ask_optimizer()
+                            if(candidate is None):
+                                break
+                        else:
+                            candidate = self._generate_candidate()
+                        worker_client.begin_evaluation(candidate)
+                        number_of_started_evaluations += 1
+
+                for key, events in selector.select():
+                    worker_client = key.data
+                    data = worker_client.get_socket().recv(65536)
+
+                    if(len(data) == 0):
+                        # requeue the candidate of a worker that went away
+                        c_logger.warning("worker '" + str(worker_client.get_worker_index()) + "' disconnected")
+                        if(worker_client.get_candidate() is not None):
+                            pending_candidates.append(worker_client.get_candidate())
+                            number_of_started_evaluations -= 1
+                        selector.unregister(worker_client.get_socket())
+                        worker_client.close()
+                        continue
+
+                    for msg, payload in worker_client.receive_messages(data):
+                        result = worker_client.handle_message(msg, payload)
+                        if(result is not None):
+                            number_of_finished_evaluations += 1
+                            self._handle_result(worker_client.get_worker_index(), *result)
+        finally:
+            selector.close()
+
+        elapsed_time = time.monotonic() - begin_timestamp
+
+
+        return {
+            "workers": self._number_of_workers,
+            "evaluations": number_of_finished_evaluations,
+            "elapsed_seconds": elapsed_time,
+            "evaluations_per_second": number_of_finished_evaluations / elapsed_time if elapsed_time > 0.0 else 0.0,
+            "best_race_time": self._best_race_time,
+            "best_control_properties": self._best_control_properties_json_string,
+        }
+
+
+    # records an evaluation result and keeps track of the best control properties
+    def _handle_result(self, worker_index, candidate, race_time, evaluation_duration):
+        self._results.append({
+            "worker": worker_index,
+            "control_properties": candidate,
+            "race_time": race_time,
+            "evaluation_seconds": evaluation_duration,
+        })
+
+        if(race_time is not None and race_time < self._best_race_time):
+            self._best_race_time = race_time
+            self._best_control_properties_json_string = candidate
+
+        if(self._surrogate_model is not None and race_time is not None):
+            self._surrogate_model.add_observation(self._control_properties_vector.to_vector(candidate), race_time)
+
+        if(self._optimizer is not None and candidate in self._optimizer_candidate_ids):
+            self._optimizer.tell(self._optimizer_candidate_ids.pop(candidate), race_time)
+
+        if(self._results_store is not None):
+            self._results_store.append_result(candidate, race_time, worker=worker_index, evaluation_seconds=evaluation_duration)
+
+
+        return
+
+
+    # get the control properties json string of the next optimizer candidate, None while the optimizer waits for results
+    # screened out candidates are told their predicted race time
+    def _ask_optimizer(self):
+        for candidate_index in range(self.c_max_screened_candidates_per_evaluation):
+            candidate = self._optimizer.ask()
+            if(candidate is None):
+                return None
+
+            candidate_id, candidate_vector = candidate
+            if(candidate_index + 1 < self.c_max_screened_candidates_per_evaluation and self._is_candidate_screened_out(candidate_vector) == True):
+                self._optimizer.tell(candidate_id, self._surrogate_model.predict(candidate_vector)[0])
+                continue
+
+            candidate_json_string = self._control_properties_vector.to_json_string(candidate_vector)
+            self._optimizer_candidate_ids[candidate_json_string] = candidate_id
+            return candidate_json_string
+
+
+    # get the next candidate of the candidate generator, skipping candidates that are screened out
+    def _generate_candidate(self):
+        for candidate_index in range(self.c_max_screened_candidates_per_evaluation):
+            candidate = self._candidate_generator(self._best_control_properties_json_string, self._best_race_time)
+            if(candidate_index + 1 < self.c_max_screened_candidates_per_evaluation and self._is_candidate_screened_out(self._control_properties_vector.to_vector(candidate)) == True):
+                continue
+
+            return candidate
+
+
+    # check if the surrogate model deems the given parameter vector unlikely to beat the best race time
+    def _is_candidate_screened_out(self, candidate_vector):
+        return self._surrogate_model is not None and self._surrogate_model.is_candidate_promising(candidate_vector, self._best_race_time) == False
+
+
+    # get the environment worker processes are launched with, it lets stand-in workers import the PIE Script protocol
+    @staticmethod
+    def get_worker_environment():
+        environment = dict(os.environ)
+        module_directories = [os.path.dirname(os.path.abspath(__file__)), os.path.dirname(os.path.abspath(sys.modules[PIEScriptFrameCodec.__module__].__file__))]
+        if(environment.get("PYTHONPATH", "") != ""):
+            module_directories.append(environment["PYTHONPATH"])
+        environment["PYTHONPATH"] = os.pathsep.join(module_directories)
+
+
+        return environment
+
+
+    # builds the command that launches a headless editor worker, '{port}' is replaced per worker when launched
+    # the PIE Script plugin is expected to read the socket port from the -PIEScriptSocketPort argument
+    @staticmethod
+    def make_editor_worker_command(editor_path, project_path, level_path, game_mode_path, ai_controller_path, random_seed=None, fixed_timestep=None, time_dilation=None):
+        worker_script = "import racing_ai_tuner; racing_ai_tuner.RacingAITuningWorker.run_worker(" + repr(level_path) + ", " + repr(game_mode_path) + ", " + repr(ai_controller_path) + ", " + repr(random_seed) + ", " + repr(fixed_timestep) + ", " + repr(time_dilation) + ")"
+
+
+        return [editor_path, project_path, "-ExecutePythonScript=" + worker_script, "-PIEScriptSocketPort={port}", "-RenderOffscreen", "-unattended", "-nosplash", "-nosound"]
+
+
+    # builds the command that launches a stand-in worker process, used to measure the orchestrator without an editor
+    @staticmethod
+    def make_stand_in_worker_command(race_duration, noise=0.0):
+        stand_in_worker_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), "racing_ai_tuning_stand_in_worker.py")
+
+
+        return [sys.executable, stand_in_worker_path, "--port", "{port}", "--race-duration", str(race_duration), "--noise", str(noise), "--seed", "{worker_index}"]
+
+
+# runs the orchestrator from the command line, with stand-in workers unless an editor is given
+def main(arguments=None):
+    parser = argparse.ArgumentParser(description="evaluate racing ai control properties on a pool of worker processes",
+        epilog="run it from the repository checkout, e.g. 'python Racing-AI/racing_ai_tuning_orchestrator.py --workers 4 --evaluations 100', the PIE-Script directory next to Racing-AI is added to the module path")
+    parser.add_argument("--workers", type=int, default=os.cpu_count())
+    parser.add_argument("--evaluations", type=int, default=100)
+    parser.add_argument("--base-port", type=int, default=47000)
+    parser.add_argument("--initial-control-properties", default='{"throttle": 1.0, "steering": 1.0, "braking_distance": 1.0}')
+    parser.add_argument("--race-duration", type=float, default=0.1, help="simulated race duration of stand-in workers in seconds")
+    parser.add_argument("--editor", help="path to the editor executable, launches headless editor workers instead of stand-ins")
+    parser.add_argument("--project")
+    parser.add_argument("--level")
+    parser.add_argument("--game-mode")
+    parser.add_argument("--ai-controller")
+    parser.add_argument("--random-seed", type=int, help="seed every race of editor workers with, together with --fixed-timestep races become repeatable")
+    parser.add_argument("--fixed-timestep", type=float, help="fixed time step in seconds editor worker races advance by every frame")
+    parser.add_argument("--time-dilation", type=float, help="global time dilation of editor worker races")
+    parser.add_argument("--optimizer", choices=sorted(c_racing_ai_tuning_optimizer_classes.keys()), help="optimizer proposing the candidates, random perturbations of the best candidate when not given")
+    parser.add_argument("--surrogate-screening", action="store_true", help="skip candidates a surrogate model deems unlikely to beat the best race time")
+    parser.add_argument("--results-store", help="JSON lines file results are recorded to, a run continues from the best result already in it")
+    parsed_arguments = parser.parse_args(arguments)
+    logging.basicConfig(level=logging.INFO, format="%(levelname)s: %(message)s")
+
+    if(parsed_arguments.editor is not None):
+        worker_command = RacingAITuningOrchestrator.make_editor_worker_command(parsed_arguments.editor, parsed_arguments.project, parsed_arguments.level, parsed_arguments.game_mode, parsed_arguments.ai_controller, parsed_arguments.random_seed, parsed_arguments.fixed_timestep, parsed_arguments.time_dilation)
+    else:
+        worker_command = RacingAITuningOrchestrator.make_stand_in_worker_command(parsed_arguments.race_duration)
+
+    orchestrator = RacingAITuningOrchestrator(worker_command, parsed_arguments.workers, parsed_arguments.base_port)
+    orchestrator.set_optimizer(parsed_arguments.optimizer)
+    orchestrator.set_surrogate_screening_enabled(parsed_arguments.surrogate_screening)
+    results_store = None
+    if(parsed_arguments.results_store is not None):
+        results_store = RacingAITuningResultsStore(parsed_arguments.results_store)
+        results_store.open()
+        orchestrator.set_results_store(results_store)
+
+    orchestrator.start_workers()
+    try:
+        if(orchestrator.connect_workers() == False):
+            return 1
+
+        summary = orchestrator.run(parsed_arguments.initial_control_properties, parsed_arguments.evaluations)
+    finally:
+        orchestrator.stop_workers()
+        if(results_store is not None):
+            results_store.close()
+
+    print(json.dumps(summary, indent=4))
+
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,194 @@
+import os
+import json
+import time
+import logging
+
+
+# log messages of the racing ai tuning modules go through the standard logging module, the tuner forwards them
+# to the editor's output log
+c_logger = logging.getLogger("racing_ai_tuning.results_store")
+
+
+# append-only store of tuning results in a JSON lines file, one evaluated control properties set per line.
+# records are buffered in memory and written in batches, a crash of the process loses at most the records of the
+# unflushed batch. written batches are synced to disk when the store is closed, or on every flush if asked to,
+# which also survives a crash of the operating system at the cost of a disk sync per batch.
+# a tuning run reopening the same file can resume from the records it finds there.
+class RacingAITuningResultsStore():
+
+    def __init__(self, file_path, flush_batch_size=8, flush_interval=30.0, b_sync_every_flush=False):
+        self._file_path = file_path
+        self._file = None
+        self._results = []
+        self._pending_lines = []
+        self._last_flush_timestamp = time.monotonic()
+        self._best_result = None
+        self.c_flush_batch_size = flush_batch_size
+        self.c_flush_interval = flush_interval
+        self._b_sync_every_flush = b_sync_every_flush
+
+
+    # get the path of the results file
+    def get_file_path(self):
+        return self._file_path
+
+
+    # get every result loaded from the file or appended since, in the order they were recorded
+    def get_results(self):
+        return self._results
+
+
+    # get the number of recorded results
+    def get_number_of_results(self):
+        return len(self._results)
+
+
+    # get the number of appended results that have not been written to the file yet
+    def get_number_of_pending_results(self):
+        return len(self._pending_lines)
+
+
+    # get the recorded full race result with the lowest race time, None if no result has a race time
+    # results of aborted races do not count, their race time is the time they were on course for
+    def get_best_result(self):
+        return self._best_result
+
+
+    # enable / disable syncing the results file to disk every time pending results are written
+    def set_sync_every_flush_enabled(self, b_enabled):
+        self._b_sync_every_flush = b_enabled
+
+
+    # check if the results file is synced to disk every time pending results are written
+    def is_sync_every_flush_enabled(self):
+        return self._b_sync_every_flush
+
+
+    # check if the results file is open for appending
+    def is_open(self):
+        return self._file is not None
+
+
+    # loads the results already in the file and opens it for appending, creating it if needed
+    # returns the number of loaded results
+    def open(self):
+        if(self.is_open() == True):
+            return len(self._results)
+
+        self._results = []
+        self._best_result = None
+
+        if(os.path.exists(self._file_path) == True):
+            self._load_results()
+
+        directory = os.path.dirname(os.path.abspath(self._file_path))
+        os.makedirs(directory, exist_ok=True)
+
+        self._file = open(self._file_path, "a", encoding="utf-8")
+        self._last_flush_timestamp = time.monotonic()
+
+
+        return len(self._results)
+
+
+    # writes pending results, syncs them to disk and closes the results file
+    def close(self):
+        if(self.is_open() == False):
+            return
+
+        self.flush()
+        self.sync()
+        self._file.close()
+        self._file = None
+
+
+        return
+
+
+    # records an evaluated control properties set, written once a batch is complete or the flush interval passed
+    # control_properties_json_string is None when the race ran with control properties the tuner did not set
+    # returns the recorded result dictionary
+    def append_result(self, control_properties_json_string, race_time, **metadata):
+        result = {
+            "index": len(self._results),
+            "timestamp": time.time(),
+            "control_properties": control_properties_json_string,
+            "race_time": race_time,
+        }
+        result.update(metadata)
+
+        self._add_result(result)
+        self._pending_lines.append(json.dumps(result) + "\n")
+
+        if(len(self._pending_lines) >= self.c_flush_batch_size or time.monotonic() - self._last_flush_timestamp >= self.c_flush_interval):
+            self.flush()
+
+
+        return result
+
+
+    # writes every pending result to the results file and hands them to the operating system
+    def flush(self):
+        self._last_flush_timestamp = time.monotonic()
+
+        if(len(self._pending_lines) == 0 or self.is_open() == False):
+            return
+
+        self._file.write("".join(self._pending_lines))
+        self._file.flush()
+        self._pending_lines = []
+
+        if(self._b_sync_every_flush == True):
+            self.sync()
+
+
+        return
+
+
+    # waits until the written results are on disk
+    def sync(self):
+        if(self.is_open() == False):
+            return
+
+        os.fsync(self._file.fileno())
+
+
+        return
+
+
+    # keeps track of a recorded result and of the best one
+    def _add_result(self, result):
+        self._results.append(result)
+
+        # race times of races shortened to a fraction of the race are not comparable to full ones, and aborted
+        # races only have the time they were on course for
+        race_time = result.get("race_time")
+        if(result.get("fidelity", 1.0) < 1.0 or result.get("aborted", False) == True):
+            race_time = None
+
+        if(race_time is not None and (self._best_result is None or race_time < self._best_result["race_time"])):
+            self._best_result = result
+
+
+        return
+
+
+    # reads the results in the file, a partially written last line left by a crash is dropped
+    def _load_results(self):
+        with open(self._file_path, "r", encoding="utf-8") as results_file:
+            lines = results_file.readlines()
+
+        for line_index, line in enumerate(lines):
+            try:
+                self._add_result(json.loads(line))
+            except ValueError:
+                if(line_index < len(lines) - 1):
+                    c_logger.warning("skipping unreadable result on line '" + str(line_index + 1) + "' of '" + self._file_path + "'")
+
+        # a partial last line has no newline, terminate it so appended results start on a line of their own
+        if(len(lines) > 0 and lines[-1].endswith("\n") == False):
+            with open(self._file_path, "a", encoding="utf-8") as results_file:
+                results_file.write("\n")
+
+
+        return
@@ -0,0 +1,132 @@
+import sys
+import math
+
+
+# successive halving over race fidelities, the fraction of the full race a candidate is raced for. a bracket
+# races many candidates at the lowest fidelity, promotes the best 1 / reduction_factor of them to the next
+# fidelity and so on until the survivors race the full race. the next bracket starts from the best full race.
+class RacingAITuningSuccessiveHalvingScheduler():
+
+    def __init__(self, candidate_generator, number_of_candidates=27, minimum_fidelity=1.0 / 9.0, reduction_factor=3):
+        self._candidate_generator = candidate_generator
+        self._number_of_candidates = number_of_candidates
+        self._reduction_factor = reduction_factor
+        self._rung_fidelities = RacingAITuningSuccessiveHalvingScheduler.get_rung_fidelities(minimum_fidelity, reduction_factor)
+        self._rung_statistics = [{"fidelity": fidelity, "evaluations": 0, "full_race_equivalents": 0.0, "best_race_time": None} for fidelity in self._rung_fidelities]
+        self._best_control_properties_json_string = None
+        self._best_race_time = sys.float_info.max
+        self._number_of_brackets = 0
+        self._rung_index = 0
+        self._rung_candidates = []
+        self._unasked_candidate_indices = []
+        self._rung_race_times = {}
+        self._pending_candidates = {}
+        self._next_candidate_id = 0
+
+
+    # get the fidelity of every rung, each reduction_factor times the previous one and the last one 1.0
+    @staticmethod
+    def get_rung_fidelities(minimum_fidelity, reduction_factor):
+        number_of_rungs = 1 + max(0, int(math.ceil(math.log(1.0 / minimum_fidelity) / math.log(reduction_factor) - 1e-9)))
+
+
+        return [min(1.0, minimum_fidelity * reduction_factor ** rung_index) if rung_index < number_of_rungs - 1 else 1.0 for rung_index in range(number_of_rungs)]
+
+
+    # starts the first bracket from the given control properties json string
+    def start(self, initial_control_properties_json_string):
+        self._best_control_properties_json_string = initial_control_properties_json_string
+        self._start_bracket()
+
+
+    # get a (candidate id, control properties json string, fidelity) tuple to race next,
+    # None while the rung waits for the results of its last candidates
+    def ask(self):
+        if(len(self._unasked_candidate_indices) == 0):
+            return None
+
+        candidate_index = self._unasked_candidate_indices.pop(0)
+        candidate_id = self._next_candidate_id
+        self._next_candidate_id += 1
+        self._pending_candidates[candidate_id] = candidate_index
+
+
+        return candidate_id, self._rung_candidates[candidate_index], self._rung_fidelities[self._rung_index]
+
+
+    # reports the race time of the candidate with the given id at the fidelity it was asked for, None when its race failed
+    def tell(self, candidate_id, race_time):
+        candidate_index = self._pending_candidates.pop(candidate_id, None)
+        if(candidate_index is None):
+            return
+
+        fidelity = self._rung_fidelities[self._rung_index]
+        rung_statistics = self._rung_statistics[self._rung_index]
+        rung_statistics["evaluations"] += 1
+        rung_statistics["full_race_equivalents"] += fidelity
+        if(race_time is not None and (rung_statistics["best_race_time"] is None or race_time < rung_statistics["best_race_time"])):
+            rung_statistics["best_race_time"] = race_time
+
+        self._rung_race_times[candidate_index] = race_time if race_time is not None else sys.float_info.max
+
+        if(len(self._rung_race_times) == len(self._rung_candidates)):
+            self._finish_rung()
+
+
+        return
+
+
+    # get the best full race time and the control properties json string that achieved it
+    def get_best(self):
+        return self._best_control_properties_json_string, self._best_race_time
+
+
+    # get the number of brackets started
+    def get_number_of_brackets(self):
+        return self._number_of_brackets
+
+
+    # get how the simulation budget was spent, one dictionary per rung with its fidelity, the number of races,
+    # their cost in full races and the best race time raced at that fidelity
+    def get_budget_report(self):
+        return [dict(rung_statistics) for rung_statistics in self._rung_statistics]
+
+
+    # promotes the best candidates of the finished rung to the next one, or starts a new bracket after the last one
+    def _finish_rung(self):
+        ranked_candidate_indices = sorted(self._rung_race_times.keys(), key=lambda candidate_index: self._rung_race_times[candidate_index])
+
+        if(self._rung_index == len(self._rung_fidelities) - 1):
+            best_candidate_index = ranked_candidate_indices[0]
+            if(self._rung_race_times[best_candidate_index] < self._best_race_time):
+                self._best_race_time = self._rung_race_times[best_candidate_index]
+                self._best_control_properties_json_string = self._rung_candidates[best_candidate_index]
+            self._start_bracket()
+            return
+
+        number_of_promoted_candidates = max(1, len(self._rung_candidates) // self._reduction_factor)
+        self._rung_index += 1
+        self._set_rung_candidates([self._rung_candidates[candidate_index] for candidate_index in ranked_candidate_indices[:number_of_promoted_candidates]])
+
+
+        return
+
+
+    # generates the candidates of a new bracket around the best control properties so far
+    def _start_bracket(self):
+        self._number_of_brackets += 1
+        self._rung_index = 0
+        self._set_rung_candidates([self._candidate_generator(self._best_control_properties_json_string, self._best_race_time) for candidate_index in range(self._number_of_candidates)])
+
+
+        return
+
+
+    # sets the candidates to race in the current rung
+    def _set_rung_candidates(self, candidates):
+        self._rung_candidates = candidates
+        self._unasked_candidate_indices = list(range(len(candidates)))
+        self._rung_race_times = {}
+
+
+        return
@@ -0,0 +1,135 @@
+# the orchestrator is imported first, it puts the sibling PIE-Script directory on the path for the protocol
+import racing_ai_tuning_orchestrator
+from racing_ai_tuning_worker_messages import RacingAITuningWorkerMessages
+from pie_script_protocol import PIEScriptFrameCodec, PIEScriptStreamDecoder
+
+import sys
+import json
+import math
+import time
+import random
+import socket
+import argparse
+
+
+# stand-in for an editor running a RacingAITuningWorker. speaks the same socket protocol as a PIE Script
+# worker and answers every candidate with a synthetic race time after sleeping for the simulated race duration,
+# which lets the orchestrator be run and measured without launching editors.
+class RacingAITuningStandInWorker():
+
+    # greeting of the PIE Script defaults, repeated here so the stand-in runs without the editor
+    c_socket_message_greeting = "PIEScriptGreeting"
+
+    def __init__(self, port, race_duration, noise, seed):
+        self._port = port
+        self._race_duration = race_duration
+        self._noise = noise
+        self._rng = random.Random(seed)
+        self._stream_decoder = PIEScriptStreamDecoder()
+        self._frame_protocol_version = 0
+        self._b_is_expecting_control_properties = False
+
+
+    # synthetic race time that is fastest when every number in the control properties equals 1
+    @staticmethod
+    def compute_race_time(control_properties_json_string):
+        def squared_log_distance(value):
+            if(isinstance(value, bool)):
+                return 0.0
+            if(isinstance(value, (int, float))):
+                return math.log(max(abs(value), 1e-6)) ** 2
+            if(isinstance(value, dict)):
+                return sum(squared_log_distance(item) for item in value.values())
+            if(isinstance(value, list)):
+                return sum(squared_log_distance(item) for item in value)
+            return 0.0
+
+
+        return 60.0 + 100.0 * squared_log_distance(json.loads(control_properties_json_string))
+
+
+    # accepts the orchestrator and answers its evaluation requests until it disconnects
+    def serve(self):
+        server_socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        server_socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        server_socket.bind(("127.0.0.1", self._port))
+        server_socket.listen(1)
+
+        client_socket, client_address = server_socket.accept()
+        client_socket.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+
+        # like a PIE Script, greet in the legacy text encoding and switch to frames once the client asks for them
+        client_socket.sendall(self._encode_message(RacingAITuningStandInWorker.c_socket_message_greeting))
+
+        try:
+            while(True):
+                data = client_socket.recv(65536)
+                if(len(data) == 0):
+                    break
+
+                for frame_type, payload in self._stream_decoder.feed(data):
+                    if(frame_type == PIEScriptFrameCodec.c_frame_type_handshake):
+                        self._frame_protocol_version = min(payload[0], PIEScriptFrameCodec.c_protocol_version)
+                        client_socket.sendall(PIEScriptFrameCodec.encode_handshake_frame(self._frame_protocol_version))
+                    elif(PIEScriptStreamDecoder.is_message_frame_type(frame_type) == True):
+                        self._handle_message(client_socket, *PIEScriptStreamDecoder.decode_typed_message(frame_type, payload))
+        finally:
+            client_socket.close()
+            server_socket.close()
+
+
+        return
+
+
+    # encodes a message the way a PIE Script connection does, as plain text until a frame protocol version is agreed
+    def _encode_message(self, msg):
+        if(self._frame_protocol_version > 0):
+            return PIEScriptFrameCodec.encode_message_frame(msg, self._frame_protocol_version)
+
+
+        return msg.encode()
+
+
+    # runs the simulated race for received control properties and replies with its race time, the control
+    # properties arrive as the payload of a typed message or as the message following the evaluation request
+    def _handle_message(self, client_socket, msg, payload=None):
+        control_properties_json_string = None
+        if(msg == RacingAITuningWorkerMessages.c_evaluate_control_properties):
+            if(payload is None):
+                self._b_is_expecting_control_properties = True
+            control_properties_json_string = payload
+        elif(self._b_is_expecting_control_properties == True):
+            self._b_is_expecting_control_properties = False
+            control_properties_json_string = msg
+
+        if(control_properties_json_string is None):
+            return
+
+        time.sleep(self._race_duration)
+        race_time = RacingAITuningStandInWorker.compute_race_time(control_properties_json_string) + self._rng.gauss(0.0, self._noise)
+        if(self._frame_protocol_version >= PIEScriptFrameCodec.c_typed_message_protocol_version):
+            client_socket.sendall(PIEScriptFrameCodec.encode_typed_message_frame(RacingAITuningWorkerMessages.c_race_time, str(race_time), self._frame_protocol_version))
+        else:
+            client_socket.sendall(self._encode_message(RacingAITuningWorkerMessages.c_race_time))
+            client_socket.sendall(self._encode_message(str(race_time)))
+
+
+        return
+
+
+def main(arguments=None):
+    parser = argparse.ArgumentParser(description="stand-in racing ai tuning worker")
+    parser.add_argument("--port", type=int, required=True)
+    parser.add_argument("--race-duration", type=float, default=0.1)
+    parser.add_argument("--noise", type=float, default=0.0)
+    parser.add_argument("--seed", type=int, default=0)
+    parsed_arguments = parser.parse_args(arguments)
+
+    RacingAITuningStandInWorker(parsed_arguments.port, parsed_arguments.race_duration, parsed_arguments.noise, parsed_arguments.seed).serve()
+
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
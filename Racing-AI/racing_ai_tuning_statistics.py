@@ -0,0 +1,174 @@
+import math
+import array
+
+
+# race time samples of every raced control properties set, kept in compact double arrays, and the tests that
+# decide whether a candidate races faster than the best one despite the noise of the physics simulation.
+# single samples are compared using the noise pooled over every candidate raced more than once.
+class RacingAITuningRaceTimeStatistics():
+
+    c_comparison_faster = "faster"
+    c_comparison_slower = "slower"
+    c_comparison_undecided = "undecided"
+
+    def __init__(self, significance_level=0.05, prior_noise_deviation=None):
+        self._samples = {}
+        self._significance_level = significance_level
+        self._prior_noise_deviation = prior_noise_deviation
+
+
+    # get the one sided significance level candidates are tested at
+    def get_significance_level(self):
+        return self._significance_level
+
+
+    # records a race time of the control properties with the given key
+    def add_sample(self, key, race_time):
+        samples = self._samples.get(key)
+        if(samples is None):
+            samples = array.array("d")
+            self._samples[key] = samples
+
+        samples.append(race_time)
+
+
+    # get the race time samples of the control properties with the given key, an empty array if they were not raced
+    def get_samples(self, key):
+        return self._samples.get(key, array.array("d"))
+
+
+    # get the number of race time samples of the control properties with the given key
+    def get_number_of_samples(self, key):
+        return len(self._samples.get(key, ()))
+
+
+    # get the mean race time of the control properties with the given key, None if they were not raced
+    def get_mean(self, key):
+        samples = self._samples.get(key)
+        if(samples is None or len(samples) == 0):
+            return None
+
+
+        return math.fsum(samples) / len(samples)
+
+
+    # get the sample variance of the race times of the control properties with the given key, None with fewer than 2 samples
+    def get_variance(self, key):
+        samples = self._samples.get(key)
+        if(samples is None or len(samples) < 2):
+            return None
+
+        mean = math.fsum(samples) / len(samples)
+
+
+        return math.fsum((sample - mean) ** 2 for sample in samples) / (len(samples) - 1)
+
+
+    # get the race time noise variance pooled over every candidate with several samples and its degrees of freedom,
+    # the prior noise with infinite degrees of freedom when no candidate was raced twice, (None, 0) without a prior
+    def get_pooled_noise_variance(self):
+        sum_of_squares = 0.0
+        degrees_of_freedom = 0
+        for samples in self._samples.values():
+            if(len(samples) >= 2):
+                mean = math.fsum(samples) / len(samples)
+                sum_of_squares += math.fsum((sample - mean) ** 2 for sample in samples)
+                degrees_of_freedom += len(samples) - 1
+
+        if(degrees_of_freedom > 0):
+            return sum_of_squares / degrees_of_freedom, degrees_of_freedom
+
+        if(self._prior_noise_deviation is not None):
+            return self._prior_noise_deviation ** 2, math.inf
+
+
+        return None, 0
+
+
+    # tests whether the candidate races faster or slower than the baseline at the significance level,
+    # returns c_comparison_faster, c_comparison_slower or c_comparison_undecided when more samples are needed
+    def compare(self, candidate_key, baseline_key):
+        candidate_mean = self.get_mean(candidate_key)
+        baseline_mean = self.get_mean(baseline_key)
+        if(candidate_mean is None or baseline_mean is None):
+            return self.c_comparison_undecided
+
+        candidate_variance = self.get_variance(candidate_key)
+        baseline_variance = self.get_variance(baseline_key)
+        number_of_candidate_samples = self.get_number_of_samples(candidate_key)
+        number_of_baseline_samples = self.get_number_of_samples(baseline_key)
+
+        if(candidate_variance is not None and baseline_variance is not None):
+            # welch's t-test
+            candidate_error = candidate_variance / number_of_candidate_samples
+            baseline_error = baseline_variance / number_of_baseline_samples
+            standard_error = math.sqrt(candidate_error + baseline_error)
+            degrees_of_freedom = math.inf
+            if(candidate_error + baseline_error > 0.0):
+                degrees_of_freedom = (candidate_error + baseline_error) ** 2 / (candidate_error ** 2 / (number_of_candidate_samples - 1) + baseline_error ** 2 / (number_of_baseline_samples - 1))
+        else:
+            # student's t-test with the pooled noise
+            noise_variance, degrees_of_freedom = self.get_pooled_noise_variance()
+            if(noise_variance is None):
+                return self.c_comparison_undecided
+            standard_error = math.sqrt(noise_variance * (1.0 / number_of_candidate_samples + 1.0 / number_of_baseline_samples))
+
+        # noiseless race times compare directly
+        if(standard_error <= 0.0):
+            if(candidate_mean < baseline_mean):
+                return self.c_comparison_faster
+            return self.c_comparison_slower
+
+        t = (baseline_mean - candidate_mean) / standard_error
+        if(1.0 - RacingAITuningRaceTimeStatistics.student_t_cdf(t, degrees_of_freedom) < self._significance_level):
+            return self.c_comparison_faster
+        if(RacingAITuningRaceTimeStatistics.student_t_cdf(t, degrees_of_freedom) < self._significance_level):
+            return self.c_comparison_slower
+
+
+        return self.c_comparison_undecided
+
+
+    # cumulative distribution function of student's t distribution
+    @staticmethod
+    def student_t_cdf(t, degrees_of_freedom):
+        if(math.isinf(degrees_of_freedom)):
+            return 0.5 * (1.0 + math.erf(t / math.sqrt(2.0)))
+
+        tail = 0.5 * RacingAITuningRaceTimeStatistics.regularized_incomplete_beta(degrees_of_freedom / (degrees_of_freedom + t * t), degrees_of_freedom / 2.0, 0.5)
+
+
+        return 1.0 - tail if t > 0.0 else tail
+
+
+    # regularized incomplete beta function, evaluated with its continued fraction
+    @staticmethod
+    def regularized_incomplete_beta(x, a, b):
+        if(x <= 0.0):
+            return 0.0
+        if(x >= 1.0):
+            return 1.0
+
+        # the continued fraction converges quickly below the mean of the distribution, use the symmetry above it
+        if(x > (a + 1.0) / (a + b + 2.0)):
+            return 1.0 - RacingAITuningRaceTimeStatistics.regularized_incomplete_beta(1.0 - x, b, a)
+
+        log_front = math.lgamma(a + b) - math.lgamma(a) - math.lgamma(b) + a * math.log(x) + b * math.log(1.0 - x)
+        tiny = 1e-300
+        c = 1.0
+        d = 1.0 - (a + b) * x / (a + 1.0)
+        d = 1.0 / (d if abs(d) > tiny else tiny)
+        fraction = d
+
+        for m in range(1, 200):
+            for numerator in (m * (b - m) * x / ((a + 2.0 * m - 1.0) * (a + 2.0 * m)), -(a + m) * (a + b + m) * x / ((a + 2.0 * m) * (a + 2.0 * m + 1.0))):
+                d = 1.0 + numerator * d
+                d = 1.0 / (d if abs(d) > tiny else tiny)
+                c = 1.0 + numerator / c
+                c = c if abs(c) > tiny else tiny
+                fraction *= d * c
+            if(abs(d * c - 1.0) < 1e-12):
+                break
+
+
+        return math.exp(log_front) * fraction / a
@@ -0,0 +1,202 @@
+import math
+
+
+# gaussian process regression of race times over control property parameter vectors, used to screen out
+# candidates that are unlikely to beat the best race time before they cost a race. parameters are scaled by the
+# magnitude of the first observation and the length scale follows the median distance between observations.
+class RacingAITuningSurrogateModel():
+
+    def __init__(self, probability_of_improvement_threshold=0.05, minimum_number_of_observations=None, maximum_number_of_observations=150, noise=0.01):
+        self._probability_of_improvement_threshold = probability_of_improvement_threshold
+        self._minimum_number_of_observations = minimum_number_of_observations
+        self._maximum_number_of_observations = maximum_number_of_observations
+        self._noise = noise
+        self._observations = []
+        self._parameter_scales = None
+        self._b_is_fit = False
+        self._inputs = []
+        self._cholesky_factor = []
+        self._weights = []
+        self._output_mean = 0.0
+        self._output_deviation = 1.0
+        self._length_scale = 1.0
+        self._number_of_screened_candidates = 0
+        self._number_of_skipped_candidates = 0
+
+
+    # get the number of race times the model is trained on
+    def get_number_of_observations(self):
+        return len(self._observations)
+
+
+    # get the number of candidates screened and the number of them that were skipped
+    def get_statistics(self):
+        return {
+            "observations": len(self._observations),
+            "screened": self._number_of_screened_candidates,
+            "skipped": self._number_of_skipped_candidates,
+        }
+
+
+    # check if the model has enough observations to predict race times
+    def is_ready(self):
+        if(self._parameter_scales is None):
+            return False
+
+        minimum_number_of_observations = self._minimum_number_of_observations
+        if(minimum_number_of_observations is None):
+            minimum_number_of_observations = 2 * len(self._parameter_scales) + 2
+
+
+        return len(self._observations) >= minimum_number_of_observations
+
+
+    # trains the model on the race time of the given parameter vector, failed races are not observed
+    def add_observation(self, vector, race_time):
+        if(race_time is None):
+            return
+
+        if(self._parameter_scales is None):
+            self._parameter_scales = [abs(value) if value != 0.0 else 1.0 for value in vector]
+
+        self._observations.append((list(vector), race_time))
+
+        # keep the best observations and the most recent ones, the fit grows with the cube of their number
+        if(len(self._observations) > self._maximum_number_of_observations):
+            best_observation_index = min(range(len(self._observations)), key=lambda index: self._observations[index][1])
+            oldest_observation_index = 1 if best_observation_index == 0 else 0
+            del self._observations[oldest_observation_index]
+
+        self._b_is_fit = False
+
+
+        return
+
+
+    # get the predicted race time of the given parameter vector and its standard deviation, None if the model is not ready
+    def predict(self, vector):
+        if(self.is_ready() == False):
+            return None
+
+        if(self._b_is_fit == False):
+            self._fit()
+
+        scaled_vector = self._scale(vector)
+        covariances = [self._kernel(scaled_vector, scaled_input) for scaled_input in self._inputs]
+        standardized_mean = sum(covariance * weight for covariance, weight in zip(covariances, self._weights))
+        solved_covariances = RacingAITuningSurrogateModel._solve_lower_triangular(self._cholesky_factor, covariances)
+        standardized_variance = max(1.0 + self._noise - sum(value * value for value in solved_covariances), 1e-12)
+
+
+        return self._output_mean + standardized_mean * self._output_deviation, math.sqrt(standardized_variance) * self._output_deviation
+
+
+    # get the probability that the given parameter vector races faster than the given race time, None if the model is not ready
+    def get_probability_of_improvement(self, vector, best_race_time):
+        prediction = self.predict(vector)
+        if(prediction is None):
+            return None
+
+        mean, deviation = prediction
+
+
+        return 0.5 * (1.0 + math.erf((best_race_time - mean) / (deviation * math.sqrt(2.0))))
+
+
+    # check if the given parameter vector is worth a race, always true while the model is not ready
+    def is_candidate_promising(self, vector, best_race_time):
+        probability_of_improvement = self.get_probability_of_improvement(vector, best_race_time)
+        if(probability_of_improvement is None):
+            return True
+
+        self._number_of_screened_candidates += 1
+        if(probability_of_improvement >= self._probability_of_improvement_threshold):
+            return True
+
+        self._number_of_skipped_candidates += 1
+
+
+        return False
+
+
+    # fits the gaussian process to the observations
+    def _fit(self):
+        self._inputs = [self._scale(vector) for vector, race_time in self._observations]
+        race_times = [race_time for vector, race_time in self._observations]
+
+        self._output_mean = sum(race_times) / len(race_times)
+        self._output_deviation = math.sqrt(sum((race_time - self._output_mean) ** 2 for race_time in race_times) / len(race_times))
+        if(self._output_deviation <= 0.0):
+            self._output_deviation = 1.0
+        standardized_race_times = [(race_time - self._output_mean) / self._output_deviation for race_time in race_times]
+
+        # median heuristic for the length scale
+        distances = sorted(
+            math.sqrt(sum((a - b) ** 2 for a, b in zip(self._inputs[i], self._inputs[j])))
+            for i in range(len(self._inputs)) for j in range(i + 1, len(self._inputs)))
+        self._length_scale = distances[len(distances) // 2] if len(distances) > 0 and distances[len(distances) // 2] > 0.0 else 1.0
+
+        covariance_matrix = [[self._kernel(a, b) for b in self._inputs] for a in self._inputs]
+        for i in range(len(covariance_matrix)):
+            covariance_matrix[i][i] += self._noise
+
+        self._cholesky_factor = RacingAITuningSurrogateModel._cholesky(covariance_matrix)
+        self._weights = RacingAITuningSurrogateModel._solve_upper_triangular_transposed(self._cholesky_factor, RacingAITuningSurrogateModel._solve_lower_triangular(self._cholesky_factor, standardized_race_times))
+        self._b_is_fit = True
+
+
+        return
+
+
+    # get the given parameter vector divided by the parameter scales
+    def _scale(self, vector):
+        return [value / scale for value, scale in zip(vector, self._parameter_scales)]
+
+
+    # squared exponential covariance of two scaled parameter vectors
+    def _kernel(self, a, b):
+        squared_distance = sum((x - y) ** 2 for x, y in zip(a, b))
+
+
+        return math.exp(-0.5 * squared_distance / (self._length_scale * self._length_scale))
+
+
+    # get the lower triangular cholesky factor of the given symmetric positive definite matrix
+    @staticmethod
+    def _cholesky(matrix):
+        size = len(matrix)
+        factor = [[0.0] * size for i in range(size)]
+
+        for i in range(size):
+            for j in range(i + 1):
+                partial_sum = matrix[i][j] - sum(factor[i][k] * factor[j][k] for k in range(j))
+                if(i == j):
+                    factor[i][j] = math.sqrt(max(partial_sum, 1e-12))
+                else:
+                    factor[i][j] = partial_sum / factor[j][j]
+
+
+        return factor
+
+
+    # solves lower triangular factor * x = values
+    @staticmethod
+    def _solve_lower_triangular(factor, values):
+        solution = []
+        for i in range(len(values)):
+            solution.append((values[i] - sum(factor[i][k] * solution[k] for k in range(i))) / factor[i][i])
+
+
+        return solution
+
+
+    # solves transposed lower triangular factor * x = values
+    @staticmethod
+    def _solve_upper_triangular_transposed(factor, values):
+        size = len(values)
+        solution = [0.0] * size
+        for i in reversed(range(size)):
+            solution[i] = (values[i] - sum(factor[k][i] * solution[k] for k in range(i + 1, size))) / factor[i][i]
+
+
+        return solution
@@ -0,0 +1,7 @@
+# messages exchanged between the tuning orchestrator and its workers over the PIE Script socket protocol.
+# these are defined on the python side only, the runtime messenger never sees them.
+class RacingAITuningWorkerMessages():
+    c_orchestrator_hello = "RacingAITuningOrchestratorHello"
+    c_evaluate_control_properties = "RacingAITuningEvaluateControlProperties"
+    c_race_time = "RacingAITuningWorkerRaceTime"
+    c_evaluation_failed = "RacingAITuningWorkerEvaluationFailed"
@@ -0,0 +1,270 @@
+import os
+import sys
+
+# the stub unreal module next to this script stands in for the editor's
+c_benchmarks_directory = os.path.dirname(os.path.abspath(__file__))
+c_pie_script_directory = os.path.join(os.path.dirname(c_benchmarks_directory), "PIE-Script")
+sys.path[:0] = [c_benchmarks_directory, c_pie_script_directory]
+
+import unreal
+import pie_script
+from pie_script_core import PIEScriptMessageQueue, PIEScriptConnection
+from pie_script_protocol import PIEScriptStreamDecoder
+from pie_script_benchmark_messenger import make_benchmark_traffic, encode_messenger_message, c_protocol_legacy, c_protocol_frame
+
+import gc
+import json
+import time
+import socket
+import argparse
+import tracemalloc
+import subprocess
+
+
+# PIE Script that records when every message is dispatched and lets the benchmark end the session
+class PIEScriptBenchmarkScript(pie_script.PIEScript):
+
+    def __init__(self):
+        super().__init__()
+        self._dispatch_timestamps = None
+        self._b_has_received_end_play = False
+
+
+    # starts recording the time.perf_counter() timestamp of every dispatched message
+    def record_dispatch_timestamps(self):
+        self._dispatch_timestamps = []
+
+
+    # get the recorded dispatch timestamps
+    def get_dispatch_timestamps(self):
+        return self._dispatch_timestamps
+
+
+    # check if the end play message was dispatched
+    def has_received_end_play(self):
+        return self._b_has_received_end_play
+
+
+    # overridable handler for when a message is received from a PIE Script Messenger in a live PIE session
+    def receive_message(self, msg, b_was_handled):
+        if(self._dispatch_timestamps is not None):
+            self._dispatch_timestamps.append(time.perf_counter())
+
+        super().receive_message(msg, b_was_handled)
+
+
+        return
+
+
+    # overridable handler for when the end play message is received
+    # the benchmark disconnects the messenger itself once it has collected the results
+    def handle_end_play(self):
+        self._b_has_received_end_play = True
+
+
+        return
+
+
+# get the value the given fraction of the sorted values are lower than
+def get_percentile(sorted_values, fraction):
+    if(len(sorted_values) == 0):
+        return 0.0
+
+
+    return sorted_values[min(len(sorted_values) - 1, int(fraction * len(sorted_values)))]
+
+
+# replays the benchmark traffic from a messenger process over a socket and measures how fast the PIE Script
+# dispatches it and how long every message takes from being sent to being dispatched
+def run_transport_benchmark(protocol, number_of_races, messages_per_second=0.0, listen_buffer_size=4096, b_zero_copy_receive=True, tick_interval=0.001, timeout=120.0):
+    script = PIEScriptBenchmarkScript()
+    script.set_listen_buffer_size(listen_buffer_size)
+    script.set_zero_copy_receive_enabled(b_zero_copy_receive)
+    script.record_dispatch_timestamps()
+    script.start_listening()
+
+    messenger_command = [
+        sys.executable, os.path.join(c_benchmarks_directory, "pie_script_benchmark_messenger.py"),
+        "--port", str(script.c_port),
+        "--protocol", protocol,
+        "--races", str(number_of_races),
+        "--messages-per-second", str(messages_per_second),
+    ]
+    environment = dict(os.environ)
+    environment["PYTHONPATH"] = os.pathsep.join([c_pie_script_directory, environment.get("PYTHONPATH", "")])
+    messenger_process = subprocess.Popen(messenger_command, stdout=subprocess.PIPE, env=environment)
+
+    try:
+        # tick the script the way the editor's periodic timer does, only much more often
+        deadline = time.perf_counter() + timeout
+        while(script.has_received_end_play() == False):
+            if(time.perf_counter() >= deadline or messenger_process.poll() is not None):
+                raise RuntimeError("the messenger did not finish replaying its traffic")
+            script.handle_editor_simulation_periodic_tick()
+            time.sleep(tick_interval)
+
+        for connection_id in script.get_connection_ids():
+            script.disconnect_client(connection_id)
+        messenger_output, messenger_errors = messenger_process.communicate(timeout=timeout)
+    finally:
+        if(messenger_process.poll() is None):
+            messenger_process.kill()
+        instrumentation_report = script.get_instrumentation_report()
+        script.close()
+
+    send_timestamps = json.loads(messenger_output)
+    dispatch_timestamps = script.get_dispatch_timestamps()
+    if(len(dispatch_timestamps) != len(send_timestamps)):
+        raise RuntimeError("'" + str(len(send_timestamps)) + "' messages were sent but '" + str(len(dispatch_timestamps)) + "' dispatched")
+
+    dispatch_latencies = sorted(dispatch_timestamp - send_timestamp for send_timestamp, dispatch_timestamp in zip(send_timestamps, dispatch_timestamps))
+    elapsed_time = dispatch_timestamps[-1] - send_timestamps[0]
+    queue_wait = instrumentation_report["histograms"].get("queue_wait", {})
+
+
+    return {
+        "messages": len(dispatch_timestamps),
+        "bytes": instrumentation_report["counters"].get("bytes_received", 0),
+        "elapsed": elapsed_time,
+        "messages_per_second": len(dispatch_timestamps) / elapsed_time,
+        "megabytes_per_second": instrumentation_report["counters"].get("bytes_received", 0) / elapsed_time / 1e6,
+        "dispatch_latency_p50_ms": get_percentile(dispatch_latencies, 0.5) * 1000.0,
+        "dispatch_latency_p99_ms": get_percentile(dispatch_latencies, 0.99) * 1000.0,
+        "queue_wait_p50_ms": queue_wait.get("p50", 0.0) * 1000.0,
+        "queue_wait_p99_ms": queue_wait.get("p99", 0.0) * 1000.0,
+    }
+
+
+# runs the given function once for every item while tracing allocations, prepare_item is called on every item
+# before it is handled without being measured. returns the average number of bytes allocated while handling an
+# item, taken as the peak of the traced memory above what was allocated before it, and the number of memory
+# blocks per item that are still allocated once every item was handled. allocations made in this file are not counted.
+def measure_allocations(handle_item, items, prepare_item=None):
+    gc.collect()
+    tracemalloc.start()
+    try:
+        snapshot_before = tracemalloc.take_snapshot()
+        allocated_bytes = 0
+        for item in items:
+            if(prepare_item is not None):
+                prepare_item(item)
+            traced_memory_before = tracemalloc.get_traced_memory()[0]
+            tracemalloc.reset_peak()
+            handle_item(item)
+            allocated_bytes += tracemalloc.get_traced_memory()[1] - traced_memory_before
+        snapshot_after = tracemalloc.take_snapshot()
+    finally:
+        tracemalloc.stop()
+
+    trace_filters = [tracemalloc.Filter(False, tracemalloc.__file__), tracemalloc.Filter(False, __file__)]
+    statistics = snapshot_after.filter_traces(trace_filters).compare_to(snapshot_before.filter_traces(trace_filters), "filename")
+
+
+    return {
+        "allocated_bytes_per_message": allocated_bytes / len(items),
+        "retained_blocks_per_message": sum(statistic.count_diff for statistic in statistics) / len(items),
+    }
+
+
+# measures the allocations of every stage a received message passes through, reading its bytes from the socket
+# into the receive ring buffer, decoding them, queueing the decoded message for the main thread and dispatching it
+def run_allocation_benchmark(protocol, number_of_races, listen_buffer_size=4096):
+    encoded_messages = [encode_messenger_message(msg, protocol) for msg in make_benchmark_traffic(number_of_races)]
+    stage_reports = {}
+
+    # receive -- the bytes of every message are waiting in the socket when it is read
+    receive_socket, send_socket = socket.socketpair()
+    try:
+        receive_buffer = PIEScriptStreamDecoder().get_receive_buffer()
+        def receive_message_bytes(encoded_message):
+            received_length = 0
+            while(received_length < len(encoded_message)):
+                received_length += receive_buffer.receive_from_socket(receive_socket, listen_buffer_size)[0]
+            receive_buffer.consume(received_length)
+        stage_reports["receive"] = measure_allocations(receive_message_bytes, encoded_messages, prepare_item=send_socket.sendall)
+    finally:
+        receive_socket.close()
+        send_socket.close()
+
+    # decode -- the bytes of every message are waiting in the receive ring buffer
+    decoder = PIEScriptStreamDecoder()
+    decoded_messages = []
+    def decode_message_bytes(encoded_message):
+        for decoded_message in decoder.decode_pending_messages():
+            decoded_messages.append(decoded_message)
+    stage_reports["decode"] = measure_allocations(decode_message_bytes, encoded_messages, prepare_item=decoder.get_receive_buffer().write)
+
+    # queue -- the listen thread enqueues every decoded message and the main thread dequeues it
+    message_queue = PIEScriptMessageQueue()
+    def queue_decoded_message(decoded_message):
+        message_queue.enqueue(decoded_message[0], decoded_message[1])
+        message_queue.dequeue()
+    stage_reports["queue"] = measure_allocations(queue_decoded_message, decoded_messages)
+
+    # dispatch -- every dequeued message is turned into a string, looked up in the message handler table and
+    # handed to its handler and receive_message()
+    script = PIEScriptBenchmarkScript()
+    connection_socket, messenger_socket = socket.socketpair()
+    try:
+        connection = PIEScriptConnection(1, connection_socket, None)
+        def dispatch_decoded_message(decoded_message):
+            script.dispatch_received_message(connection, decoded_message[0], decoded_message[1])
+        stage_reports["dispatch"] = measure_allocations(dispatch_decoded_message, decoded_messages)
+    finally:
+        connection_socket.close()
+        messenger_socket.close()
+
+
+    return stage_reports
+
+
+# runs the benchmark suite, every protocol sending as fast as possible and at a paced rate, and the allocation
+# benchmark of every protocol. returns the process exit code, 1 when a result misses a given threshold
+def main(arguments=None):
+    parser = argparse.ArgumentParser(description="benchmark the PIE Script socket transport against a scripted messenger")
+    parser.add_argument("--races", type=int, default=1000, help="number of races of traffic to replay, 5 messages each")
+    parser.add_argument("--paced-messages-per-second", type=float, default=2000.0, help="message rate of the paced runs")
+    parser.add_argument("--listen-buffer-size", type=int, default=4096)
+    parser.add_argument("--port", type=int, default=unreal.c_socket_port)
+    parser.add_argument("--output", help="JSON file the results are written to")
+    parser.add_argument("--min-messages-per-second", type=float, help="fail when an unpaced run dispatches fewer messages per second")
+    parser.add_argument("--max-dispatch-latency-p99-ms", type=float, help="fail when a paced run's 99th percentile dispatch latency is higher")
+    parser.add_argument("--max-allocated-bytes-per-message", type=float, help="fail when a stage allocates more bytes per message")
+    parsed_arguments = parser.parse_args(arguments)
+
+    unreal.c_socket_port = parsed_arguments.port
+    results = {"transport": {}, "allocations": {}}
+    failures = []
+
+    for protocol in (c_protocol_legacy, c_protocol_frame):
+        for run_name, messages_per_second in (("unpaced", 0.0), ("paced", parsed_arguments.paced_messages_per_second)):
+            result = run_transport_benchmark(protocol, parsed_arguments.races, messages_per_second, parsed_arguments.listen_buffer_size)
+            results["transport"][protocol + "_" + run_name] = result
+            print(protocol + " " + run_name + ": " + "{:.0f}".format(result["messages_per_second"]) + " messages/s, " + "{:.2f}".format(result["megabytes_per_second"]) + " MB/s, dispatch latency p50 " + "{:.3f}".format(result["dispatch_latency_p50_ms"]) + " ms p99 " + "{:.3f}".format(result["dispatch_latency_p99_ms"]) + " ms")
+
+            if(run_name == "unpaced" and parsed_arguments.min_messages_per_second is not None and result["messages_per_second"] < parsed_arguments.min_messages_per_second):
+                failures.append(protocol + " " + run_name + " dispatched " + "{:.0f}".format(result["messages_per_second"]) + " messages/s")
+            if(run_name == "paced" and parsed_arguments.max_dispatch_latency_p99_ms is not None and result["dispatch_latency_p99_ms"] > parsed_arguments.max_dispatch_latency_p99_ms):
+                failures.append(protocol + " " + run_name + " dispatch latency p99 was " + "{:.3f}".format(result["dispatch_latency_p99_ms"]) + " ms")
+
+        stage_reports = run_allocation_benchmark(protocol, parsed_arguments.races, parsed_arguments.listen_buffer_size)
+        results["allocations"][protocol] = stage_reports
+        for stage_name, stage_report in stage_reports.items():
+            print(protocol + " " + stage_name + ": " + "{:.1f}".format(stage_report["allocated_bytes_per_message"]) + " bytes allocated and " + "{:.2f}".format(stage_report["retained_blocks_per_message"]) + " blocks retained per message")
+
+            if(parsed_arguments.max_allocated_bytes_per_message is not None and stage_report["allocated_bytes_per_message"] > parsed_arguments.max_allocated_bytes_per_message):
+                failures.append(protocol + " " + stage_name + " allocated " + "{:.1f}".format(stage_report["allocated_bytes_per_message"]) + " bytes per message")
+
+    if(parsed_arguments.output is not None):
+        with open(parsed_arguments.output, "w", encoding="utf-8") as output_file:
+            json.dump(results, output_file, indent=4)
+
+    for failure in failures:
+        print("FAILED: " + failure, file=sys.stderr)
+
+
+    return 1 if len(failures) > 0 else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
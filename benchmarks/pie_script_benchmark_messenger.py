@@ -0,0 +1,128 @@
+from pie_script_protocol import PIEScriptFrameCodec
+
+import sys
+import json
+import time
+import random
+import socket
+import argparse
+
+
+# message strings of the stub unreal module, repeated here so the messenger runs without it
+c_message_greeting = "PIEScriptGreeting"
+c_message_heartbeat = "PIEScriptHeartbeat"
+c_message_begin_play = "PIEScriptBeginPlay"
+c_message_end_play = "PIEScriptEndPlay"
+c_message_race_time = "RacerAITuningIncomingRaceTime"
+c_message_control_properties = "RacerAITuningIncomingControlProps"
+
+c_protocol_legacy = "legacy"
+c_protocol_frame = "frame"
+
+
+# builds the messages a runtime messenger sends over a tuning session, begin play, then for every race a
+# heartbeat, its race time and the next control properties as a JSON string of about the given size, then end play
+def make_benchmark_traffic(number_of_races, control_properties_size=4096, seed=0):
+    rng = random.Random(seed)
+
+    # the same control properties layout every race, like a racer ai controller's, with new values each time
+    number_of_properties = max(1, control_properties_size // 32)
+    messages = [c_message_begin_play]
+    for race_index in range(number_of_races):
+        control_properties = {"control_property_" + str(property_index): rng.uniform(0.0, 2.0) for property_index in range(number_of_properties)}
+        messages.append(c_message_heartbeat)
+        messages.append(c_message_race_time)
+        messages.append(repr(rng.uniform(55.0, 75.0)))
+        messages.append(c_message_control_properties)
+        messages.append(json.dumps(control_properties))
+    messages.append(c_message_end_play)
+
+
+    return messages
+
+
+# encodes a message the way a runtime messenger sends it, shifted down by one and terminated by 0xff in the
+# legacy text encoding, or as a message frame once the frame protocol is in use
+def encode_messenger_message(msg, protocol):
+    if(protocol == c_protocol_frame):
+        return PIEScriptFrameCodec.encode_message_frame(msg)
+
+
+    return bytes((byte - 1) % 256 for byte in msg.encode("utf-8")) + b"\xff"
+
+
+# scripted stand-in for a runtime PIE Script Messenger. connects to a PIE Script, waits for its greeting, agrees
+# on the frame protocol if asked to, and replays the given messages at the given rate, recording when every one
+# of them was handed to the socket.
+class PIEScriptBenchmarkMessenger():
+
+    def __init__(self, port, protocol=c_protocol_legacy, messages_per_second=0.0):
+        self._port = port
+        self._protocol = protocol
+        self._messages_per_second = messages_per_second
+
+
+    # replays the given messages, returns the time.perf_counter() timestamp every message was sent at
+    def replay(self, messages):
+        encoded_messages = [encode_messenger_message(msg, self._protocol) for msg in messages]
+        send_timestamps = []
+
+        client_socket = socket.create_connection(("127.0.0.1", self._port))
+        client_socket.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+
+        try:
+            greeting = b""
+            while(greeting.find(c_message_greeting.encode()) < 0):
+                data = client_socket.recv(1024)
+                if(len(data) == 0):
+                    raise ConnectionError("the PIE Script closed the connection before greeting")
+                greeting += data
+
+            if(self._protocol == c_protocol_frame):
+                client_socket.sendall(PIEScriptFrameCodec.encode_handshake_frame(PIEScriptFrameCodec.c_protocol_version))
+
+            begin_timestamp = time.perf_counter()
+            for message_index, encoded_message in enumerate(encoded_messages):
+                # pace the messages when a rate is given, otherwise send them as fast as the socket takes them
+                if(self._messages_per_second > 0.0):
+                    send_time = begin_timestamp + message_index / self._messages_per_second
+                    while(time.perf_counter() < send_time):
+                        time.sleep(max(0.0, min(0.001, send_time - time.perf_counter())))
+
+                send_timestamps.append(time.perf_counter())
+                client_socket.sendall(encoded_message)
+
+            # keep the connection open until the PIE Script has received everything and closes it
+            client_socket.settimeout(30.0)
+            while(len(client_socket.recv(65536)) > 0):
+                pass
+        except (socket.timeout, ConnectionResetError):
+            pass
+        finally:
+            client_socket.close()
+
+
+        return send_timestamps
+
+
+# replays the benchmark traffic against a PIE Script and prints the send timestamps as JSON
+def main(arguments=None):
+    parser = argparse.ArgumentParser(description="scripted PIE Script messenger replaying tuning session traffic")
+    parser.add_argument("--port", type=int, required=True)
+    parser.add_argument("--protocol", choices=[c_protocol_legacy, c_protocol_frame], default=c_protocol_legacy)
+    parser.add_argument("--races", type=int, default=1000)
+    parser.add_argument("--control-properties-size", type=int, default=4096)
+    parser.add_argument("--messages-per-second", type=float, default=0.0, help="message rate, as fast as possible when 0")
+    parsed_arguments = parser.parse_args(arguments)
+
+    messenger = PIEScriptBenchmarkMessenger(parsed_arguments.port, parsed_arguments.protocol, parsed_arguments.messages_per_second)
+    send_timestamps = messenger.replay(make_benchmark_traffic(parsed_arguments.races, parsed_arguments.control_properties_size))
+
+    print(json.dumps(send_timestamps))
+
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
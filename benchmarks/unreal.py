@@ -0,0 +1,94 @@
+# stand-in for the editor's unreal module, provides just enough of it for PIEScript to be constructed and its
+# socket layer to be driven outside of the editor. the editor timers and delegates do nothing, the benchmarks
+# tick the script themselves.
+import sys
+
+
+c_socket_address = "127.0.0.1"
+c_socket_port = 47900
+b_is_logging = False
+
+
+def log(msg):
+    if(b_is_logging == True):
+        print("LOG: " + str(msg), file=sys.stderr)
+
+
+def log_warning(msg):
+    if(b_is_logging == True):
+        print("WARNING: " + str(msg), file=sys.stderr)
+
+
+def log_error(msg):
+    print("ERROR: " + str(msg), file=sys.stderr)
+
+
+def uclass(*args, **kwargs):
+    return lambda decorated_class: decorated_class
+
+
+def ufunction(*args, **kwargs):
+    return lambda decorated_function: decorated_function
+
+
+class Object():
+    def __init__(self, outer=None):
+        self._outer = outer
+
+
+class _Delegate():
+    def add_function_unique(self, target, function_name):
+        pass
+
+
+class EditorDelegateHelperObject(Object):
+    def bind_to_editor_delegates(self):
+        self.on_editor_play_simulation_started = _Delegate()
+        self.on_editor_play_simulation_ending = _Delegate()
+        self.on_editor_world_changed = _Delegate()
+
+
+class SystemLibrary():
+    @staticmethod
+    def is_timer_active(world_context, function_name):
+        return False
+
+    @staticmethod
+    def set_timer(target, function_name, duration, b_looping):
+        return None
+
+    @staticmethod
+    def clear_timer(target, timer_handle):
+        pass
+
+
+class EditorLevelLibrary():
+    @staticmethod
+    def get_pie_worlds(b_include_dedicated_server):
+        return []
+
+    @staticmethod
+    def editor_play_simulate():
+        pass
+
+    @staticmethod
+    def editor_end_play():
+        pass
+
+    @staticmethod
+    def get_game_world():
+        return "game world"
+
+    @staticmethod
+    def get_editor_world():
+        return "editor world"
+
+
+class PIEScriptBpFunctionLibrary():
+    get_pie_script_socket_address = staticmethod(lambda: c_socket_address)
+    get_pie_script_socket_port = staticmethod(lambda: c_socket_port)
+    get_pie_script_socket_message_heartbeat = staticmethod(lambda: "PIEScriptHeartbeat")
+    get_pie_script_socket_message_greeting = staticmethod(lambda: "PIEScriptGreeting")
+    get_pie_script_socket_message_goodbye = staticmethod(lambda: "PIEScriptGoodbye")
+    get_pie_script_runtime_message_begin_play = staticmethod(lambda: "PIEScriptBeginPlay")
+    get_pie_script_runtime_message_end_play = staticmethod(lambda: "PIEScriptEndPlay")
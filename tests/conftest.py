@@ -0,0 +1,11 @@
+import os
+import sys
+
+
+# the editor scripts are not a package, the tests import the modules that do not need the unreal module
+# from their script directories like the editor's python path does
+c_repository_directory = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+for script_directory_name in ("PIE-Script", "Racing-AI"):
+    script_directory = os.path.join(c_repository_directory, script_directory_name)
+    if(script_directory not in sys.path):
+        sys.path.insert(0, script_directory)
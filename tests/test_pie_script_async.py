@@ -0,0 +1,68 @@
+import os
+import sys
+import time
+import asyncio
+
+import pytest
+
+# the async front end builds on PIEScript, which needs the stub unreal module the benchmarks run with
+c_benchmarks_directory = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "benchmarks")
+if(c_benchmarks_directory not in sys.path):
+    sys.path.insert(0, c_benchmarks_directory)
+
+from pie_script_async import AsyncPIEScript
+
+
+@pytest.fixture
+def pie():
+    pie = AsyncPIEScript()
+
+    yield pie
+
+    pie.close()
+
+
+def test_wait_for_resolves_on_matching_message(pie):
+    task = pie.run(pie.wait_for("Hello", timeout=2.0))
+    pie.receive_message("PIEScriptHeartbeat", False)
+
+    assert task.done() == False
+
+    pie.receive_message("Hello", False)
+
+    assert task.result() == "Hello"
+    assert pie._message_waiters == []
+
+
+def test_wait_for_times_out_on_editor_tick(pie):
+    task = pie.run(pie.wait_for("Hello", timeout=0.05))
+    pie.handle_editor_periodic_tick()
+
+    assert task.done() == False
+
+    time.sleep(0.1)
+    pie.handle_editor_periodic_tick()
+
+    assert isinstance(task.exception(), asyncio.TimeoutError)
+    assert pie._message_waiters == []
+
+
+def test_messages_unsubscribes_on_aclose(pie):
+    # receives the first message and closes the iteration, the way leaving an async for early should
+    async def receive_first_message():
+        message_iterator = pie.messages()
+        async for msg in message_iterator:
+            break
+        await message_iterator.aclose()
+
+
+        return msg
+
+    task = pie.run(receive_first_message())
+
+    assert len(pie._message_subscribers) == 1
+
+    pie.receive_message("Hello", False)
+
+    assert task.result() == "Hello"
+    assert pie._message_subscribers == []
@@ -0,0 +1,297 @@
+import time
+import socket
+
+import pytest
+
+from pie_script_core import PIEScriptCore, PIEScriptConnection, PIEScriptMessageQueue, PIEScriptSendQueue
+from pie_script_instrumentation import PIEScriptInstrumentation
+from pie_script_protocol import PIEScriptFrameCodec, PIEScriptStreamDecoder
+
+
+# core that records every dispatched message instead of handling it
+class RecordingPIEScriptCore(PIEScriptCore):
+    def __init__(self):
+        super().__init__()
+        self.received_messages = []
+        self.watchdog_timeouts = []
+
+
+    def receive_message(self, msg, b_was_handled):
+        self.received_messages.append(msg)
+
+
+    def handle_watchdog_timeout(self, timeout_name, connection_id):
+        self.watchdog_timeouts.append((timeout_name, connection_id))
+        super().handle_watchdog_timeout(timeout_name, connection_id)
+
+
+# polls the given condition until it holds or the timeout passes, returns its last result
+def wait_until(condition, timeout=2.0):
+    deadline = time.monotonic() + timeout
+    while(condition() == False and time.monotonic() < deadline):
+        time.sleep(0.005)
+
+
+    return condition()
+
+
+# encodes a message string the way a legacy runtime messenger sends it
+def encode_legacy_message(msg):
+    return bytes((byte - 1) % 256 for byte in msg.encode("latin-1")) + bytes((PIEScriptStreamDecoder.c_legacy_message_terminator,))
+
+
+# connects a runtime messenger stand-in and reads the greeting the core sends it
+def connect_client(core):
+    client_socket = socket.create_connection((core.c_ip_address, core.c_port))
+    client_socket.settimeout(2.0)
+    greeting = client_socket.recv(len(core.c_socket_message_greeting))
+
+    assert greeting == core.c_socket_message_greeting.encode()
+
+
+    return client_socket
+
+
+@pytest.fixture
+def core():
+    core = RecordingPIEScriptCore()
+    core.start_listening()
+
+    yield core
+
+    core.close()
+
+
+def test_message_queue_is_first_in_first_out():
+    message_queue = PIEScriptMessageQueue()
+    message_queue.enqueue(1, b"first")
+    message_queue.enqueue(1, b"second")
+
+    assert message_queue.dequeue() == (1, b"first")
+    assert message_queue.dequeue() == (1, b"second")
+    assert message_queue.dequeue() is None
+    assert message_queue.get_statistics()["max_depth"] == 2
+    assert message_queue.get_statistics()["dequeued"] == 2
+
+
+def test_send_queue_raises_when_capacity_is_exceeded():
+    send_queue = PIEScriptSendQueue(capacity=8)
+
+    assert send_queue.enqueue(b"12345") == True
+    assert send_queue.enqueue(b"678") == False
+    with pytest.raises(BlockingIOError):
+        send_queue.enqueue(b"9")
+
+    assert send_queue.get_statistics()["overflows"] == 1
+    assert send_queue.get_number_of_pending_bytes() == 8
+
+
+def test_send_queue_accepts_oversized_message_when_empty():
+    send_queue = PIEScriptSendQueue(capacity=4)
+
+    assert send_queue.enqueue(b"0123456789") == True
+
+
+def test_send_queue_coalesces_and_consumes_partial_writes():
+    send_queue = PIEScriptSendQueue()
+    for data in (b"abc", b"def", b"ghi"):
+        send_queue.enqueue(data)
+
+    assert bytes(send_queue.peek(7)) == b"abcdef"
+
+    send_queue.consume(4)
+    assert bytes(send_queue.peek(64)) == b"efghi"
+    assert send_queue.get_statistics()["written"] == 1
+
+    send_queue.consume(5)
+    assert send_queue.is_empty() == True
+    assert send_queue.get_number_of_pending_bytes() == 0
+
+
+def test_round_trip_is_timed_from_first_send_to_next_receive():
+    instrumentation = PIEScriptInstrumentation()
+    connection_socket, messenger_socket = socket.socketpair()
+    try:
+        connection = PIEScriptConnection(1, connection_socket, None, instrumentation=instrumentation)
+        round_trip_histogram = instrumentation.get_histogram("message_round_trip")
+
+        connection.send_message("PIEScriptGreeting")
+        connection.send_message("RacerAITuningResetRace")
+        connection.record_received_message()
+        connection.record_received_message()
+
+        assert round_trip_histogram.get_count() == 1
+
+        connection.send_message("RacerAITuningAcceptControlProps")
+        connection.record_received_message()
+
+        assert round_trip_histogram.get_count() == 2
+        assert instrumentation.get_counter("messages_sent") == 3
+    finally:
+        connection_socket.close()
+        messenger_socket.close()
+
+
+def test_received_messages_are_dispatched(core):
+    client_socket = connect_client(core)
+    client_socket.sendall(encode_legacy_message("PIEScriptHeartbeat") + encode_legacy_message("Hello"))
+
+    assert wait_until(lambda: core.get_number_of_pending_received_messages() == 2)
+    core.dispatch_pending_received_messages()
+
+    assert core.received_messages == ["PIEScriptHeartbeat", "Hello"]
+    client_socket.close()
+
+
+def test_frame_protocol_handshake_is_confirmed(core):
+    client_socket = connect_client(core)
+    client_socket.sendall(PIEScriptFrameCodec.encode_handshake_frame(PIEScriptFrameCodec.c_protocol_version))
+
+    handshake_frame = client_socket.recv(64)
+
+    assert handshake_frame == PIEScriptFrameCodec.encode_handshake_frame(PIEScriptFrameCodec.c_protocol_version)
+    assert wait_until(lambda: core.is_using_frame_protocol(1) == True)
+    client_socket.close()
+
+
+@pytest.mark.parametrize("connection_error_class", [ConnectionAbortedError, ConnectionResetError])
+def test_failed_connection_does_not_stop_other_connections(core, connection_error_class):
+    failing_client_socket = connect_client(core)
+    client_socket = connect_client(core)
+    assert wait_until(lambda: len(core.get_connection_ids()) == 2)
+
+    # the first connection fails on its next read the way a socket dropped by the operating system does
+    receive_client_data = core._receive_client_data
+    def receive_client_data_failing_first_connection(connection):
+        if(connection.get_connection_id() == 1):
+            raise connection_error_class()
+        return receive_client_data(connection)
+    core._receive_client_data = receive_client_data_failing_first_connection
+
+    failing_client_socket.sendall(encode_legacy_message("Lost"))
+    assert wait_until(lambda: core.get_connection(1).is_open() == False)
+
+    client_socket.sendall(encode_legacy_message("Hello"))
+    assert wait_until(lambda: core.get_number_of_pending_received_messages() == 1)
+    core.dispatch_pending_received_messages()
+
+    assert core.received_messages == ["Hello"]
+    assert core.is_listening_for_messages() == True
+    assert core.get_connection_ids() == [2]
+
+    # the listen thread still accepts new runtime messengers
+    connect_client(core).close()
+    failing_client_socket.close()
+    client_socket.close()
+
+
+def test_closed_connection_is_removed_after_dispatch(core):
+    client_socket = connect_client(core)
+    client_socket.sendall(encode_legacy_message("PIEScriptEndPlay"))
+    client_socket.close()
+
+    assert wait_until(lambda: core.get_connection(1).is_open() == False)
+    core.dispatch_pending_received_messages()
+    core.dispatch_pending_received_messages()
+
+    assert core.received_messages == ["PIEScriptEndPlay"]
+    assert core.get_connection_ids() == []
+
+
+def test_listen_thread_restarts_after_it_returned(core):
+    # the listen thread returns without being joined by _stop_listen_thread()
+    listen_thread = core._listen_thread
+    core._b_continue_listen_thread = False
+    core._wake_listen_thread()
+    listen_thread.join(2.0)
+
+    assert core.is_listening_for_messages() == False
+
+    core.start_listening()
+
+    assert core.is_listening_for_messages() == True
+    connect_client(core).close()
+
+
+def test_connect_watchdog_timeout_expires_without_client():
+    core = RecordingPIEScriptCore()
+    core.set_watchdog_timeouts(connect_timeout=0.05)
+    try:
+        core.start()
+
+        assert core.check_watchdog() is None
+
+        time.sleep(0.1)
+
+        assert core.check_watchdog() == PIEScriptCore.c_watchdog_timeout_connect
+        # an expired timeout is not tested again until the next session
+        assert core.check_watchdog() is None
+        assert core.watchdog_timeouts == [(PIEScriptCore.c_watchdog_timeout_connect, None)]
+        assert core.get_number_of_watchdog_timeouts(PIEScriptCore.c_watchdog_timeout_connect) == 1
+        assert core.get_number_of_watchdog_timeouts() == 1
+    finally:
+        core.close()
+
+
+def test_connect_watchdog_timeout_stops_once_client_connects(core):
+    core.set_watchdog_timeouts(connect_timeout=0.05)
+    core.start()
+    client_socket = connect_client(core)
+    time.sleep(0.1)
+
+    assert core.check_watchdog() is None
+    assert core.watchdog_timeouts == []
+    client_socket.close()
+
+
+def test_first_message_watchdog_timeout_expires(core):
+    core.set_watchdog_timeouts(first_message_timeout=0.05)
+    silent_client_socket = connect_client(core)
+    client_socket = connect_client(core)
+    client_socket.sendall(encode_legacy_message("PIEScriptHeartbeat"))
+    assert wait_until(lambda: core.get_connection(2).has_received_message() == True)
+    time.sleep(0.1)
+
+    assert core.check_watchdog() == PIEScriptCore.c_watchdog_timeout_first_message
+    # handling the timeout force stopped the session and disconnected the silent client
+    assert core.check_watchdog() is None
+    assert core.watchdog_timeouts == [(PIEScriptCore.c_watchdog_timeout_first_message, 1)]
+    assert core.get_number_of_watchdog_timeouts(PIEScriptCore.c_watchdog_timeout_first_message) == 1
+    silent_client_socket.close()
+    client_socket.close()
+
+
+def test_message_watchdog_timeout_expires(core):
+    core.set_watchdog_timeouts(message_timeout=0.05)
+    client_socket = connect_client(core)
+    client_socket.sendall(encode_legacy_message("PIEScriptHeartbeat"))
+    assert wait_until(lambda: core.get_connection(1).has_received_message() == True)
+
+    assert core.check_watchdog() is None
+
+    time.sleep(0.1)
+
+    assert core.check_watchdog() == PIEScriptCore.c_watchdog_timeout_message
+    assert core.check_watchdog() is None
+    assert core.watchdog_timeouts == [(PIEScriptCore.c_watchdog_timeout_message, 1)]
+    assert core.get_number_of_watchdog_timeouts(PIEScriptCore.c_watchdog_timeout_message) == 1
+    client_socket.close()
+
+
+def test_race_watchdog_timeout_expires(core):
+    core.set_watchdog_timeouts(race_timeout=0.05)
+    client_socket = connect_client(core)
+    client_socket.sendall(encode_legacy_message(core.c_runtime_message_beginplay))
+    assert wait_until(lambda: core.get_number_of_pending_received_messages() == 1)
+    core.dispatch_pending_received_messages()
+
+    assert core.check_watchdog() is None
+
+    time.sleep(0.1)
+
+    assert core.check_watchdog() == PIEScriptCore.c_watchdog_timeout_race
+    assert core.check_watchdog() is None
+    assert core.watchdog_timeouts == [(PIEScriptCore.c_watchdog_timeout_race, 1)]
+    assert core.get_number_of_watchdog_timeouts(PIEScriptCore.c_watchdog_timeout_race) == 1
+    assert core.get_instrumentation().is_phase_active("race") == False
+    client_socket.close()
@@ -0,0 +1,120 @@
+import json
+import math
+
+import pytest
+
+from pie_script_instrumentation import PIEScriptHistogram, PIEScriptInstrumentation
+
+
+def test_bucket_upper_bounds():
+    assert PIEScriptHistogram.get_bucket_upper_bound(0) == pytest.approx(1e-6)
+    assert PIEScriptHistogram.get_bucket_upper_bound(PIEScriptHistogram.c_buckets_per_doubling) == pytest.approx(2e-6)
+    # the last bounded bucket ends at about 18 minutes, the last bucket is open-ended
+    assert PIEScriptHistogram.get_bucket_upper_bound(PIEScriptHistogram.c_number_of_buckets - 2) == pytest.approx(1073.74, abs=0.01)
+    assert PIEScriptHistogram.get_bucket_upper_bound(PIEScriptHistogram.c_number_of_buckets - 1) == math.inf
+
+
+@pytest.mark.parametrize("bucket_index", [1, 17, 40, 80, PIEScriptHistogram.c_number_of_buckets - 2])
+def test_durations_are_counted_in_the_bucket_they_fall_in(bucket_index):
+    upper_bound = PIEScriptHistogram.get_bucket_upper_bound(bucket_index)
+
+    assert PIEScriptHistogram.get_bucket_index(upper_bound * 0.99) == bucket_index
+    assert PIEScriptHistogram.get_bucket_index(upper_bound * 1.01) == bucket_index + 1
+
+
+def test_extreme_durations_are_counted_in_the_outer_buckets():
+    assert PIEScriptHistogram.get_bucket_index(0.0) == 0
+    assert PIEScriptHistogram.get_bucket_index(1e-9) == 0
+    assert PIEScriptHistogram.get_bucket_index(3600.0) == PIEScriptHistogram.c_number_of_buckets - 1
+
+
+def test_percentiles_are_estimated_within_a_bucket():
+    histogram = PIEScriptHistogram()
+    for duration_index in range(1, 101):
+        histogram.record(duration_index * 0.001)
+
+    # an estimate is the upper bound of its bucket, at most a quarter doubling above the exact percentile
+    bucket_growth = 2.0 ** (1.0 / PIEScriptHistogram.c_buckets_per_doubling)
+    for fraction, exact_percentile in ((0.5, 0.05), (0.9, 0.09), (0.99, 0.099)):
+        assert exact_percentile <= histogram.get_percentile(fraction) <= exact_percentile * bucket_growth
+
+    assert histogram.get_percentile(1.0) == pytest.approx(0.1)
+
+
+def test_percentiles_are_clamped_to_recorded_extremes():
+    histogram = PIEScriptHistogram()
+
+    assert histogram.get_percentile(0.5) == 0.0
+
+    histogram.record(0.0123)
+
+    assert histogram.get_percentile(0.01) == 0.0123
+    assert histogram.get_percentile(0.99) == 0.0123
+
+
+def test_summary():
+    histogram = PIEScriptHistogram()
+    for duration in (0.001, 0.003, 3600.0):
+        histogram.record(duration)
+
+    summary = histogram.get_summary()
+
+    assert summary["count"] == 3
+    assert summary["mean"] == pytest.approx((0.001 + 0.003 + 3600.0) / 3.0)
+    assert summary["min"] == 0.001
+    assert summary["max"] == 3600.0
+    assert sum(bucket_count for upper_bound, bucket_count in summary["buckets"]) == 3
+    assert summary["buckets"][-1] == [None, 1]
+    assert set(summary.keys()) >= {"p50", "p90", "p99"}
+
+
+def test_phases_are_timed():
+    instrumentation = PIEScriptInstrumentation()
+    instrumentation.begin_phase("race")
+
+    assert instrumentation.is_phase_active("race") == True
+    assert instrumentation.end_phase("race") >= 0.0
+    assert instrumentation.is_phase_active("race") == False
+    assert instrumentation.end_phase("race") is None
+
+    instrumentation.begin_phase("race")
+    instrumentation.cancel_phase("race")
+    with instrumentation.measure_phase("session_start"):
+        pass
+
+    assert instrumentation.get_phase_histogram("race").get_count() == 1
+    assert instrumentation.get_phase_histogram("session_start").get_count() == 1
+
+
+def test_counters_and_reset():
+    instrumentation = PIEScriptInstrumentation()
+    instrumentation.count("messages_received")
+    instrumentation.count("bytes_received", 512)
+
+    assert instrumentation.get_counter("bytes_received") == 512
+    assert instrumentation.get_rates()["bytes_received_per_second"] > 0.0
+
+    instrumentation.get_histogram("message_round_trip").record(0.002)
+    instrumentation.reset()
+
+    assert instrumentation.get_counter("bytes_received") == 0
+    assert instrumentation.get_histogram("message_round_trip").get_count() == 0
+
+
+def test_export_writes_report_as_json(tmp_path):
+    instrumentation = PIEScriptInstrumentation()
+    instrumentation.get_phase_histogram("race").record(12.5)
+    instrumentation.get_histogram("message_round_trip").record(3600.0)
+    instrumentation.count("messages_sent", 3)
+    file_path = str(tmp_path / "instrumentation.json")
+
+    instrumentation.export(file_path)
+
+    with open(file_path, "r", encoding="utf-8") as report_file:
+        report = json.load(report_file)
+
+    assert set(report.keys()) == {"elapsed", "phases", "histograms", "counters", "rates"}
+    assert report["phases"]["race"]["count"] == 1
+    assert report["histograms"]["message_round_trip"]["buckets"] == [[None, 1]]
+    assert report["counters"] == {"messages_sent": 3}
+    assert set(report["rates"].keys()) == {"messages_sent_per_second"}
@@ -0,0 +1,166 @@
+import pytest
+
+from pie_script_protocol import PIEScriptFrameCodec, PIEScriptReceiveRingBuffer, PIEScriptStreamDecoder
+
+
+# encodes a message string the way a legacy runtime messenger sends it, shifted down by one and terminated
+def encode_legacy_message(msg, b_is_terminated=True):
+    data = bytes((byte - 1) % 256 for byte in msg.encode("latin-1"))
+    if(b_is_terminated == True):
+        data += bytes((PIEScriptStreamDecoder.c_legacy_message_terminator,))
+
+
+    return data
+
+
+# decodes every message the given data completes into strings
+def feed_messages(decoder, data):
+    return [PIEScriptStreamDecoder.decode_message(frame_type, payload) for frame_type, payload in decoder.feed(data)]
+
+
+def test_frame_round_trip():
+    data = PIEScriptFrameCodec.encode_message_frame("RacerAITuningIncomingRaceTime") + PIEScriptFrameCodec.encode_message_frame("12.5")
+
+    frames, offset = PIEScriptFrameCodec.decode_frames(data)
+
+    assert frames == [(PIEScriptFrameCodec.c_frame_type_message, b"RacerAITuningIncomingRaceTime"), (PIEScriptFrameCodec.c_frame_type_message, b"12.5")]
+    assert offset == len(data)
+
+
+def test_decode_frames_stops_at_incomplete_frame():
+    frame = PIEScriptFrameCodec.encode_message_frame("BeginPlay")
+
+    frames, offset = PIEScriptFrameCodec.decode_frames(frame + frame[:-2])
+
+    assert len(frames) == 1
+    assert offset == len(frame)
+
+
+def test_decode_frame_header_rejects_oversized_payload():
+    header = PIEScriptFrameCodec.c_header.pack(PIEScriptFrameCodec.c_magic, PIEScriptFrameCodec.c_protocol_version, PIEScriptFrameCodec.c_frame_type_message, PIEScriptFrameCodec.c_max_payload_size + 1)
+
+    with pytest.raises(ValueError):
+        PIEScriptFrameCodec.decode_frame_header(header)
+
+
+def test_ring_buffer_resets_indices_once_read_catches_up():
+    ring_buffer = PIEScriptReceiveRingBuffer(16)
+    ring_buffer.write(b"abcdef")
+    ring_buffer.consume(6)
+
+    assert ring_buffer.get_read_index() == 0
+    assert ring_buffer.get_write_index() == 0
+
+
+def test_ring_buffer_moves_leftover_bytes_to_front():
+    ring_buffer = PIEScriptReceiveRingBuffer(16)
+    ring_buffer.write(b"0123456789ab")
+    ring_buffer.consume(10)
+    ring_buffer.write(b"cdefgh")
+
+    assert ring_buffer.get_capacity() == 16
+    assert ring_buffer.get_read_index() == 0
+    assert bytes(ring_buffer.get_readable_view()) == b"abcdefgh"
+
+
+def test_ring_buffer_grows_when_leftover_bytes_fill_it():
+    ring_buffer = PIEScriptReceiveRingBuffer(16)
+    ring_buffer.write(b"0123456789abcdef")
+    ring_buffer.consume(2)
+    ring_buffer.write(b"ghij")
+
+    assert ring_buffer.get_capacity() > 16
+    assert bytes(ring_buffer.get_readable_view()) == b"23456789abcdefghij"
+
+
+def test_decoder_joins_frame_split_across_reads():
+    decoder = PIEScriptStreamDecoder(16)
+    frame = PIEScriptFrameCodec.encode_message_frame("RacerAITuningIncomingControlProps")
+
+    for split_index in (1, 5, PIEScriptFrameCodec.c_header.size, len(frame) - 1):
+        assert feed_messages(decoder, frame[:split_index]) == []
+        assert feed_messages(decoder, frame[split_index:]) == ["RacerAITuningIncomingControlProps"]
+        assert decoder.get_number_of_pending_bytes() == 0
+
+
+def test_decoder_decodes_several_frames_in_one_read():
+    decoder = PIEScriptStreamDecoder()
+    data = b"".join(PIEScriptFrameCodec.encode_message_frame(str(message_index)) for message_index in range(100))
+
+    assert feed_messages(decoder, data) == [str(message_index) for message_index in range(100)]
+
+
+def test_decoder_waits_for_handshake_after_partial_magic():
+    decoder = PIEScriptStreamDecoder()
+    handshake_frame = PIEScriptFrameCodec.encode_handshake_frame(PIEScriptFrameCodec.c_protocol_version)
+
+    # a lone first byte of the magic is not an unterminated legacy message
+    assert list(decoder.feed(handshake_frame[:1])) == []
+    assert decoder.is_receiving_frames() == False
+
+    assert list(decoder.feed(handshake_frame[1:])) == [(PIEScriptFrameCodec.c_frame_type_handshake, bytes((PIEScriptFrameCodec.c_protocol_version,)))]
+    assert decoder.is_receiving_frames() == True
+
+
+def test_decoder_decodes_terminated_legacy_messages():
+    decoder = PIEScriptStreamDecoder()
+
+    assert feed_messages(decoder, encode_legacy_message("PIEScriptBeginPlay") + encode_legacy_message("PIEScriptHeartbeat")) == ["PIEScriptBeginPlay", "PIEScriptHeartbeat"]
+    assert decoder.has_received_legacy_terminator() == True
+
+
+def test_decoder_joins_legacy_message_split_after_a_terminator():
+    decoder = PIEScriptStreamDecoder()
+    data = encode_legacy_message("PIEScriptBeginPlay") + encode_legacy_message("PIEScriptEndPlay")
+
+    assert feed_messages(decoder, data[:25]) == ["PIEScriptBeginPlay"]
+    assert feed_messages(decoder, data[25:]) == ["PIEScriptEndPlay"]
+
+
+def test_decoder_decodes_unterminated_legacy_message_per_read():
+    decoder = PIEScriptStreamDecoder()
+
+    assert feed_messages(decoder, encode_legacy_message("PIEScriptBeginPlay", False)) == ["PIEScriptBeginPlay"]
+    assert feed_messages(decoder, encode_legacy_message("PIEScriptEndPlay", False)) == ["PIEScriptEndPlay"]
+    assert decoder.get_number_of_pending_bytes() == 0
+
+
+def test_decoder_switches_from_legacy_messages_to_frames():
+    decoder = PIEScriptStreamDecoder()
+    data = encode_legacy_message("PIEScriptHeartbeat") + PIEScriptFrameCodec.encode_handshake_frame(2) + PIEScriptFrameCodec.encode_message_frame("PIEScriptBeginPlay")
+
+    decoded_messages = list(decoder.feed(data))
+
+    assert [frame_type for frame_type, payload in decoded_messages] == [PIEScriptStreamDecoder.c_frame_type_legacy_message, PIEScriptFrameCodec.c_frame_type_handshake, PIEScriptFrameCodec.c_frame_type_message]
+    assert PIEScriptStreamDecoder.decode_message(*decoded_messages[0]) == "PIEScriptHeartbeat"
+    assert PIEScriptStreamDecoder.decode_message(*decoded_messages[2]) == "PIEScriptBeginPlay"
+
+
+def test_decoder_discards_stream_after_corrupt_frame_header():
+    decoder = PIEScriptStreamDecoder()
+    list(decoder.feed(PIEScriptFrameCodec.encode_handshake_frame(2)))
+
+    with pytest.raises(ValueError):
+        list(decoder.feed(b"XX" + bytes(PIEScriptFrameCodec.c_header.size)))
+
+    assert decoder.get_number_of_pending_bytes() == 0
+
+
+def test_decoder_reset_returns_to_legacy_messages():
+    decoder = PIEScriptStreamDecoder()
+    list(decoder.feed(PIEScriptFrameCodec.encode_handshake_frame(2) + encode_legacy_message("Partial")[:3]))
+
+    decoder.reset()
+
+    assert decoder.is_receiving_frames() == False
+    assert decoder.has_received_legacy_terminator() == False
+    assert decoder.get_number_of_pending_bytes() == 0
+
+
+def test_decode_typed_message():
+    frame = PIEScriptFrameCodec.encode_typed_message_frame("RacerAITuningIncomingRaceTime", "12.5")
+    frames, offset = PIEScriptFrameCodec.decode_frames(frame)
+
+    assert PIEScriptStreamDecoder.decode_typed_message(*frames[0]) == ("RacerAITuningIncomingRaceTime", "12.5")
+    assert PIEScriptStreamDecoder.decode_message(*frames[0]) == "RacerAITuningIncomingRaceTime"
+    assert PIEScriptStreamDecoder.decode_typed_message(PIEScriptFrameCodec.c_frame_type_message, b"PIEScriptEndPlay") == ("PIEScriptEndPlay", None)
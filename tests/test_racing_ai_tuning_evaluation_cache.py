@@ -0,0 +1,48 @@
+import json
+
+import pytest
+
+from racing_ai_tuning_evaluation_cache import RacingAITuningEvaluationCache
+
+
+def test_key_ignores_key_order_and_formatting():
+    evaluation_cache = RacingAITuningEvaluationCache()
+
+    assert evaluation_cache.make_key('{"a": 1, "b": [2.0, true]}') == evaluation_cache.make_key('{"b":[2,true],"a":1.0}')
+    assert evaluation_cache.make_key("not json") is None
+    assert evaluation_cache.make_key(None) is None
+
+
+def test_race_time_is_mean_of_results():
+    evaluation_cache = RacingAITuningEvaluationCache()
+    control_properties_json_string = json.dumps({"gain": 1.5})
+    for race_time in (10.0, 12.0, 11.0):
+        evaluation_cache.add_result(control_properties_json_string, race_time)
+    evaluation_cache.add_result(control_properties_json_string, None)
+
+    assert evaluation_cache.get_race_time(control_properties_json_string) == pytest.approx(11.0)
+    assert evaluation_cache.get_number_of_race_times(control_properties_json_string) == 3
+    assert evaluation_cache.get_number_of_entries() == 1
+
+
+def test_hits_and_misses_are_counted():
+    evaluation_cache = RacingAITuningEvaluationCache()
+    evaluation_cache.add_result(json.dumps({"gain": 1.5}), 10.0)
+
+    evaluation_cache.get_race_time(json.dumps({"gain": 1.5}))
+    evaluation_cache.get_race_time(json.dumps({"gain": 2.5}))
+
+    assert evaluation_cache.get_statistics() == {"entries": 1, "hits": 1, "misses": 1}
+
+
+def test_quantization_shares_entries():
+    evaluation_cache = RacingAITuningEvaluationCache(quantization_step=0.1)
+    evaluation_cache.add_result(json.dumps({"gain": 1.501}), 10.0)
+
+    assert evaluation_cache.get_race_time(json.dumps({"gain": 1.499})) == 10.0
+    assert evaluation_cache.get_race_time(json.dumps({"gain": 1.6})) is None
+
+    # entries made with another step no longer match
+    evaluation_cache.set_quantization_step(0.01)
+
+    assert evaluation_cache.get_number_of_entries() == 0
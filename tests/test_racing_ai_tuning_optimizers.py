@@ -0,0 +1,119 @@
+import json
+import random
+
+import pytest
+
+from racing_ai_tuning_optimizers import RacingAITuningControlPropertiesVector, RacingAITuningNelderMeadOptimizer, RacingAITuningDifferentialEvolutionOptimizer, make_racing_ai_tuning_optimizer, perturb_control_properties
+
+
+# race time of a parameter vector, fastest at (3, -2)
+def get_race_time(vector):
+    return 10.0 + (vector[0] - 3.0) ** 2 + (vector[1] + 2.0) ** 2
+
+
+# asks and tells the optimizer until it raced the given number of candidates, several at once when it allows it
+def run_optimizer(optimizer, number_of_evaluations):
+    number_of_told_candidates = 0
+    while(number_of_told_candidates < number_of_evaluations):
+        candidates = []
+        candidate = optimizer.ask()
+        while(candidate is not None and len(candidates) < 4):
+            candidates.append(candidate)
+            candidate = optimizer.ask()
+        if(candidate is not None):
+            candidates.append(candidate)
+
+        assert len(candidates) > 0
+        for candidate_id, vector in candidates:
+            optimizer.tell(candidate_id, get_race_time(vector))
+            number_of_told_candidates += 1
+
+
+def test_control_properties_vector_round_trip():
+    control_properties_vector = RacingAITuningControlPropertiesVector(json.dumps({"steering": {"gain": 1.5, "lookahead": 12}, "b_drift": True, "name": "default", "brakes": [0.25, 0.5]}))
+
+    assert control_properties_vector.get_initial_vector() == [1.5, 12.0, 0.25, 0.5]
+
+    control_properties = json.loads(control_properties_vector.to_json_string([2.0, 14.6, 0.3, 0.6]))
+
+    assert control_properties == {"steering": {"gain": 2.0, "lookahead": 15}, "b_drift": True, "name": "default", "brakes": [0.3, 0.6]}
+
+
+def test_nelder_mead_waits_for_pending_candidate():
+    optimizer = RacingAITuningNelderMeadOptimizer([1.0, 1.0])
+    candidate_id, vector = optimizer.ask()
+
+    assert optimizer.ask() is None
+
+    optimizer.tell(candidate_id + 1, 1.0)
+    assert optimizer.ask() is None
+
+    optimizer.tell(candidate_id, 1.0)
+    assert optimizer.ask() is not None
+
+
+def test_nelder_mead_finds_minimum():
+    optimizer = RacingAITuningNelderMeadOptimizer([0.0, 0.0])
+    run_optimizer(optimizer, 200)
+
+    best_vector, best_race_time = optimizer.get_best()
+
+    assert best_vector == pytest.approx([3.0, -2.0], abs=1e-2)
+    assert best_race_time == pytest.approx(10.0, abs=1e-3)
+    assert optimizer.get_number_of_evaluations() == 200
+
+
+def test_differential_evolution_finds_minimum():
+    optimizer = RacingAITuningDifferentialEvolutionOptimizer([2.0, -1.0], relative_scale=0.5, rng=random.Random(7))
+    run_optimizer(optimizer, 600)
+
+    best_vector, best_race_time = optimizer.get_best()
+
+    assert best_vector == pytest.approx([3.0, -2.0], abs=5e-2)
+    assert best_race_time == pytest.approx(10.0, abs=1e-2)
+
+
+def test_differential_evolution_waits_for_initial_population():
+    optimizer = RacingAITuningDifferentialEvolutionOptimizer([1.0, 1.0], population_size=6, rng=random.Random(1))
+    candidates = [optimizer.ask() for member_index in range(6)]
+
+    assert optimizer.ask() is None
+
+    for candidate_id, vector in candidates[:4]:
+        optimizer.tell(candidate_id, get_race_time(vector))
+
+    assert optimizer.ask() is not None
+
+
+def test_failed_race_is_not_best():
+    optimizer = RacingAITuningNelderMeadOptimizer([1.0])
+    candidate_id, vector = optimizer.ask()
+    optimizer.tell(candidate_id, None)
+
+    assert optimizer.get_best()[0] is None
+    assert optimizer.get_number_of_evaluations() == 1
+
+    candidate_id, vector = optimizer.ask()
+    optimizer.tell(candidate_id, 12.0)
+
+    assert optimizer.get_best() == (vector, 12.0)
+
+
+def test_make_optimizer_by_name():
+    assert isinstance(make_racing_ai_tuning_optimizer("nelder_mead", [1.0]), RacingAITuningNelderMeadOptimizer)
+    assert isinstance(make_racing_ai_tuning_optimizer("differential_evolution", [1.0], population_size=4), RacingAITuningDifferentialEvolutionOptimizer)
+
+    with pytest.raises(ValueError):
+        make_racing_ai_tuning_optimizer("gradient_descent", [1.0])
+
+
+def test_perturb_control_properties_scales_numbers_only():
+    control_properties_json_string = json.dumps({"steering": {"gain": 1.5}, "b_drift": True, "name": "default", "brakes": [0.25, 0.5]})
+
+    control_properties = json.loads(perturb_control_properties(control_properties_json_string, None, relative_scale=0.1, rng=random.Random(3)))
+
+    assert control_properties["b_drift"] == True
+    assert control_properties["name"] == "default"
+    assert control_properties["steering"]["gain"] != 1.5
+    assert control_properties["steering"]["gain"] == pytest.approx(1.5, rel=0.5)
+    assert len(control_properties["brakes"]) == 2
@@ -0,0 +1,26 @@
+import json
+
+from racing_ai_tuning_orchestrator import main
+
+
+# reads the results written to the given file
+def read_results(file_path):
+    with open(file_path, "r", encoding="utf-8") as results_file:
+        return [json.loads(line) for line in results_file]
+
+
+def test_main_evaluates_every_candidate_on_stand_in_workers(tmp_path, capsys):
+    file_path = str(tmp_path / "results.jsonl")
+
+    assert main(["--workers", "2", "--evaluations", "10", "--base-port", "48950", "--race-duration", "0.02", "--results-store", file_path]) == 0
+
+    summary = json.loads(capsys.readouterr().out)
+    results = read_results(file_path)
+
+    assert summary["workers"] == 2
+    assert summary["evaluations"] == 10
+    assert summary["best_race_time"] is not None
+    assert len(results) == 10
+    assert all(result["race_time"] is not None for result in results)
+    assert sorted(set(result["worker"] for result in results)) == [0, 1]
+    assert summary["best_race_time"] == min(result["race_time"] for result in results)
@@ -0,0 +1,107 @@
+import os
+import json
+
+from racing_ai_tuning_results_store import RacingAITuningResultsStore
+
+
+# reads the results written to the given file
+def read_results(file_path):
+    with open(file_path, "r", encoding="utf-8") as results_file:
+        return [json.loads(line) for line in results_file]
+
+
+def test_results_are_written_in_batches(tmp_path):
+    file_path = str(tmp_path / "results.jsonl")
+    results_store = RacingAITuningResultsStore(file_path, flush_batch_size=3, flush_interval=3600.0)
+    results_store.open()
+
+    results_store.append_result('{"gain": 1}', 12.0)
+    results_store.append_result('{"gain": 2}', 11.0)
+
+    assert results_store.get_number_of_pending_results() == 2
+    assert read_results(file_path) == []
+
+    results_store.append_result('{"gain": 3}', 13.0)
+
+    assert results_store.get_number_of_pending_results() == 0
+    assert [result["race_time"] for result in read_results(file_path)] == [12.0, 11.0, 13.0]
+
+    results_store.close()
+
+
+def test_reopened_store_resumes_from_file(tmp_path):
+    file_path = str(tmp_path / "results.jsonl")
+    results_store = RacingAITuningResultsStore(file_path)
+    results_store.open()
+    results_store.append_result('{"gain": 1}', 12.0)
+    results_store.append_result('{"gain": 2}', 9.0, fidelity=0.5)
+    results_store.append_result('{"gain": 3}', 11.0, fidelity=1.0)
+    results_store.close()
+
+    results_store = RacingAITuningResultsStore(file_path)
+
+    assert results_store.open() == 3
+    # a race shortened to a fraction of the race is not comparable to full ones
+    assert results_store.get_best_result()["control_properties"] == '{"gain": 3}'
+
+    results_store.close()
+
+
+def test_aborted_race_is_not_best(tmp_path):
+    results_store = RacingAITuningResultsStore(str(tmp_path / "results.jsonl"))
+    results_store.open()
+    results_store.append_result('{"gain": 1}', 12.0, aborted=False)
+    results_store.append_result('{"gain": 2}', 8.0, aborted=True)
+
+    assert results_store.get_best_result()["control_properties"] == '{"gain": 1}'
+
+    results_store.close()
+
+
+def test_partial_last_line_is_dropped(tmp_path):
+    file_path = str(tmp_path / "results.jsonl")
+    with open(file_path, "w", encoding="utf-8") as results_file:
+        results_file.write(json.dumps({"control_properties": '{"gain": 1}', "race_time": 12.0}) + "\n" + '{"control_properties": "{\\"ga')
+
+    results_store = RacingAITuningResultsStore(file_path)
+
+    assert results_store.open() == 1
+
+    results_store.append_result('{"gain": 2}', 11.0)
+    results_store.close()
+
+    with open(file_path, "r", encoding="utf-8") as results_file:
+        lines = results_file.readlines()
+
+    assert len(lines) == 3
+    assert json.loads(lines[2])["race_time"] == 11.0
+
+
+def test_results_file_is_synced_on_close_by_default(tmp_path, monkeypatch):
+    synced_file_descriptors = []
+    monkeypatch.setattr(os, "fsync", synced_file_descriptors.append)
+    results_store = RacingAITuningResultsStore(str(tmp_path / "results.jsonl"), flush_batch_size=1)
+    results_store.open()
+
+    results_store.append_result('{"gain": 1}', 12.0)
+    results_store.append_result('{"gain": 2}', 11.0)
+
+    assert len(synced_file_descriptors) == 0
+
+    results_store.close()
+
+    assert len(synced_file_descriptors) == 1
+
+
+def test_results_file_is_synced_every_flush_if_enabled(tmp_path, monkeypatch):
+    synced_file_descriptors = []
+    monkeypatch.setattr(os, "fsync", synced_file_descriptors.append)
+    results_store = RacingAITuningResultsStore(str(tmp_path / "results.jsonl"), flush_batch_size=1, b_sync_every_flush=True)
+    results_store.open()
+
+    results_store.append_result('{"gain": 1}', 12.0)
+    results_store.append_result('{"gain": 2}', 11.0)
+
+    assert len(synced_file_descriptors) == 2
+
+    results_store.close()
@@ -0,0 +1,65 @@
+import json
+
+import pytest
+
+from racing_ai_tuning_scheduler import RacingAITuningSuccessiveHalvingScheduler
+
+
+# generates candidates counting up from the best control properties so far
+def make_candidate_generator():
+    candidate_indices = iter(range(1000))
+    def generate_candidate(best_control_properties_json_string, best_race_time):
+        return json.dumps({"gain": json.loads(best_control_properties_json_string)["gain"] + next(candidate_indices)})
+
+
+    return generate_candidate
+
+
+# race time of a control properties json string, fastest with a gain of 20, shorter races take a fraction of it
+def get_race_time(control_properties_json_string, fidelity):
+    return fidelity * (100.0 + abs(json.loads(control_properties_json_string)["gain"] - 20.0))
+
+
+def test_rung_fidelities():
+    assert RacingAITuningSuccessiveHalvingScheduler.get_rung_fidelities(1.0 / 9.0, 3) == pytest.approx([1.0 / 9.0, 1.0 / 3.0, 1.0])
+    assert RacingAITuningSuccessiveHalvingScheduler.get_rung_fidelities(1.0, 3) == [1.0]
+
+
+def test_bracket_promotes_best_candidates():
+    scheduler = RacingAITuningSuccessiveHalvingScheduler(make_candidate_generator(), number_of_candidates=9, minimum_fidelity=1.0 / 9.0, reduction_factor=3)
+    scheduler.start(json.dumps({"gain": 0}))
+
+    raced_candidates = []
+    for rung_size in (9, 3, 1):
+        candidates = [scheduler.ask() for candidate_index in range(rung_size)]
+
+        # the rung waits for the results of its last candidates
+        assert scheduler.ask() is None
+
+        raced_candidates.append(sorted(json.loads(control_properties_json_string)["gain"] for candidate_id, control_properties_json_string, fidelity in candidates))
+        for candidate_id, control_properties_json_string, fidelity in candidates:
+            scheduler.tell(candidate_id, get_race_time(control_properties_json_string, fidelity))
+
+    assert raced_candidates == [list(range(9)), [6, 7, 8], [8]]
+    assert scheduler.get_best() == (json.dumps({"gain": 8}), pytest.approx(112.0))
+    assert scheduler.get_number_of_brackets() == 2
+
+    budget_report = scheduler.get_budget_report()
+
+    assert [rung_statistics["evaluations"] for rung_statistics in budget_report] == [9, 3, 1]
+    assert sum(rung_statistics["full_race_equivalents"] for rung_statistics in budget_report) == pytest.approx(3.0)
+
+
+def test_failed_race_is_not_promoted():
+    scheduler = RacingAITuningSuccessiveHalvingScheduler(make_candidate_generator(), number_of_candidates=3, minimum_fidelity=1.0 / 3.0, reduction_factor=3)
+    scheduler.start(json.dumps({"gain": 18}))
+
+    candidates = [scheduler.ask() for candidate_index in range(3)]
+    for candidate_id, control_properties_json_string, fidelity in candidates:
+        race_time = None if json.loads(control_properties_json_string)["gain"] == 20 else get_race_time(control_properties_json_string, fidelity)
+        scheduler.tell(candidate_id, race_time)
+
+    candidate_id, control_properties_json_string, fidelity = scheduler.ask()
+
+    assert fidelity == 1.0
+    assert json.loads(control_properties_json_string)["gain"] == 19
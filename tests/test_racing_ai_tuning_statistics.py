@@ -0,0 +1,84 @@
+import math
+
+import pytest
+
+from racing_ai_tuning_statistics import RacingAITuningRaceTimeStatistics
+
+
+@pytest.mark.parametrize("t, degrees_of_freedom, expected_probability", [
+    (0.0, 5, 0.5),
+    (2.015048, 5, 0.95),
+    (2.228139, 10, 0.975),
+    (-1.812461, 10, 0.05),
+    (1.644854, math.inf, 0.95),
+])
+def test_student_t_cdf_matches_table_values(t, degrees_of_freedom, expected_probability):
+    assert RacingAITuningRaceTimeStatistics.student_t_cdf(t, degrees_of_freedom) == pytest.approx(expected_probability, abs=1e-5)
+
+
+def test_student_t_cdf_is_symmetric():
+    for degrees_of_freedom in (1, 3, 30):
+        assert RacingAITuningRaceTimeStatistics.student_t_cdf(-1.3, degrees_of_freedom) == pytest.approx(1.0 - RacingAITuningRaceTimeStatistics.student_t_cdf(1.3, degrees_of_freedom))
+
+
+def test_mean_and_variance():
+    statistics = RacingAITuningRaceTimeStatistics()
+    for race_time in (10.0, 12.0, 14.0):
+        statistics.add_sample("a", race_time)
+
+    assert statistics.get_mean("a") == pytest.approx(12.0)
+    assert statistics.get_variance("a") == pytest.approx(4.0)
+    assert statistics.get_mean("unraced") is None
+    assert statistics.get_number_of_samples("unraced") == 0
+
+
+def test_compare_with_welch_t_test():
+    statistics = RacingAITuningRaceTimeStatistics()
+    for race_time in (10.0, 10.1, 9.9, 10.05):
+        statistics.add_sample("fast", race_time)
+    for race_time in (11.0, 11.1, 10.9, 11.05):
+        statistics.add_sample("slow", race_time)
+    for race_time in (10.02, 9.95, 10.1, 10.0):
+        statistics.add_sample("similar", race_time)
+
+    assert statistics.compare("fast", "slow") == RacingAITuningRaceTimeStatistics.c_comparison_faster
+    assert statistics.compare("slow", "fast") == RacingAITuningRaceTimeStatistics.c_comparison_slower
+    assert statistics.compare("similar", "fast") == RacingAITuningRaceTimeStatistics.c_comparison_undecided
+
+
+def test_compare_single_samples_needs_noise_estimate():
+    statistics = RacingAITuningRaceTimeStatistics()
+    statistics.add_sample("candidate", 9.0)
+    statistics.add_sample("baseline", 10.0)
+
+    assert statistics.compare("candidate", "baseline") == RacingAITuningRaceTimeStatistics.c_comparison_undecided
+
+
+def test_compare_single_samples_with_prior_noise():
+    statistics = RacingAITuningRaceTimeStatistics(prior_noise_deviation=0.1)
+    statistics.add_sample("candidate", 9.0)
+    statistics.add_sample("baseline", 10.0)
+
+    assert statistics.get_pooled_noise_variance() == (pytest.approx(0.01), math.inf)
+    assert statistics.compare("candidate", "baseline") == RacingAITuningRaceTimeStatistics.c_comparison_faster
+
+
+def test_compare_single_samples_with_pooled_noise():
+    statistics = RacingAITuningRaceTimeStatistics(prior_noise_deviation=10.0)
+    for race_time in (10.0, 10.2, 9.8, 10.1, 9.9):
+        statistics.add_sample("baseline", race_time)
+    statistics.add_sample("candidate", 12.0)
+
+    # the noise measured on the baseline replaces the prior
+    assert statistics.get_pooled_noise_variance()[1] == 4
+    assert statistics.compare("candidate", "baseline") == RacingAITuningRaceTimeStatistics.c_comparison_slower
+
+
+def test_compare_noiseless_race_times_directly():
+    statistics = RacingAITuningRaceTimeStatistics()
+    for race_time in (10.0, 10.0):
+        statistics.add_sample("candidate", race_time)
+    for race_time in (10.5, 10.5):
+        statistics.add_sample("baseline", race_time)
+
+    assert statistics.compare("candidate", "baseline") == RacingAITuningRaceTimeStatistics.c_comparison_faster
@@ -0,0 +1,115 @@
+import pytest
+
+from racing_ai_tuning_surrogate import RacingAITuningSurrogateModel
+
+
+# race time of a parameter vector, linear in both parameters
+def get_race_time(vector):
+    return 60.0 + 4.0 * (vector[0] - 1.0) - 6.0 * (vector[1] - 1.0)
+
+
+# parameter vectors on a grid around (1, 1)
+def make_grid_vectors():
+    return [[1.0 + 0.1 * i, 1.0 + 0.1 * j] for i in range(-2, 3) for j in range(-2, 3)]
+
+
+# surrogate model trained on the race times of the grid vectors
+def make_trained_surrogate_model(**options):
+    surrogate_model = RacingAITuningSurrogateModel(**options)
+    for vector in make_grid_vectors():
+        surrogate_model.add_observation(vector, get_race_time(vector))
+
+
+    return surrogate_model
+
+
+def test_cholesky_factor_and_solves():
+    matrix = [[4.0, 2.0, 0.4], [2.0, 5.0, 1.0], [0.4, 1.0, 3.0]]
+    factor = RacingAITuningSurrogateModel._cholesky(matrix)
+
+    for i in range(3):
+        for j in range(3):
+            assert sum(factor[i][k] * factor[j][k] for k in range(3)) == pytest.approx(matrix[i][j])
+            if(j > i):
+                assert factor[i][j] == 0.0
+
+    values = [1.0, -2.0, 0.5]
+    solution = RacingAITuningSurrogateModel._solve_upper_triangular_transposed(factor, RacingAITuningSurrogateModel._solve_lower_triangular(factor, values))
+
+    for i in range(3):
+        assert sum(matrix[i][j] * solution[j] for j in range(3)) == pytest.approx(values[i])
+
+
+def test_predictions_at_training_points_stay_within_noise():
+    surrogate_model = make_trained_surrogate_model(noise=0.01)
+
+    # the noise variance is relative to the variance of the race times, which deviate by about a second
+    noise_deviation = 0.01 ** 0.5 * 1.02
+    for vector in make_grid_vectors():
+        mean, deviation = surrogate_model.predict(vector)
+
+        assert mean == pytest.approx(get_race_time(vector), abs=noise_deviation)
+        assert 0.0 < deviation < 2.0 * noise_deviation
+
+
+def test_predictions_between_training_points_follow_the_function():
+    surrogate_model = make_trained_surrogate_model()
+
+    for vector in ([1.05, 0.95], [0.87, 1.13], [1.15, 1.05]):
+        assert surrogate_model.predict(vector)[0] == pytest.approx(get_race_time(vector), abs=0.1)
+
+
+def test_is_ready_after_two_observations_per_parameter_and_two_more():
+    surrogate_model = RacingAITuningSurrogateModel()
+    vectors = make_grid_vectors()
+
+    assert surrogate_model.is_ready() == False
+
+    for vector in vectors[:5]:
+        surrogate_model.add_observation(vector, get_race_time(vector))
+
+    assert surrogate_model.is_ready() == False
+    assert surrogate_model.predict(vectors[0]) is None
+
+    surrogate_model.add_observation(vectors[5], get_race_time(vectors[5]))
+
+    assert surrogate_model.is_ready() == True
+
+
+def test_is_ready_after_given_minimum_number_of_observations():
+    surrogate_model = RacingAITuningSurrogateModel(minimum_number_of_observations=3)
+    for vector in make_grid_vectors()[:2]:
+        surrogate_model.add_observation(vector, get_race_time(vector))
+    surrogate_model.add_observation([1.3, 1.3], None)
+
+    assert surrogate_model.get_number_of_observations() == 2
+    assert surrogate_model.is_ready() == False
+
+
+def test_observations_beyond_maximum_evict_oldest_but_best():
+    surrogate_model = RacingAITuningSurrogateModel(maximum_number_of_observations=150)
+    best_vector = [0.7, 1.3]
+    surrogate_model.add_observation(best_vector, get_race_time(best_vector))
+    for observation_index in range(200):
+        vector = [1.0 + 0.001 * observation_index, 1.0]
+        surrogate_model.add_observation(vector, get_race_time(vector))
+
+    assert surrogate_model.get_number_of_observations() == 150
+    # the best observation is kept, the oldest other ones were evicted
+    assert surrogate_model._observations[0][0] == best_vector
+    assert surrogate_model._observations[1][0] == pytest.approx([1.051, 1.0])
+
+
+def test_is_candidate_promising_counts_screened_and_skipped_candidates():
+    surrogate_model = RacingAITuningSurrogateModel()
+
+    # every candidate is worth a race until the model is ready, without being screened
+    assert surrogate_model.is_candidate_promising([1.0, 1.0], 60.0) == True
+    assert surrogate_model.get_statistics()["screened"] == 0
+
+    surrogate_model = make_trained_surrogate_model()
+    best_race_time = get_race_time([1.0, 1.0])
+
+    assert surrogate_model.is_candidate_promising([0.9, 1.1], best_race_time) == True
+    assert surrogate_model.is_candidate_promising([1.2, 0.8], best_race_time) == False
+    assert surrogate_model.get_statistics() == {"observations": 25, "screened": 2, "skipped": 1}